@@ -0,0 +1,137 @@
+# agent_system/knowledge/ingest_manifest.py
+"""
+知识库入库清单（增量、幂等入库的依据）
+
+- files：每个源文件的指纹（大小、mtime、内容哈希）
+- chunks：每个源文件当前在向量库中的块 id 与块内容哈希
+入库时据此做真正的 diff：未变化的文件直接跳过，变化的文件只写入新增块、删除失效块。
+"""
+
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """SQLite 入库清单（延迟打开，线程安全）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    source TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    PRIMARY KEY (source, chunk_id)
+                );
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def reset(self):
+        """向量库被隔离重建时，清单也需随之失效。"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_file(self, source: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT size, mtime, content_hash, chunk_count FROM files WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "mtime": row[1], "content_hash": row[2], "chunk_count": row[3]}
+
+    def check_file(self, source: str, file_path: str) -> Tuple[bool, Dict[str, Any]]:
+        """
+        判断文件自上次入库后是否变化
+        - 大小与 mtime 均未变：视为未变化，不读取文件内容
+        - 否则计算内容哈希再比较（仅被 touch 的文件同样跳过，并刷新 mtime）
+        返回 (是否未变化, 当前指纹)
+        """
+        stat = os.stat(file_path)
+        fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime, "content_hash": None}
+        known = self.get_file(source)
+
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            fingerprint["content_hash"] = known["content_hash"]
+            return True, fingerprint
+
+        fingerprint["content_hash"] = file_content_hash(file_path)
+        if known and known["content_hash"] == fingerprint["content_hash"]:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("UPDATE files SET mtime = ? WHERE source = ?", (stat.st_mtime, source))
+                conn.commit()
+            return True, fingerprint
+
+        return False, fingerprint
+
+    def get_chunk_ids(self, source: str) -> Set[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT chunk_id FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def replace_file(self, source: str, fingerprint: Dict[str, Any], chunk_hashes: Dict[str, str]):
+        """记录文件最新指纹及其全部块（chunk_id -> chunk_hash）。"""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            conn.executemany(
+                "INSERT INTO chunks (source, chunk_id, chunk_hash) VALUES (?, ?, ?)",
+                [(source, cid, h) for cid, h in chunk_hashes.items()],
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO files (source, size, mtime, content_hash, chunk_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (source, fingerprint["size"], fingerprint["mtime"], fingerprint["content_hash"],
+                 len(chunk_hashes), now),
+            )
+            conn.commit()
+
+    def remove_file(self, source: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            conn.execute("DELETE FROM files WHERE source = ?", (source,))
+            conn.commit()
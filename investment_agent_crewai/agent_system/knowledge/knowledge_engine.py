@@ -3,49 +3,114 @@ import os
 import re
 import shutil
 import datetime
-from typing import List, Tuple, Dict
+import threading
+from typing import Any, Callable, Iterable, List, Tuple, Dict
 
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-import pdfplumber
+
+from embeddings import get_embedding_service
+from agent_system.knowledge.ingest_manifest import IngestManifest, chunk_hash
+from agent_system.knowledge.retrieval_planner import coverage_score, plan_queries
+from agent_system.knowledge.table_store import TableStore
+from ingestion.pdf_extractor import pdf_extractor, table_to_markdown
+from ingestion.streaming import WholeChunk, iter_batches, iter_text_chunks
+from rag.bm25_index import BM25Index
+from rag.dedup import dedupe_hits
+from rag.fusion import reciprocal_rank_fusion
+from rag.query_cache import query_cache
+from rag.reranker import HybridReranker
+from rag.token_budget import estimate_tokens, fit_blocks
+from rag.tokenizer import term_string
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
 CHROMA_DATA_PATH = os.path.join(PROJECT_ROOT, "chroma_db")
-os.makedirs(CHROMA_DATA_PATH, exist_ok=True)
+INGEST_MANIFEST_PATH = os.path.join(CHROMA_DATA_PATH, "ingest_manifest.sqlite3")
+TABLE_STORE_PATH = os.path.join(CHROMA_DATA_PATH, "table_store.sqlite3")
+BM25_INDEX_PATH = os.path.join(CHROMA_DATA_PATH, "bm25_index.sqlite3")
+# hybrid：向量召回 + 关键词重排；rrf：向量排序与 BM25 排序做倒数排名融合
+DEFAULT_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "rrf")
+CACHE_NAMESPACE = "knowledge"
+
+
+class SharedEmbeddingFunction(EmbeddingFunction):
+    """Chroma 嵌入函数：委托给进程级嵌入服务（本地共享模型或远程模型进程）。"""
+
+    def __init__(self, service=None):
+        self.service = service or get_embedding_service()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.service.embed_documents(list(input))
+
+
+class _FileChunks:
+    """
+    一个 PDF 的流式分块（可迭代一次）；迭代过程中暂存各页表格，
+    commit_tables() 将其与旧表格在同一事务中替换（只保存表格行，体积远小于全文）
+    """
+
+    def __init__(self, manager: "KnowledgeBaseManager", file_path: str, on_pages: Callable[[int, int], None] | None):
+        self.manager = manager
+        self.file_path = file_path
+        self.filename = os.path.basename(file_path)
+        self.on_pages = on_pages
+        self.table_records: List[tuple] = []
+        self._exhausted = False
+
+    def _page_items(self):
+        for page in pdf_extractor.iter_pages(self.file_path, on_progress=self.on_pages):
+            yield page["text"] + "\n"
+            self.table_records.extend(
+                self.manager.table_store.build_records(self.filename, page["page"], page["tables"])
+            )
+            for table in page["tables"]:
+                yield WholeChunk(
+                    f"[表格数据] {table['caption']}（第{page['page']}页）\n{table_to_markdown(table['rows'])}"
+                )
+        self._exhausted = True
 
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
-emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="BAAI/bge-m3")
-collection = client.get_or_create_collection(name="industry_research_db", embedding_function=emb_fn)
+    def __iter__(self):
+        return iter_text_chunks(self._page_items(), self.manager.text_splitter)
+
+    def commit_tables(self):
+        if not self._exhausted:
+            raise RuntimeError(f"{self.filename} 尚未解析完成，不能替换表格库")
+        self.manager.table_store.replace_source(self.filename, self.table_records)
 
 
 class KnowledgeBaseManager:
     """
     知识库管理器（稳定版）
-    - 避免在 import 时初始化 Chroma，防止 Streamlit 启动阶段崩溃
+    - 避免在 import 时初始化 Chroma / 嵌入模型，防止 Streamlit 启动阶段崩溃与冷启动过慢
     - 对损坏的本地 Chroma 数据目录进行自动隔离并重建
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        vector_weight: float = 0.65,
+        keyword_weight: float = 0.35,
+        retrieval_mode: str = DEFAULT_RETRIEVAL_MODE,
+    ):
         self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=80)
         self._client = None
         self._collection = None
         self._emb_fn = None
+        self._init_lock = threading.Lock()
+        self.manifest = IngestManifest(INGEST_MANIFEST_PATH)
+        self.table_store = TableStore(TABLE_STORE_PATH)
+        self.embed_batch_size = 64
+        self.reranker = HybridReranker(vector_weight=vector_weight, keyword_weight=keyword_weight)
+        self.lexical_index = BM25Index(BM25_INDEX_PATH)
+        self.retrieval_mode = retrieval_mode
+        self.coverage_threshold = 0.8  # RAR 覆盖度达到该值即停止后续轮次
+        self._lexical_checked = False
 
     @staticmethod
     def _extract_keywords(text: str) -> List[str]:
         return list(dict.fromkeys(re.findall(r"[\u4e00-\u9fffA-Za-z0-9]{2,}", text.lower())))
 
-    @staticmethod
-    def _keyword_score(text: str, query: str) -> float:
-        tokens = KnowledgeBaseManager._extract_keywords(query)
-        if not tokens:
-            return 0.0
-        low = text.lower()
-        hit = sum(1 for token in tokens if token in low)
-        return hit / len(tokens)
-
     @staticmethod
     def _build_retrieval_text(chunk: str) -> str:
         """多表示索引：压缩为检索表示（关键词+数字+首句），提升召回性能。"""
@@ -57,6 +122,10 @@ class KnowledgeBaseManager:
     def _rotate_corrupted_store(self, base_path: str) -> str:
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         broken_path = f"{base_path}_corrupted_{ts}"
+        self.manifest.reset()
+        self.table_store.reset()
+        self.lexical_index.reset()
+        self._lexical_checked = False
         if os.path.exists(base_path):
             shutil.move(base_path, broken_path)
         os.makedirs(base_path, exist_ok=True)
@@ -66,124 +135,355 @@ class KnowledgeBaseManager:
         if self._collection is not None:
             return self._collection
 
-        if self._emb_fn is None:
-            self._emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="BAAI/bge-m3")
+        with self._init_lock:
+            if self._collection is not None:
+                return self._collection
+
+            if self._emb_fn is None:
+                self._emb_fn = SharedEmbeddingFunction()
+
+            os.makedirs(CHROMA_DATA_PATH, exist_ok=True)
+            try:
+                self._client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+                self._collection = self._client.get_or_create_collection(
+                    name="industry_research_db", embedding_function=self._emb_fn
+                )
+                return self._collection
+            except BaseException as e:
+                # 兼容 pyo3_runtime.PanicException（可能不继承 Exception）
+                print(f"⚠️ Chroma 初始化失败，尝试隔离损坏库并重建: {e}")
+                rotated = self._rotate_corrupted_store(CHROMA_DATA_PATH)
+                print(f"🧹 已隔离旧库目录: {rotated}")
+
+                self._client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+                self._collection = self._client.get_or_create_collection(
+                    name="industry_research_db", embedding_function=self._emb_fn
+                )
+                return self._collection
 
-        try:
-            self._client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
-            self._collection = self._client.get_or_create_collection(
-                name="industry_research_db", embedding_function=self._emb_fn
-            )
-            return self._collection
-        except BaseException as e:
-            # 兼容 pyo3_runtime.PanicException（可能不继承 Exception）
-            print(f"⚠️ Chroma 初始化失败，尝试隔离损坏库并重建: {e}")
-            rotated = self._rotate_corrupted_store(CHROMA_DATA_PATH)
-            print(f"🧹 已隔离旧库目录: {rotated}")
-
-            self._client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
-            self._collection = self._client.get_or_create_collection(
-                name="industry_research_db", embedding_function=self._emb_fn
-            )
-            return self._collection
+    @staticmethod
+    def _chunk_id(filename: str, digest: str) -> str:
+        # 内容寻址 id：同一内容的块在重复入库时 id 不变
+        return f"{filename}_{digest[:16]}"
 
-    def ingest_pdf(self, file_path: str):
-        print(f"📥 正在深度解析文件 (含表格): {file_path} ...")
-        full_text = ""
-
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                tables = page.extract_tables()
-                table_text = ""
-                for table in tables:
-                    cleaned_table = [[str(cell) if cell else "" for cell in row] for row in table]
-                    table_text += f"\n[表格数据]: {str(cleaned_table)}\n"
-                full_text += text + "\n" + table_text
-
-        chunks = self.text_splitter.split_text(full_text)
+    def ingest_pdf(self, file_path: str, force: bool = False) -> Dict[str, Any]:
+        """
+        增量、幂等、流式入库
+        - 文件指纹未变化：直接跳过
+        - 文件变化：逐页解析 → 增量分块 → 分批嵌入写入，只写入新增块、删除失效块
+        """
         filename = os.path.basename(file_path)
+        unchanged, fingerprint = self.check_unchanged(file_path)
+        if unchanged and not force:
+            print(f"⏭️ 文件未变化，跳过入库: {filename}")
+            return self.skipped_result(filename)
 
-        docs, ids, metadatas = [], [], []
-        ingest_time = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        print(f"📥 正在深度解析文件 (含表格): {file_path} ...")
+        return self.sync_file_chunks(filename, self.iter_file_chunks(file_path), fingerprint)
 
-        for i, chunk in enumerate(chunks):
-            retrieval_text = self._build_retrieval_text(chunk)
-            ids.append(f"{filename}_{i}")
-            docs.append(retrieval_text)
-            metadatas.append(
-                {
-                    "source": filename,
-                    "type": "report",
-                    "chunk_index": i,
-                    "ingest_time": ingest_time,
-                    "raw_content": chunk,
-                    "keywords": " ".join(self._extract_keywords(chunk)[:25]),
-                }
-            )
+    def iter_file_chunks(self, file_path: str, on_pages: Callable[[int, int], None] | None = None):
+        """
+        流式分块：不拼接全文，内存占用与文档大小无关
+        - 正文按 text_splitter 增量切分
+        - 每张表格整体作为一个块（不被切碎）；结构化表格先暂存，
+          由 sync_file_chunks 在向量同步成功后整体替换到表格库
+        """
+        return _FileChunks(self, file_path, on_pages)
 
-        collection = self._ensure_collection()
-        collection.add(documents=docs, ids=ids, metadatas=metadatas)
-        print(f"✅ 已存入 {len(chunks)} 个知识片段（多表示索引）")
-
-    def _rerank(self, docs: List[str], metas: List[dict], distances: List[float], query: str) -> List[Tuple[str, dict, float]]:
-        ranked = []
-        for doc, meta, dist in zip(docs, metas, distances):
-            raw = (meta or {}).get("raw_content", doc)
-            vector_score = 1 / (1 + max(dist or 0, 0))
-            keyword_score = self._keyword_score(raw, query)
-            final_score = 0.65 * vector_score + 0.35 * keyword_score
-            ranked.append((raw, meta, final_score))
-        ranked.sort(key=lambda x: x[2], reverse=True)
-        return ranked
+    def check_unchanged(self, file_path: str) -> Tuple[bool, Dict[str, Any]]:
+        return self.manifest.check_file(os.path.basename(file_path), file_path)
 
-    def query_knowledge(self, query, n_results=5, keyword_filter=None):
+    @staticmethod
+    def skipped_result(filename: str) -> Dict[str, Any]:
+        return {"source": filename, "status": "skipped", "added": 0, "removed": 0, "kept": 0}
+
+    def sync_file_chunks(
+        self,
+        filename: str,
+        chunks: Iterable[str],
+        fingerprint: Dict[str, Any],
+        on_progress: Callable[[int], None] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        将一个文件的最新分块与向量库做 diff 同步（chunks 可为生成器，边产出边写入）
+        - 每满 embed_batch_size 个块即嵌入并写入，先写入的块在整份文件完成前即可检索
+        - 失效块（含旧版 id 方案遗留的块）在全部块产出后统一删除，清单最后更新；
+          中途失败会回滚本次新增的块，旧块保持不变
+        on_progress(已写入块数)：每写完一批回调一次
+        """
         collection = self._ensure_collection()
-        results = collection.query(query_texts=[query], n_results=n_results * 3)
-
-        docs = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-
-        reranked = self._rerank(docs, metadatas, distances, query)
-        final_results = []
-        for doc, meta, score in reranked:
-            if keyword_filter and keyword_filter not in doc:
-                continue
-            source = (meta or {}).get("source", "unknown")
-            final_results.append(f"[来源: {source}][score={score:.3f}]\n{doc}")
-
-        return "\n\n".join(final_results[:n_results])
+        is_new_file = self.manifest.get_file(filename) is None
+        previous_ids = self.manifest.get_chunk_ids(filename)
+        ingest_time = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
-    def query_with_reasoning(self, query: str, n_results: int = 5, max_rounds: int = 2) -> str:
-        """RAR: 检索 -> 评估 -> 再检索。"""
-        history = []
-        current_query = query
+        def _meta(i: int, chunk: str) -> dict:
+            return {
+                "source": filename,
+                "type": "report",
+                "chunk_index": i,
+                "ingest_time": ingest_time,
+                "raw_content": chunk,
+                "keywords": " ".join(self._extract_keywords(chunk)[:25]),
+                "terms": term_string(chunk),  # 重排用检索词，入库时预计算
+            }
+
+        def _unique_records():
+            # 按内容哈希去重（文件内完全重复的块只保留一份），只在内存中保留 id 与哈希
+            for i, chunk in enumerate(chunks):
+                digest = chunk_hash(chunk)
+                chunk_id = self._chunk_id(filename, digest)
+                if chunk_id not in chunk_hashes:
+                    chunk_hashes[chunk_id] = digest
+                    yield chunk_id, i, chunk
+
+        # 清单中没有记录：旧版 "{filename}_{i}" 方案遗留的块在同步成功后与失效块一并删除，
+        # 同步失败时文件仍保留旧块可检索
+        legacy_ids = collection.get(where={"source": filename}, include=[])["ids"] if is_new_file else []
+
+        chunk_hashes: Dict[str, str] = {}
+        added_ids: List[str] = []
+        kept_count = 0
+        written = 0
+        service = get_embedding_service()
+        try:
+            for batch in iter_batches(_unique_records(), self.embed_batch_size):
+                added = [r for r in batch if r[0] not in previous_ids]
+                kept = [r for r in batch if r[0] in previous_ids]
+                if added:
+                    documents = [self._build_retrieval_text(chunk) for _, _, chunk in added]
+                    collection.upsert(
+                        ids=[cid for cid, _, _ in added],
+                        documents=documents,
+                        embeddings=service.embed_documents(documents),
+                        metadatas=[_meta(i, chunk) for _, i, chunk in added],
+                    )
+                    self.lexical_index.add_documents(
+                        (cid, chunk, {"source": filename, "type": "report"}) for cid, _, chunk in added
+                    )
+                    added_ids.extend(cid for cid, _, _ in added)
+                if kept:
+                    # 只刷新元数据（块顺序可能变化），不重新计算嵌入
+                    collection.update(ids=[cid for cid, _, _ in kept], metadatas=[_meta(i, chunk) for _, i, chunk in kept])
+                    kept_count += len(kept)
+                written += len(batch)
+                query_cache.bump(CACHE_NAMESPACE)  # 本批已可检索，旧的检索缓存失效
+                if on_progress:
+                    on_progress(written)
+        except BaseException:
+            if added_ids:
+                collection.delete(ids=added_ids)
+                self.lexical_index.delete_documents(added_ids)
+                query_cache.bump(CACHE_NAMESPACE)
+            raise
+
+        removed_ids = [cid for cid in previous_ids if cid not in chunk_hashes]
+        removed_ids += [cid for cid in legacy_ids if cid not in chunk_hashes and cid not in previous_ids]
+        if removed_ids:
+            collection.delete(ids=removed_ids)
+            self.lexical_index.delete_documents(removed_ids)
+
+        # 表格库在向量同步成功后才替换（iter_file_chunks 产出的块带有暂存表格）
+        commit_tables = getattr(chunks, "commit_tables", None)
+        if commit_tables is not None:
+            commit_tables()
+
+        self.manifest.replace_file(filename, fingerprint, chunk_hashes)
+        query_cache.bump(CACHE_NAMESPACE)
+        print(f"✅ {filename} 增量入库完成：新增 {len(added_ids)} / 保留 {kept_count} / 删除 {len(removed_ids)} 个知识片段（多表示索引）")
+        return {
+            "source": filename,
+            "status": "created" if is_new_file else "updated",
+            "added": len(added_ids),
+            "removed": len(removed_ids),
+            "kept": kept_count,
+        }
 
-        for _ in range(max_rounds):
-        for round_idx in range(max_rounds):
-            evidence = self.query_knowledge(current_query, n_results=n_results)
-            history.append((current_query, evidence))
+    def _rerank(self, ids: List[str], docs: List[str], metas: List[dict], distances: List[float], query: str) -> List[Tuple[str, str, dict, float]]:
+        raws = [(meta or {}).get("raw_content", doc) for doc, meta in zip(docs, metas)]
+        ranking = self.reranker.rank(query, distances, self.reranker.candidate_terms(metas, raws))
+        return [(ids[i], raws[i], metas[i], score) for i, score, _ in ranking]
 
-            if evidence and len(evidence) > 400:
+    def rebuild_lexical_index(self, page_size: int = 1000) -> int:
+        """从向量库全量重建 BM25 索引（升级前已入库的数据回填用），返回写入的块数"""
+        collection = self._ensure_collection()
+        total = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
                 break
+            self.lexical_index.add_documents(
+                (cid, (meta or {}).get("raw_content", doc), {"source": (meta or {}).get("source"), "type": "report"})
+                for cid, doc, meta in zip(ids, page["documents"], page["metadatas"])
+            )
+            total += len(ids)
+            offset += len(ids)
+        query_cache.bump(CACHE_NAMESPACE)
+        return total
+
+    def _ensure_lexical_index(self, collection):
+        # 每个进程只检查一次：索引为空而向量库有数据时自动回填
+        if self._lexical_checked:
+            return
+        with self._init_lock:
+            if self._lexical_checked:
+                return
+            self._lexical_checked = True
+        if self.lexical_index.count() == 0 and collection.count() > 0:
+            print("🔤 BM25 索引为空，正在从向量库回填 ...")
+            print(f"🔤 已回填 {self.rebuild_lexical_index()} 个知识片段")
+
+    def _fuse_with_lexical(
+        self,
+        collection,
+        queries: List[str],
+        vector_hits: List[List[Tuple[str, str, dict, float]]],
+        depth: int,
+    ) -> List[List[Tuple[str, str, dict, float]]]:
+        """RRF：每个查询的向量排序与 BM25 排序融合；仅被词法召回的块一次性批量取回"""
+        self._ensure_lexical_index(collection)
+        lexical = [[cid for cid, _ in self.lexical_index.search(q, k=depth)] for q in queries]
+
+        known = {hit[0]: hit for hits in vector_hits for hit in hits}
+        missing = list(dict.fromkeys(cid for ids in lexical for cid in ids if cid not in known))
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+            for cid, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                known[cid] = (cid, (meta or {}).get("raw_content", doc), meta, 0.0)
+
+        fused_per_query = []
+        for hits, lex_ids in zip(vector_hits, lexical):
+            fused = reciprocal_rank_fusion([[hit[0] for hit in hits], lex_ids])
+            fused_per_query.append([(*known[cid][:3], score) for cid, score in fused if cid in known])
+        return fused_per_query
+
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        keyword_filter=None,
+        mode: str | None = None,
+    ) -> List[List[Tuple[str, str, dict, float]]]:
+        """
+        批量检索：N 个查询一次批量嵌入、一次 Chroma 查询，分别重排
+        mode="rrf" 时再与 BM25 词法检索结果做倒数排名融合（默认取 self.retrieval_mode）
+        返回与 queries 一一对应的 [(id, 原文, 元数据, 分数)] 列表
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        collection = self._ensure_collection()
+        # 查询向量走查询入口：只进进程内 LRU，不挤占持久化的文档嵌入缓存
+        embeddings = get_embedding_service().embed_queries(queries)
+        results = collection.query(query_embeddings=embeddings, n_results=n_results * 3)
+
+        empty = [[]] * len(queries)
+        ids = results.get("ids") or empty
+        docs = results.get("documents") or empty
+        metadatas = results.get("metadatas") or empty
+        distances = results.get("distances") or empty
+
+        ranked = [
+            self._rerank(ids[qi], docs[qi], metadatas[qi], distances[qi], query)
+            for qi, query in enumerate(queries)
+        ]
+        if (mode or self.retrieval_mode) == "rrf":
+            ranked = self._fuse_with_lexical(collection, queries, ranked, depth=n_results * 3)
+
+        per_query = []
+        for reranked in ranked:
+            if keyword_filter:
+                reranked = [hit for hit in reranked if keyword_filter in hit[1]]
+            per_query.append(reranked[:n_results])
+        return per_query
 
-            constraints = re.findall(r"\d{4}|市场规模|营收|利润|政策|上游|中游|下游", query)
-            if constraints:
-                current_query = f"{query} {' '.join(constraints)}"
-            else:
-                current_query = f"{query} 行业数据 龙头企业 政策"
+    @staticmethod
+    def _hit_blocks(hits: List[Tuple[str, str, dict, float]]) -> List[str]:
+        return [f"[来源: {(meta or {}).get('source', 'unknown')}][score={score:.3f}]\n{raw}" for _, raw, meta, score in hits]
 
+    @staticmethod
+    def _format_hits(hits: List[Tuple[str, str, dict, float]], max_tokens: int | None = None) -> str:
+        return "\n\n".join(fit_blocks(KnowledgeBaseManager._hit_blocks(hits), max_tokens))
+
+    def query_many(self, queries: List[str], n_results: int = 5, keyword_filter=None, max_tokens: int | None = None) -> str:
+        """多个相关问题一次检索：结果合并、去重（id + 近似重复 + 相邻块合并）后统一排序，可限制 token 预算"""
+        queries = list(queries)
+        return query_cache.get_or_compute(
+            CACHE_NAMESPACE, "\n".join(queries),
+            lambda: self._query_many(queries, n_results, keyword_filter, max_tokens),
+            op="query_many", n_results=n_results, keyword_filter=keyword_filter, mode=self.retrieval_mode,
+            max_tokens=max_tokens,
+        )
+
+    def _query_many(self, queries: List[str], n_results: int, keyword_filter, max_tokens: int | None) -> str:
+        best: Dict[str, Tuple[str, str, dict, float]] = {}
+        for hits in self.search_many(queries, n_results=n_results, keyword_filter=keyword_filter):
+            for hit in hits:
+                if hit[0] not in best or hit[3] > best[hit[0]][3]:
+                    best[hit[0]] = hit
+        merged = sorted(best.values(), key=lambda x: x[3], reverse=True)
+        return self._format_hits(dedupe_hits(merged[:n_results * max(1, len(queries))]), max_tokens)
 
-            constraints = re.findall(r"\d{4}|市场规模|营收|利润|政策|上游|中游|下游", query)
-            if constraints:
-                current_query = f"{query} {' '.join(constraints)}"
-            else:
-                current_query = f"{query} 行业数据 龙头企业 政策"
+    def query_knowledge(self, query, n_results=5, keyword_filter=None):
+        return query_cache.get_or_compute(
+            CACHE_NAMESPACE, query,
+            lambda: self._format_hits(dedupe_hits(self.search_many([query], n_results=n_results, keyword_filter=keyword_filter)[0])),
+            op="query_knowledge", n_results=n_results, keyword_filter=keyword_filter, mode=self.retrieval_mode,
+        )
+
+    def query_tables(self, query: str, n_results: int = 3, source: str | None = None, max_tokens: int | None = None) -> str:
+        """按关键词直接取回整张表格（不走向量检索）"""
+        tables = self.table_store.search(query, limit=n_results, source=source)
+        return "\n\n".join(fit_blocks([TableStore.format_table(t) for t in tables], max_tokens))
+
+    def query_with_reasoning(
+        self,
+        query: str,
+        n_results: int = 5,
+        max_rounds: int = 2,
+        max_tokens: int | None = None,
+    ) -> str:
+        """
+        RAR: 检索 -> 评估 -> 再检索。
+        扩展查询只依赖原始问题：由检索规划器预先生成各轮查询、一次批量检索，
+        再逐轮按覆盖度（来源数、数值事实数）评估是否足够。
+        max_tokens：证据总 token 预算，按轮次顺序保留完整证据块
+        """
+        return query_cache.get_or_compute(
+            CACHE_NAMESPACE, query,
+            lambda: self._query_with_reasoning(query, n_results, max_rounds, max_tokens),
+            op="query_with_reasoning", n_results=n_results, max_rounds=max_rounds, mode=self.retrieval_mode,
+            coverage_threshold=self.coverage_threshold, max_tokens=max_tokens,
+        )
+
+    def _query_with_reasoning(self, query: str, n_results: int, max_rounds: int, max_tokens: int | None) -> str:
+        round_queries = plan_queries(query, max_queries=max_rounds)
+        results = self.search_many(round_queries, n_results=n_results)
+
+        # 逐轮评估：跨轮按块 id 与 SimHash 去重，相邻块合并，每轮只展示新增证据；覆盖度达标即停止
+        seen: Dict[str, Tuple[str, str, dict, float]] = {}
+        signatures: List[int] = []
+        history = []
+        for current_query, hits in zip(round_queries, results):
+            fresh = dedupe_hits((hit for hit in hits if hit[0] not in seen), signatures)
+            seen.update((hit[0], hit) for hit in hits)
+            coverage = coverage_score(seen.values(), n_results)
+            history.append((current_query, fresh, coverage))
+            if coverage["score"] >= self.coverage_threshold:
+                break
 
         sections = []
-        for i, (q, ev) in enumerate(history, start=1):
-            sections.append(f"[RAR Round {i}] 查询: {q}\n{ev or '无有效证据'}")
+        remaining = max_tokens
+        for i, (q, fresh, coverage) in enumerate(history, start=1):
+            stats = f"来源 {coverage['sources']} / 数值 {coverage['numeric_facts']} / 覆盖度 {coverage['score']:.2f}"
+            blocks = fit_blocks(self._hit_blocks(fresh), remaining)
+            if remaining is not None:
+                remaining -= sum(estimate_tokens(b) + 1 for b in blocks)
+            evidence = "\n\n".join(blocks)
+            sections.append(f"[RAR Round {i}] 查询: {q}（{stats}）\n{evidence or '无新增证据'}")
+            if remaining is not None and remaining <= 0:
+                break
         return "\n\n".join(sections)
 
     def recommend_sync_strategy(self) -> Dict[str, str]:
@@ -194,7 +494,7 @@ class KnowledgeBaseManager:
         """
         return {
             "recommended": "hybrid",
-            "upload_time": "每次上传文件后，立即进行增量切分与索引更新",
+            "upload_time": "每次上传文件后，按文件指纹与块哈希做增量 diff（跳过未变文件、只写变化块、删除失效块）",
             "nightly": "每日凌晨02:00执行增量重建（去重、失效清理、embedding回填）",
             "reason": "投研场景需要实时可查 + 离峰期做质量修复，兼顾时效与性能成本",
         }
@@ -0,0 +1,54 @@
+# agent_system/knowledge/retrieval_planner.py
+"""
+RAR 检索规划
+
+- plan_queries：扩展查询只依赖原始问题，预先生成全部候选轮次，交给 search_many 一次批量检索
+- coverage_score：按证据覆盖度（不同来源数、数值事实数、有效块数）判断是否足够，
+  取代原先的 len(evidence) > 400
+"""
+
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# 问题中出现某类约束时，追加该类常见的表述，提升召回
+EXPANSION_HINTS: List[Tuple[str, str]] = [
+    (r"市场规模|规模|空间", "市场规模 增长率 CAGR 预测"),
+    (r"营收|收入|利润|毛利|财务", "营业收入 净利润 毛利率 同比"),
+    (r"政策|规划|补贴|监管", "政策 规划 通知 补贴 监管"),
+    (r"上游|中游|下游|产业链|供应链", "产业链 上游 原材料 下游 应用"),
+    (r"竞争|龙头|企业|份额|格局", "龙头企业 市场份额 集中度 竞争格局"),
+]
+CONSTRAINT_PATTERN = r"\d{4}|市场规模|营收|利润|政策|上游|中游|下游"
+FALLBACK_EXPANSION = "行业数据 龙头企业 政策"
+NUMERIC_FACT_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*(?:%|亿|万|元|吨|GWh|MW|GW)|\d{4}年")
+
+
+def plan_queries(query: str, max_queries: int = 3) -> List[str]:
+    """按优先级生成去重后的候选查询，第一条总是原始问题"""
+    candidates = [query]
+    constraints = re.findall(CONSTRAINT_PATTERN, query)
+    if constraints:
+        candidates.append(f"{query} {' '.join(dict.fromkeys(constraints))}")
+    for pattern, hint in EXPANSION_HINTS:
+        if re.search(pattern, query):
+            candidates.append(f"{query} {hint}")
+    candidates.append(f"{query} {FALLBACK_EXPANSION}")
+    return list(dict.fromkeys(candidates))[:max(1, max_queries)]
+
+
+def coverage_score(hits: Iterable[Tuple[str, str, dict, float]], n_results: int) -> Dict[str, float]:
+    """
+    证据覆盖度：来源多样性 40% + 数值事实 40% + 有效块数 20%
+    返回 {"score", "sources", "numeric_facts", "chunks"}
+    """
+    hits = list(hits)
+    sources = {(meta or {}).get("source", "unknown") for _, _, meta, _ in hits}
+    facts = set()
+    for _, raw, _, _ in hits:
+        facts.update(NUMERIC_FACT_PATTERN.findall(raw))
+    score = (
+        0.4 * min(1.0, len(sources) / 2)
+        + 0.4 * min(1.0, len(facts) / 5)
+        + 0.2 * min(1.0, len(hits) / max(1, n_results))
+    )
+    return {"score": round(score, 3), "sources": len(sources), "numeric_facts": len(facts), "chunks": len(hits)}
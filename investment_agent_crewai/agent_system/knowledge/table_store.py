@@ -0,0 +1,149 @@
+# agent_system/knowledge/table_store.py
+"""
+结构化表格库
+
+入库时从 PDF 抽取的表格整表写入 SQLite（来源、页码、标题、表头、数据行），
+Agent 可按关键词直接取回完整表格，无需向量检索，也不会拿到被 500 字切碎的表格片段。
+市场规模、财务数据等表格是投研最常查找的内容。
+"""
+
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from ingestion.pdf_extractor import table_to_markdown
+
+_TERM_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[A-Za-z0-9][A-Za-z0-9.%]*")
+
+
+def _query_terms(query: str) -> List[str]:
+    """检索词：英文/数字整词；中文短词整体保留，长词再拆成二元组以便部分匹配"""
+    terms = []
+    for token in _TERM_PATTERN.findall(query.lower()):
+        if len(token) < 2:
+            continue
+        terms.append(token)
+        if "\u4e00" <= token[0] <= "\u9fff" and len(token) > 4:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return list(dict.fromkeys(terms))
+
+
+class TableStore:
+    """SQLite 表格库（延迟打开，线程安全）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS report_tables (
+                    table_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    table_index INTEGER NOT NULL,
+                    caption TEXT NOT NULL,
+                    header TEXT NOT NULL,
+                    rows TEXT NOT NULL,
+                    n_rows INTEGER NOT NULL,
+                    n_cols INTEGER NOT NULL,
+                    search_text TEXT NOT NULL,
+                    ingest_time TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_report_tables_source ON report_tables (source);
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def reset(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def build_records(source: str, page: int, tables: List[Dict[str, Any]]) -> List[tuple]:
+        """把一页的表格转为待写入的行；tables 为抽取器产出的 {"rows", "caption"}，首行视为表头"""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        records = []
+        for index, table in enumerate(tables):
+            rows = table["rows"]
+            header, body = rows[0], rows[1:]
+            # 检索文本：标题 + 表头 + 首列（指标名 / 年份通常在首列）
+            first_col = [row[0] for row in body if row]
+            search_text = " ".join([table["caption"], *header, *first_col]).lower()
+            records.append((
+                f"{source}_p{page}_t{index}", source, page, index, table["caption"],
+                json.dumps(header, ensure_ascii=False), json.dumps(body, ensure_ascii=False),
+                len(body), max(len(row) for row in rows), search_text, now,
+            ))
+        return records
+
+    def replace_source(self, source: str, records: List[tuple]):
+        """在同一事务中删除该文件的旧表格并写入新表格：要么整体替换，要么保持原样"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM report_tables WHERE source = ?", (source,))
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO report_tables
+                    (table_id, source, page, table_index, caption, header, rows, n_rows, n_cols, search_text, ingest_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    records,
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def search(self, query: str, limit: int = 3, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按关键词查找整表：先用 LIKE 粗筛，再按命中检索词比例排序"""
+        terms = _query_terms(query)
+        if not terms:
+            return []
+
+        where = " OR ".join("search_text LIKE ?" for _ in terms)
+        params: List[Any] = [f"%{t}%" for t in terms]
+        if source:
+            where = f"({where}) AND source = ?"
+            params.append(source)
+
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT table_id, source, page, caption, header, rows, search_text "
+                f"FROM report_tables WHERE {where} LIMIT 200",
+                params,
+            ).fetchall()
+
+        scored = []
+        for table_id, src, page, caption, header, body, search_text in rows:
+            score = sum(1 for t in terms if t in search_text) / len(terms)
+            scored.append({
+                "table_id": table_id,
+                "source": src,
+                "page": page,
+                "caption": caption,
+                "header": json.loads(header),
+                "rows": json.loads(body),
+                "score": score,
+            })
+        scored.sort(key=lambda x: x["score"], reverse=True)
+        return scored[:limit]
+
+    @staticmethod
+    def format_table(table: Dict[str, Any]) -> str:
+        title = table["caption"] or "未命名表格"
+        body = table_to_markdown([table["header"], *table["rows"]])
+        return f"[来源: {table['source']} 第{table['page']}页] {title}\n{body}"
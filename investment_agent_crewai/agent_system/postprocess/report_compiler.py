@@ -0,0 +1,131 @@
+# agent_system/postprocess/report_compiler.py
+"""
+本地 Markdown 统稿
+
+取代原先让 LLM 把全部章节重新输出一遍的 compile_task（一次 15000+ 字的生成，
+且常在 max_tokens=8000 处截断）。这里按 Planner 的章节顺序拼接各章：
+- 去掉模型包裹的 ```markdown 代码块与每章开头的日期行
+- 章节标题统一为 "## 第N章 标题"，章内标题整体下调到 ### 及以下
+- 添加报告头部（日期、免责声明）与尾部（数据来源说明）
+"""
+
+import datetime
+import re
+from typing import Dict, List, Optional
+
+_FENCE_WRAPPED = re.compile(r"^\s*```(?:markdown|md)?\s*\n(.*?)\n```\s*$", re.DOTALL | re.IGNORECASE)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_DATE_LINE = re.compile(r"^\**\s*(报告日期|日期|撰写日期)\s*\**\s*[:：]|^\d{4}\s*年\s*\d{1,2}\s*月(\s*\d{1,2}\s*日)?\s*$")
+_CHAPTER_PREFIX = re.compile(r"^第[\d一二三四五六七八九十]+章\s*[:：、.]?\s*")
+
+
+def _strip_wrapper(content: str) -> str:
+    content = (content or "").strip()
+    match = _FENCE_WRAPPED.match(content)
+    return match.group(1).strip() if match else content
+
+
+def _normalize_title(title: str) -> str:
+    title = re.sub(r"[#*`]", "", title).strip()
+    return _CHAPTER_PREFIX.sub("", title).strip()
+
+
+def _drop_leading_noise(lines: List[str], chapter_title: str) -> List[str]:
+    """去掉开头的空行、日期行，以及与本章标题相同的一级/二级标题（由统稿统一生成）"""
+    target = _normalize_title(chapter_title)
+    while lines:
+        line = lines[0].strip()
+        heading = _HEADING.match(line)
+        if not line or _DATE_LINE.match(line) or line == "---":
+            lines = lines[1:]
+        elif heading and len(heading.group(1)) <= 2 and (
+            _CHAPTER_PREFIX.match(re.sub(r"[*`]", "", heading.group(2)).strip())
+            or _normalize_title(heading.group(2)) == target
+        ):
+            lines = lines[1:]
+        else:
+            break
+    return lines
+
+
+def shift_headings(lines: List[str], min_level: int = 3) -> List[str]:
+    """整体平移章内标题，使最浅的一级不高于 min_level；代码块内的 # 不处理"""
+    in_code = False
+    levels = []
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+            continue
+        match = _HEADING.match(line) if not in_code else None
+        if match:
+            levels.append(len(match.group(1)))
+    if not levels or min(levels) >= min_level:
+        return lines
+
+    offset = min_level - min(levels)
+    shifted, in_code = [], False
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = _HEADING.match(line) if not in_code else None
+        if match:
+            level = min(6, len(match.group(1)) + offset)
+            line = f"{'#' * level} {match.group(2)}"
+        shifted.append(line)
+    return shifted
+
+
+def compile_chapter(index: int, title: str, content: str) -> str:
+    lines = _drop_leading_noise(_strip_wrapper(content).splitlines(), title)
+    body = "\n".join(shift_headings(lines)).strip()
+    return f"## 第{index}章 {_normalize_title(title)}\n\n{body}"
+
+
+def build_header(industry: str, province: str, target_year, focus: str, report_date: Optional[str] = None) -> str:
+    report_date = report_date or datetime.datetime.now().strftime('%Y年%m月%d日')
+    return f"""# {industry}行业深度研究报告
+
+**研究区域**：{province}
+**目标年份**：{target_year}
+**报告日期**：{report_date}
+**研究侧重点**：{focus}
+
+---
+
+> **免责声明**：本报告基于公开信息和数据分析，仅供参考，不构成投资建议。投资者据此操作，风险自担。
+
+---
+
+"""
+
+
+def build_footer(plan_struct: Dict) -> str:
+    sources = []
+    for chapter in plan_struct.get("chapters", []):
+        for item in re.split(r"[\n；;]+", chapter.get("data_sources", "") or ""):
+            item = item.strip(" -*•、")
+            if item and item not in sources:
+                sources.append(item)
+    lines = ["---", "", "## 数据来源说明", ""]
+    if sources:
+        lines.extend(f"- {item}" for item in sources)
+    else:
+        lines.append("- 公开网络数据、上市公司公告与本地知识库研报")
+    lines.append("- 文中数据以各来源发布时点为准，部分为研究团队基于公开数据的测算")
+    return "\n".join(lines) + "\n"
+
+
+def compile_report(plan_struct: Dict, chapters: List[Dict], header: str = "") -> str:
+    """
+    按 Planner 章节顺序组装全文
+
+    Args:
+        plan_struct: parse_planner_output 的结果，用于尾部数据来源
+        chapters: [{"title", "content"}]，顺序与 plan_struct["chapters"] 一致（均已成功生成）
+        header: 报告头部，通常由 build_header 生成
+    """
+    sections = [
+        compile_chapter(index, chapter["title"], chapter["content"])
+        for index, chapter in enumerate(chapters, start=1)
+    ]
+    return header + "\n\n".join(sections) + "\n\n" + build_footer(plan_struct)
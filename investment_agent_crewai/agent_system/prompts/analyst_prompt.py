@@ -24,6 +24,9 @@ ANALYST_PROMPT = """
 
 （你已获得 Researcher 输出的数据汇总，请直接基于这些信息分析）
 
+【Researcher 数据汇总（已按相关度精选）】
+{research_summary}
+
 ==============================
 【六大研究维度分析框架】
 ==============================
@@ -312,7 +312,7 @@ RESEARCHER_INDUSTRY_PROMPT = """
 - 仅描述产业规模是否集中、是否存在省份差异（不做评价）
 
 【市场规模数据】
-| 维度 | {target_year-2} | {target_year-1} | {target_year}E | {target_year+2}E | CAGR | 来源 |
+| 维度 | {year_minus_2} | {year_minus_1} | {target_year}E | {year_plus_2}E | CAGR | 来源 |
 | 全球 | | | | | | |
 | 中国 | | | | | | |
 | {province} | | | | | | |
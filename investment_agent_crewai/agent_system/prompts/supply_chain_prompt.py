@@ -198,7 +198,7 @@ MARKET_SIZE_TREND_PROMPT = """
 ==============================
 
 【市场规模汇总】
-| 维度 | {target_year-2}年 | {target_year-1}年 | {target_year}年E | {target_year+2}年E | CAGR |
+| 维度 | {year_minus_2}年 | {year_minus_1}年 | {target_year}年E | {year_plus_2}年E | CAGR |
 | 全球 | | | | | |
 | 中国 | | | | | |
 | {province} | | | | | |
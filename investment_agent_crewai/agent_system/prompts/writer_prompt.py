@@ -22,6 +22,10 @@ WRITER_PROMPT = """
 【全局研究大纲（仅用于保持上下文一致，不要重复）】
 {global_outline}
 
+==============================
+【与本章相关的研究数据（来自 Researcher）】
+{chapter_research}
+
 ==============================
 【已完成的分析结论摘要（来自 Analyst）】
 {analysis_summary}
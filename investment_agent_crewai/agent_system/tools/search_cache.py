@@ -0,0 +1,214 @@
+# agent_system/tools/search_cache.py
+"""
+Serper 搜索结果持久化缓存
+
+- 以「规范化查询 + 结果条数」做内容寻址，跨进程、跨报告复用
+- 按查询族设置不同有效期：政策类变化快，产业链结构相对稳定
+- 超过容量上限时按最近访问时间（LRU）淘汰
+- 统计命中/未命中次数，便于评估 API 成本节省
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
+SEARCH_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "search_cache.sqlite3")
+
+# 各查询族的有效期（小时）
+TTL_HOURS_BY_FAMILY = {
+    "policy": 24 * 3,
+    "market_size": 24 * 14,
+    "company": 24 * 7,
+    "business_model": 24 * 30,
+    "supply_chain": 24 * 30,
+    "ticker": 24 * 90,
+    "general": 24 * 3,
+}
+
+# 查询族识别规则（按顺序匹配，先命中者优先）
+FAMILY_PATTERNS = [
+    ("ticker", r"股票代码|stock ticker"),
+    ("policy", r"政策|补贴|扶持|规划|监管|十四五|规范"),
+    ("supply_chain", r"产业链|上游|中游|下游"),
+    ("market_size", r"市场规模|行业规模|渗透率|市场空间|cagr"),
+    ("business_model", r"商业模式|盈利模式|收入结构|成本结构|毛利率"),
+    ("company", r"龙头企业|上市公司|独角兽|营收|净利润"),
+]
+
+
+def normalize_query(query: str) -> str:
+    """统一大小写、全角逗号与空白，使语义相同的查询落到同一个键上。"""
+    text = (query or "").strip().lower()
+    text = text.replace("，", ",").replace("　", " ")
+    return re.sub(r"\s+", " ", text)
+
+
+def classify_query(query: str) -> str:
+    normalized = normalize_query(query)
+    for family, pattern in FAMILY_PATTERNS:
+        if re.search(pattern, normalized):
+            return family
+    return "general"
+
+
+class SearchResultCache:
+    """
+    基于 SQLite 的搜索结果缓存
+    - 延迟打开数据库，import 时不产生文件 IO
+    - 单连接 + 锁，支持多线程并发读写
+    """
+
+    def __init__(
+        self,
+        db_path: str = SEARCH_CACHE_PATH,
+        max_entries: int = 5000,
+        ttl_hours_by_family: Optional[Dict[str, int]] = None,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_hours_by_family = dict(TTL_HOURS_BY_FAMILY)
+        if ttl_hours_by_family:
+            self.ttl_hours_by_family.update(ttl_hours_by_family)
+
+        self._conn = None
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(query: str, n_results: int) -> str:
+        raw = f"{normalize_query(query)}|n={int(n_results)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    family TEXT NOT NULL,
+                    n_results INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _ttl_seconds(self, family: str) -> float:
+        hours = self.ttl_hours_by_family.get(family, self.ttl_hours_by_family["general"])
+        return hours * 3600
+
+    def get(self, query: str, n_results: int = 5) -> Optional[Any]:
+        key = self.make_key(query, n_results)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            payload, expires_at = row
+            if expires_at < now:
+                conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                conn.commit()
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._counters["hits"] += 1
+
+        return json.loads(payload)
+
+    def set(self, query: str, value: Any, n_results: int = 5, family: Optional[str] = None):
+        family = family or classify_query(query)
+        key = self.make_key(query, n_results)
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO search_cache
+                    (key, query, family, n_results, payload, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, normalize_query(query), family, int(n_results), payload,
+                 now, now + self._ttl_seconds(family), now),
+            )
+            self._evict_if_needed(conn)
+            conn.commit()
+
+    def _evict_if_needed(self, conn: sqlite3.Connection):
+        size = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        overflow = size - self.max_entries
+        if overflow <= 0:
+            return
+        conn.execute(
+            """
+            DELETE FROM search_cache WHERE key IN (
+                SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?
+            )
+            """,
+            (overflow,),
+        )
+        self._counters["evictions"] += overflow
+
+    def get_or_fetch(
+        self,
+        query: str,
+        fetcher: Callable[[], Any],
+        n_results: int = 5,
+        family: Optional[str] = None,
+    ) -> Any:
+        """命中直接返回；未命中调用 fetcher 并写入缓存（异常不缓存）。"""
+        cached = self.get(query, n_results)
+        if cached is not None:
+            return cached
+
+        result = fetcher()
+        if result:
+            self.set(query, result, n_results=n_results, family=family)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["size"] = size
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM search_cache")
+            conn.commit()
+
+
+search_cache = SearchResultCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+)
@@ -0,0 +1,147 @@
+# agent_system/tools/search_executor.py
+"""
+多查询工具的并发执行器
+
+- 所有搜索工具共享一个有界线程池，避免并发研究时线程数失控
+- 结果按输入顺序返回
+- 单条子查询超时从其真正开始执行时计时（排队时间不计入）
+- 整批另有总时限（从提交时计时）：线程池被卡死的请求占满时，仍在排队的子查询到期即判超时，
+  调用方不会无限等待
+- 失败/超时的子查询以结构化结果返回，由调用方决定如何呈现
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BoundedSearchExecutor:
+    """有界并发的子查询执行器（线程池延迟创建）"""
+
+    def __init__(self, max_workers: int = 8, default_timeout: float = 30.0, batch_timeout: float = 60.0):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.batch_timeout = batch_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="search"
+                )
+            return self._pool
+
+    def map_ordered(
+        self,
+        fn: Callable[[str], Any],
+        queries: List[str],
+        timeout: Optional[float] = None,
+        batch_timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        并发执行 fn(query)，返回与 queries 等长、同序的结果列表：
+        {"query", "ok", "result", "error", "elapsed"}
+
+        timeout：单条子查询从开始执行起的时限；batch_timeout：整批从提交起的总时限
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        batch_timeout = self.batch_timeout if batch_timeout is None else batch_timeout
+        pool = self._get_pool()
+        started: Dict[int, float] = {}
+        finished: Dict[int, float] = {}
+
+        def _task(idx: int, query: str):
+            started[idx] = time.monotonic()
+            try:
+                return fn(query)
+            finally:
+                finished[idx] = time.monotonic()
+
+        submitted = time.monotonic()
+        batch_deadline = submitted + batch_timeout
+        futures = [pool.submit(_task, i, q) for i, q in enumerate(queries)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending = set(range(len(queries)))
+
+        while pending:
+            now = time.monotonic()
+            # 已开始执行且超时的子查询直接判定失败（线程无法强杀，结果将被丢弃）
+            for idx in list(pending):
+                if idx in started and not futures[idx].done() and now - started[idx] > timeout:
+                    futures[idx].cancel()
+                    results[idx] = {
+                        "query": queries[idx],
+                        "ok": False,
+                        "result": None,
+                        "error": f"timeout after {timeout:g}s",
+                        "elapsed": round(now - started[idx], 3),
+                    }
+                    pending.discard(idx)
+
+            # 超过整批时限：仍在排队或执行中的子查询一律判超时（排队的从线程池中取消）
+            if now >= batch_deadline:
+                for idx in list(pending):
+                    if futures[idx].done():
+                        continue
+                    futures[idx].cancel()
+                    results[idx] = {
+                        "query": queries[idx],
+                        "ok": False,
+                        "result": None,
+                        "error": f"batch timeout after {batch_timeout:g}s"
+                        + ("" if idx in started else " (never started)"),
+                        "elapsed": round(now - started.get(idx, submitted), 3),
+                    }
+                    pending.discard(idx)
+
+            for idx in list(pending):
+                future = futures[idx]
+                if not future.done():
+                    continue
+                elapsed = round(finished.get(idx, now) - started.get(idx, now), 3)
+                try:
+                    results[idx] = {
+                        "query": queries[idx],
+                        "ok": True,
+                        "result": future.result(),
+                        "error": None,
+                        "elapsed": elapsed,
+                    }
+                except Exception as e:
+                    results[idx] = {
+                        "query": queries[idx],
+                        "ok": False,
+                        "result": None,
+                        "error": f"{type(e).__name__}: {e}",
+                        "elapsed": elapsed,
+                    }
+                pending.discard(idx)
+
+            if not pending:
+                break
+
+            # 等到最早的超时点或任一子查询完成；有尚未开始的子查询时短轮询
+            deadlines = [started[i] + timeout for i in pending if i in started] + [batch_deadline]
+            wait_for = min(deadlines) - time.monotonic()
+            if any(i not in started for i in pending):
+                wait_for = min(wait_for, 0.1)
+            wait([futures[i] for i in pending], timeout=max(wait_for, 0.01), return_when=FIRST_COMPLETED)
+
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+search_executor = BoundedSearchExecutor(
+    max_workers=int(os.getenv("SEARCH_MAX_WORKERS", "8")),
+    default_timeout=float(os.getenv("SEARCH_QUERY_TIMEOUT", "30")),
+    batch_timeout=float(os.getenv("SEARCH_BATCH_TIMEOUT", "60")),
+)
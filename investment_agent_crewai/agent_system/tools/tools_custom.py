@@ -4,19 +4,54 @@
 from crewai.tools import BaseTool
 from crewai_tools import SerperDevTool
 from agent_system.knowledge import kb_manager
+from agent_system.tools.search_cache import search_cache
+from agent_system.tools.search_executor import search_executor
 import yfinance as yf
 import akshare as ak  
 from pypdf import PdfReader
 import os
 import re 
+from typing import Optional
 import numpy as np
 import pandas as pd
 import numpy_financial as npf 
 
+class CachedSerperDevTool(SerperDevTool):
+    """
+    带持久化缓存的 Serper 搜索
+    - Agent 直接调用与自定义工具内部调用都会经过 search_cache
+    - 兼容 run("查询") 位置参数与 run(search_query="查询") 关键字参数
+    - family 指定查询族（决定缓存有效期，见 search_cache.TTL_HOURS_BY_FAMILY）；
+      未指定时按查询文本分类
+    """
+
+    family: Optional[str] = None
+
+    def _run(self, *args, **kwargs):
+        query = args[0] if args else (kwargs.pop("search_query", None) or kwargs.pop("query", None))
+        if not query:
+            return super()._run(**kwargs)
+
+        n_results = kwargs.get("n_results") or self.n_results
+        fetch = super()._run
+        return search_cache.get_or_fetch(
+            query,
+            lambda: fetch(search_query=query, **kwargs),
+            n_results=n_results,
+            family=self.family,
+        )
+
+
 # 升级版工具：支持直接输入中文公司名
 # 初始化搜索工具
 # search_tool 直接传给 Agent 的 tools 列表即可
-serper_tool = SerperDevTool(n_results=5)
+serper_tool = CachedSerperDevTool(n_results=5)
+# 专项搜索工具内部使用：按工具所属查询族缓存，不依赖查询文本分类
+# （如"产业链 规划"类查询不会被误判为政策族而只缓存 3 天）
+family_serper_tools = {
+    family: CachedSerperDevTool(n_results=5, family=family)
+    for family in ("ticker", "policy", "supply_chain", "market_size", "company", "business_model")
+}
 
 
 class StockAnalysisTool(BaseTool):
@@ -87,7 +122,7 @@ class StockAnalysisTool(BaseTool):
 
         try:
             search_query = f"{query} 股票代码 stock ticker"
-            result = serper_tool.run(search_query)
+            result = family_serper_tools["ticker"].run(search_query)
             
             match_a = re.search(r'(code|代码|ticker)[:\s]*(\d{6})', result, re.IGNORECASE)
             match_num = re.search(r'\b(60\d{4}|00\d{4}|30\d{4})\b', result)
@@ -256,25 +291,74 @@ class MeetingNotesAggregator(BaseTool):
             return f"Error reading files: {str(e)}"
 
 
+# RAG 工具单次输出的 token 上限（去重后仍超出时按证据块截断）
+RAG_TOOL_MAX_TOKENS = int(os.getenv("RAG_TOOL_MAX_TOKENS", "2000"))
+
+
 class RAGSearchTool(BaseTool):
     name: str = "Search Local Knowledge Base"
-    description: str = "Useful for finding specific details in local reports. Input should be a specific question."
+    description: str = (
+        "Useful for finding specific details in local reports. Input should be a specific question; "
+        "several related questions can be sent at once, one per line or separated by '；'."
+    )
 
     def _run(self, query: str) -> str:
         try:
-            evidence = kb_manager.query_with_reasoning(query, n_results=5, max_rounds=2)
+            sub_queries = [q.strip() for q in re.split(r"[\n；;]+", query) if q.strip()]
+            # 输出受 token 预算约束：证据约占 3/4，完整表格约占 1/4
+            evidence_budget = RAG_TOOL_MAX_TOKENS * 3 // 4
+            if len(sub_queries) > 1:
+                # 多个相关问题：一次批量嵌入 + 一次向量库查询
+                evidence = kb_manager.query_many(sub_queries, n_results=3, max_tokens=evidence_budget)
+            else:
+                evidence = kb_manager.query_with_reasoning(query, n_results=5, max_rounds=3, max_tokens=evidence_budget)
+            tables = kb_manager.query_tables(query, n_results=2, max_tokens=RAG_TOOL_MAX_TOKENS - evidence_budget)
             instruction = """
             【重要指令】：
             使用上述信息回答时，必须在句尾标注来源，格式为 [来源: 文件名]。
             如果信息中包含具体数字，必须保留原始上下文。
             """
-            if not evidence:
+            if not evidence and not tables:
                 return "No relevant info found in local database."
-            return f"{instruction}\n\n相关知识库内容:\n{evidence}"
+            output = f"{instruction}\n\n相关知识库内容:\n{evidence}"
+            if tables:
+                output += f"\n\n相关完整表格:\n{tables}"
+            return output
         except Exception as e:
             return f"Error querying knowledge base: {str(e)}"
 
 
+# ============================================================
+# 多查询搜索公共逻辑：子查询并发执行 + 失败显式上报
+# ============================================================
+def _run_search_queries(queries: list, family: str) -> tuple:
+    """
+    并发执行多条 Serper 子查询（保持原顺序），结果按 family 查询族缓存
+    返回 (成功结果段落列表, 失败说明列表)
+    """
+    outcomes = search_executor.map_ordered(family_serper_tools[family].run, queries)
+    found, failed = [], []
+    for item in outcomes:
+        if item["ok"] and item["result"]:
+            found.append(f"【查询: {item['query']}】\n{item['result']}\n")
+        else:
+            failed.append(f"- {item['query']}: {item['error'] or '无结果'}")
+    return found, failed
+
+
+def _format_search_output(header: str, found: list, failed: list, empty_message: str) -> str:
+    failure_note = ""
+    if failed:
+        failure_note = f"\n【部分子查询失败（{len(failed)}/{len(found) + len(failed)}）】\n" + "\n".join(failed)
+
+    if not found:
+        return empty_message + failure_note
+
+    output = header + "\n" + "=" * 50 + "\n\n"
+    output += "\n".join(found)
+    return output + failure_note
+
+
 # ============================================================
 # 新增工具：产业链专项搜索
 # ============================================================
@@ -295,22 +379,12 @@ class SupplyChainSearchTool(BaseTool):
                 f"{industry} 产业链 龙头企业 市场份额"
             ]
             
-            all_results = []
-            for query in queries:
-                try:
-                    result = serper_tool.run(query)
-                    all_results.append(f"【查询: {query}】\n{result}\n")
-                except:
-                    continue
-            
-            if not all_results:
-                return f"未找到 {industry} 行业的产业链信息"
+            found, failed = _run_search_queries(queries, "supply_chain")
             
-            output = f"【{industry}】产业链搜索结果\n"
-            output += "=" * 50 + "\n\n"
-            output += "\n".join(all_results)
-            
-            return output
+            return _format_search_output(
+                f"【{industry}】产业链搜索结果", found, failed,
+                f"未找到 {industry} 行业的产业链信息"
+            )
         except Exception as e:
             return f"产业链搜索失败: {str(e)}"
 
@@ -336,24 +410,12 @@ class PolicySearchTool(BaseTool):
             
             queries.append(f"{industry} 监管政策 行业规范")
             
-            all_results = []
-            for q in queries:
-                try:
-                    result = serper_tool.run(q)
-                    all_results.append(f"【查询: {q}】\n{result}\n")
-                except:
-                    continue
+            found, failed = _run_search_queries(queries, "policy")
             
-            if not all_results:
-                return f"未找到 {industry} 行业的政策信息"
-            
-            output = f"【{industry}】政策搜索结果"
+            header = f"【{industry}】政策搜索结果"
             if province:
-                output += f"（{province}）"
-            output += "\n" + "=" * 50 + "\n\n"
-            output += "\n".join(all_results)
-            
-            return output
+                header += f"（{province}）"
+            return _format_search_output(header, found, failed, f"未找到 {industry} 行业的政策信息")
         except Exception as e:
             return f"政策搜索失败: {str(e)}"
 
@@ -375,22 +437,12 @@ class MarketSizeSearchTool(BaseTool):
                 f"{industry} 渗透率 市场空间"
             ]
             
-            all_results = []
-            for q in queries:
-                try:
-                    result = serper_tool.run(q)
-                    all_results.append(f"【查询: {q}】\n{result}\n")
-                except:
-                    continue
-            
-            if not all_results:
-                return f"未找到 {industry} 行业的市场规模数据"
-            
-            output = f"【{industry}】市场规模搜索结果（{region}）\n"
-            output += "=" * 50 + "\n\n"
-            output += "\n".join(all_results)
+            found, failed = _run_search_queries(queries, "market_size")
             
-            return output
+            return _format_search_output(
+                f"【{industry}】市场规模搜索结果（{region}）", found, failed,
+                f"未找到 {industry} 行业的市场规模数据"
+            )
         except Exception as e:
             return f"市场规模搜索失败: {str(e)}"
 
@@ -416,24 +468,12 @@ class CompanySearchTool(BaseTool):
             queries.append(f"{industry} 企业 营收 净利润 对比")
             queries.append(f"{industry} 独角兽 融资 估值")
             
-            all_results = []
-            for q in queries:
-                try:
-                    result = serper_tool.run(q)
-                    all_results.append(f"【查询: {q}】\n{result}\n")
-                except:
-                    continue
-            
-            if not all_results:
-                return f"未找到 {industry} 行业的企业信息"
+            found, failed = _run_search_queries(queries, "company")
             
-            output = f"【{industry}】企业搜索结果"
+            header = f"【{industry}】企业搜索结果"
             if province:
-                output += f"（{province}）"
-            output += "\n" + "=" * 50 + "\n\n"
-            output += "\n".join(all_results)
-            
-            return output
+                header += f"（{province}）"
+            return _format_search_output(header, found, failed, f"未找到 {industry} 行业的企业信息")
         except Exception as e:
             return f"企业搜索失败: {str(e)}"
 
@@ -453,22 +493,12 @@ class BusinessModelSearchTool(BaseTool):
                 f"{industry} 龙头企业 财务分析"
             ]
             
-            all_results = []
-            for q in queries:
-                try:
-                    result = serper_tool.run(q)
-                    all_results.append(f"【查询: {q}】\n{result}\n")
-                except:
-                    continue
+            found, failed = _run_search_queries(queries, "business_model")
             
-            if not all_results:
-                return f"未找到 {industry} 行业的商业模式信息"
-            
-            output = f"【{industry}】商业模式搜索结果\n"
-            output += "=" * 50 + "\n\n"
-            output += "\n".join(all_results)
-            
-            return output
+            return _format_search_output(
+                f"【{industry}】商业模式搜索结果", found, failed,
+                f"未找到 {industry} 行业的商业模式信息"
+            )
         except Exception as e:
             return f"商业模式搜索失败: {str(e)}"
 
@@ -0,0 +1,237 @@
+# agent_system/workflows/batch_research.py
+"""
+批量行业研究（行业 × 省份矩阵）
+
+- 同一行业（及年份、侧重点）下，与省份无关的维度（财务、商业模式，见 NATIONAL_DIMENSIONS）
+  按"全国"口径只研究一次，结果落盘后复用到该行业的所有省份；
+  每增加一个省份只新增省级维度与后续分析 / 写作，总成本随省份数亚线性增长
+- 单元格在有界线程池中执行（BATCH_MAX_CELLS），单元格内的研究 / 写作并发由
+  全局 crew 预算（BATCH_CREW_BUDGET）平均分配；相邻单元格启动之间至少间隔
+  BATCH_CELL_START_INTERVAL 秒，避免同时涌向 LLM / 搜索接口
+- 每个单元格仍是独立的检查点流水线：批量中断后以相同参数重跑，已完成的单元格与阶段直接复用
+- 输出目录 output/batches/<batch_id>/：各单元格报告、共享维度缓存与汇总索引 index.md / index.json
+
+命令行：
+    python -m agent_system.workflows.batch_research --industries 半导体 储能 --provinces 浙江省 江苏省
+"""
+
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from agent_system.schemas.research_input import IndustryResearchInput
+from agent_system.workflows.industry_research import research_national_dimensions, run_industry_research
+from agent_system.workflows.pipeline import PROJECT_ROOT, compute_run_id, safe_filename
+
+BATCH_MAX_CELLS = int(os.getenv("BATCH_MAX_CELLS", "3"))
+BATCH_CREW_BUDGET = int(os.getenv("BATCH_CREW_BUDGET", "8"))
+BATCH_CELL_START_INTERVAL = float(os.getenv("BATCH_CELL_START_INTERVAL", "5"))
+BATCHES_DIR = os.path.join(PROJECT_ROOT, "output", "batches")
+
+
+def build_matrix(industries: List[str], provinces: List[str], **common: Any) -> List[IndustryResearchInput]:
+    """行业 × 省份笛卡尔积，common 为各单元格共用的参数（target_year / focus 等）"""
+    return [
+        IndustryResearchInput(industry=industry, province=province, **common)
+        for industry in industries
+        for province in provinces
+    ]
+
+
+def _share_key(cell: IndustryResearchInput) -> tuple:
+    """同一共享键下的单元格复用全国维度：除省份外的全部输入参数"""
+    params = cell.model_dump()
+    params.pop("province")
+    return tuple(sorted((k, json.dumps(v, ensure_ascii=False, default=str)) for k, v in params.items()))
+
+
+class _SharedDimensions:
+    """按共享键懒计算全国维度：首个需要的单元格负责研究，其余单元格等待并复用"""
+
+    def __init__(self, cache_dir: str, research_workers: int):
+        self.cache_dir = cache_dir
+        self.research_workers = research_workers
+        self._results: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def _cache_path(self, cell: IndustryResearchInput) -> str:
+        params = {**cell.model_dump(), "province": "全国"}
+        return os.path.join(self.cache_dir, f"{safe_filename(cell.industry)}_{compute_run_id(params)}.json")
+
+    def get(self, cell: IndustryResearchInput) -> Dict[str, Dict[str, Any]]:
+        key = _share_key(cell)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._results:
+                    self.reused += 1
+                    return self._results[key]
+
+            path = self._cache_path(cell)
+            results = None
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    results = json.load(f)
+            if results is None:
+                results = research_national_dimensions(cell, research_workers=self.research_workers)
+                # 失败的维度不缓存，交由各单元格自行研究
+                results = {key_: outcome for key_, outcome in results.items() if outcome["ok"]}
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                with self._lock:
+                    self.computed += 1
+            else:
+                with self._lock:
+                    self.reused += 1
+
+            with self._lock:
+                self._results[key] = results
+            return results
+
+
+def _write_index(batch_dir: str, batch_id: str, cells: List[Dict[str, Any]], stats: Dict[str, Any]):
+    with open(os.path.join(batch_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"batch_id": batch_id, "stats": stats, "cells": cells}, f, ensure_ascii=False, indent=2)
+
+    lines = [
+        f"# 批量行业研究索引（{batch_id}）",
+        "",
+        f"- 生成时间：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        f"- 单元格：{stats['done']}/{stats['total']} 完成，{stats['failed']} 失败，总用时 {stats['elapsed']}s",
+        f"- 共享全国维度：研究 {stats['shared_computed']} 次，复用 {stats['shared_reused']} 次",
+        "",
+        "| 行业 | 省份 | 状态 | 用时(s) | 报告 |",
+        "|------|------|------|---------|------|",
+    ]
+    for cell in cells:
+        status = "✅ 完成" if cell["ok"] else f"❌ {cell['error']}"
+        report = f"[{cell['report_file']}]({cell['report_file']})" if cell["report_file"] else "-"
+        lines.append(f"| {cell['industry']} | {cell['province']} | {status} | {cell['elapsed']} | {report} |")
+    with open(os.path.join(batch_dir, "index.md"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def run_batch_research(
+    cells: List[Dict | IndustryResearchInput],
+    max_cells: Optional[int] = None,
+    crew_budget: Optional[int] = None,
+    start_interval: Optional[float] = None,
+    share_national: bool = True,
+    resume: bool = True
+) -> Dict[str, Any]:
+    """
+    批量执行行业研究
+
+    Args:
+        cells: 单元格输入列表（可用 build_matrix 生成）
+        max_cells: 同时运行的单元格上限，默认 BATCH_MAX_CELLS
+        crew_budget: 全局同时运行的 crew 上限，平均分给各单元格，默认 BATCH_CREW_BUDGET
+        start_interval: 相邻单元格启动的最小间隔（秒），默认 BATCH_CELL_START_INTERVAL
+        share_national: 是否在同一行业的省份之间共享全国维度
+        resume: 传给各单元格的流水线，中断后从断点继续
+
+    Returns:
+        {"batch_id", "batch_dir", "index_path", "stats", "cells"}
+    """
+    cells = [IndustryResearchInput(**c) if isinstance(c, dict) else c for c in cells]
+    max_cells = max(1, min(max_cells or BATCH_MAX_CELLS, len(cells) or 1))
+    per_cell_workers = max(1, (crew_budget or BATCH_CREW_BUDGET) // max_cells)
+    start_interval = BATCH_CELL_START_INTERVAL if start_interval is None else start_interval
+
+    batch_id = compute_run_id({"cells": [c.model_dump() for c in cells]})
+    batch_dir = os.path.join(BATCHES_DIR, batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    shared = _SharedDimensions(os.path.join(batch_dir, "shared"), per_cell_workers)
+
+    print(f"📦 批量研究 {batch_id}：{len(cells)} 个单元格，并发 {max_cells}，每单元格 crew 上限 {per_cell_workers}")
+
+    start_lock = threading.Lock()
+    last_start = [0.0]
+
+    def _run_cell(cell: IndustryResearchInput) -> Dict[str, Any]:
+        # 启动节流：相邻单元格错开启动
+        with start_lock:
+            wait = last_start[0] + start_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            last_start[0] = time.monotonic()
+
+        started = time.monotonic()
+        record = {"industry": cell.industry, "province": cell.province, "target_year": cell.target_year,
+                  "ok": False, "error": None, "report_file": None, "elapsed": 0.0}
+        try:
+            shared_dimensions = shared.get(cell) if share_national else None
+            report = run_industry_research(
+                cell,
+                research_workers=per_cell_workers,
+                writer_workers=per_cell_workers,
+                resume=resume,
+                shared_dimensions=shared_dimensions,
+            )
+            # 行业 / 省份来自 API 输入：文件名只保留安全字符，并以输入哈希区分清洗后同名的单元格
+            report_file = (
+                f"{cell.target_year}_{safe_filename(cell.province)}_{safe_filename(cell.industry)}"
+                f"_{compute_run_id(cell.model_dump())[:8]}.md"
+            )
+            with open(os.path.join(batch_dir, report_file), "w", encoding="utf-8") as f:
+                f.write(report)
+            record.update(ok=True, report_file=report_file)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["elapsed"] = round(time.monotonic() - started, 1)
+        return record
+
+    batch_started = time.monotonic()
+    records: Dict[int, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max_cells, thread_name_prefix="batch") as pool:
+        futures = {pool.submit(_run_cell, cell): idx for idx, cell in enumerate(cells)}
+        for future in as_completed(futures):
+            record = future.result()
+            records[futures[future]] = record
+            status = "✅" if record["ok"] else "⚠️"
+            print(f"{status} 单元格【{record['industry']} | {record['province']}】完成，用时 {record['elapsed']}s"
+                  f"（{len(records)}/{len(cells)}）")
+
+    ordered = [records[idx] for idx in range(len(cells))]
+    stats = {
+        "total": len(cells),
+        "done": sum(1 for r in ordered if r["ok"]),
+        "failed": sum(1 for r in ordered if not r["ok"]),
+        "elapsed": round(time.monotonic() - batch_started, 1),
+        "shared_computed": shared.computed,
+        "shared_reused": shared.reused,
+    }
+    _write_index(batch_dir, batch_id, ordered, stats)
+    index_path = os.path.join(batch_dir, "index.md")
+    print(f"📑 批量索引：{index_path}")
+    return {"batch_id": batch_id, "batch_dir": batch_dir, "index_path": index_path, "stats": stats, "cells": ordered}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量行业研究（行业 × 省份）")
+    parser.add_argument("--industries", nargs="+", required=True)
+    parser.add_argument("--provinces", nargs="+", required=True)
+    parser.add_argument("--target-year", type=int, default=2025)
+    parser.add_argument("--focus", default="产业链深度分析与投资机会识别")
+    parser.add_argument("--max-cells", type=int, default=None)
+    parser.add_argument("--crew-budget", type=int, default=None)
+    parser.add_argument("--no-share", action="store_true", help="不共享全国维度（用于对比成本）")
+    args = parser.parse_args()
+
+    summary = run_batch_research(
+        build_matrix(args.industries, args.provinces, target_year=args.target_year, focus=args.focus),
+        max_cells=args.max_cells,
+        crew_budget=args.crew_budget,
+        share_national=not args.no_share,
+    )
+    print(json.dumps(summary["stats"], ensure_ascii=False))
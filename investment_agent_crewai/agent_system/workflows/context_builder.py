@@ -0,0 +1,129 @@
+# agent_system/workflows/context_builder.py
+"""
+按 token 预算组装 Analyst / Writer 提示词上下文
+
+原先每个章节任务都携带 str(research_structs)、完整 analysis_struct 与 plan_struct["raw_text"]，
+同一大段文本被重复发送 N 次。这里改为：
+- 研究纪要切成段落级事实，按与章节 research_questions / 标题的相关度挑选，截至预算
+- 分析结论按区块挑选，"投资逻辑总结"始终保留
+- 全局大纲只保留章节标题列表
+预算可通过环境变量调整：
+    CONTEXT_ANALYST_TOKENS    Analyst 可见的研究数据，默认 6000
+    CONTEXT_RESEARCH_TOKENS   每个章节可见的研究数据，默认 2500
+    CONTEXT_ANALYSIS_TOKENS   每个章节可见的分析结论，默认 1500
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+from rag.token_budget import estimate_tokens, truncate_to_budget
+from rag.tokenizer import tokenize
+
+CONTEXT_ANALYST_TOKENS = int(os.getenv("CONTEXT_ANALYST_TOKENS", "6000"))
+CONTEXT_RESEARCH_TOKENS = int(os.getenv("CONTEXT_RESEARCH_TOKENS", "2500"))
+CONTEXT_ANALYSIS_TOKENS = int(os.getenv("CONTEXT_ANALYSIS_TOKENS", "1500"))
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?\s*(?:%|亿|万|元)|\d{4}年")
+_ALWAYS_KEEP_SECTION = "投资逻辑总结"
+
+
+def split_facts(text: str, max_chars: int = 600) -> List[str]:
+    """按空行切成段落；过长段落（如大段列表）再按行切分，Markdown 表格保持完整"""
+    units = []
+    for block in re.split(r"\n\s*\n", text or ""):
+        block = block.strip()
+        if not block:
+            continue
+        lines = block.splitlines()
+        is_table = sum(1 for line in lines if line.strip().startswith("|")) >= len(lines) / 2
+        if len(block) <= max_chars or is_table:
+            units.append(block)
+        else:
+            units.extend(line.strip() for line in lines if line.strip())
+    return units
+
+
+def select_relevant(units: List[str], focus_text: str, max_tokens: int) -> str:
+    """
+    按相关度挑选文本单元，保持原有先后顺序输出
+    相关度 = 与 focus_text 检索词的重合比例 + 含数值事实的少量加分
+    """
+    focus_terms = set(tokenize(focus_text))
+    scored = []
+    for idx, unit in enumerate(units):
+        terms = set(tokenize(unit))
+        overlap = len(terms & focus_terms) / max(1, len(focus_terms)) if focus_terms else 0.0
+        bonus = 0.05 * min(3, len(_NUMBER.findall(unit)))
+        scored.append((overlap + bonus, idx, unit))
+    scored.sort(key=lambda x: (-x[0], x[1]))
+
+    chosen, used = [], 0
+    for _, idx, unit in scored:
+        cost = estimate_tokens(unit) + 1
+        if used + cost > max_tokens:
+            continue
+        chosen.append((idx, unit))
+        used += cost
+    if not chosen and scored:
+        # 单个单元就超出预算时，截断保留最相关的一个
+        return truncate_to_budget(scored[0][2], max_tokens)
+    return "\n\n".join(unit for _, unit in sorted(chosen))
+
+
+def compact_outline(plan_struct: Dict) -> str:
+    return "\n".join(
+        f"第{i}章 {chapter.get('title', '')}" for i, chapter in enumerate(plan_struct.get("chapters", []), start=1)
+    )
+
+
+def format_chapter_spec(chapter: Dict) -> str:
+    lines = [chapter.get("title", "")]
+    if chapter.get("word_target"):
+        lines.append(f"目标字数：{chapter['word_target']}")
+    if chapter.get("research_questions"):
+        lines.append("关键研究问题：")
+        lines.extend(f"- {q}" for q in chapter["research_questions"])
+    for table in chapter.get("tables", []):
+        fields = "、".join(table.get("fields", []))
+        lines.append(f"表格：{table.get('name', '')}（{fields}）" if fields else f"表格：{table.get('name', '')}")
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """一次切分研究纪要与分析结论，之后为每个章节按需挑选"""
+
+    def __init__(self, research_struct: Dict, analysis_struct: Optional[Dict] = None, plan_struct: Optional[Dict] = None):
+        # 汇总纪要未必遵循【区块】格式，直接基于原文切分
+        self.research_units = split_facts(research_struct.get("raw_text", ""))
+        self.analysis_struct = analysis_struct or {}
+        self.plan_struct = plan_struct or {}
+
+    def for_analyst(self, focus_text: str, max_tokens: int = CONTEXT_ANALYST_TOKENS) -> str:
+        return select_relevant(self.research_units, focus_text, max_tokens)
+
+    def outline(self) -> str:
+        return compact_outline(self.plan_struct)
+
+    @staticmethod
+    def chapter_focus(chapter: Dict, extra: str = "") -> str:
+        return " ".join([chapter.get("title", ""), *chapter.get("research_questions", []), extra])
+
+    def research_for(self, focus_text: str, max_tokens: int = CONTEXT_RESEARCH_TOKENS) -> str:
+        return select_relevant(self.research_units, focus_text, max_tokens)
+
+    def analysis_for(self, focus_text: str, max_tokens: int = CONTEXT_ANALYSIS_TOKENS) -> str:
+        """"投资逻辑总结"始终保留（至多占一半预算），其余区块按事实粒度挑选"""
+        head = ""
+        keep = self.analysis_struct.get(_ALWAYS_KEEP_SECTION)
+        if keep:
+            head = truncate_to_budget(f"【{_ALWAYS_KEEP_SECTION}】\n{keep}", max_tokens // 2)
+
+        units = [
+            f"[{title}] {fact}"
+            for title, body in self.analysis_struct.items()
+            if title != _ALWAYS_KEEP_SECTION
+            for fact in split_facts(body)
+        ]
+        selected = select_relevant(units, focus_text, max_tokens - estimate_tokens(head))
+        return f"{head}\n\n{selected}".strip()
@@ -0,0 +1,102 @@
+# agent_system/workflows/events.py
+"""
+研报生成事件流
+
+工作流通过 on_event 回调推送进度事件，UI / API 无需等待整份报告：
+    phase_start / phase_end / phase_cached / phase_failed   DAG 节点开始、结束、复用检查点、失败
+    agent_step                                               Agent 的思考 / 工具调用（来自 Crew step_callback）
+    chapter_done                                             单个章节完成，附带该章 Markdown 正文
+    report_done / error                                      全部完成（附带最终报告）或异常终止
+
+事件均为可 JSON 序列化的 dict，至少包含 type 与 ts 字段。
+iter_events 把回调式的运行函数转换为生成器，供 Streamlit 逐条渲染。
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+# 工具入参 / 观察结果在事件中保留的最大字符数，避免把整段检索结果推给前端
+STEP_PREVIEW_CHARS = 300
+
+
+def make_event(event_type: str, **payload) -> Dict[str, Any]:
+    return {"type": event_type, "ts": time.time(), **payload}
+
+
+def emit(on_event: Optional[EventCallback], event_type: str, **payload):
+    """推送事件；回调本身的异常不影响工作流"""
+    if on_event is None:
+        return
+    try:
+        on_event(make_event(event_type, **payload))
+    except Exception as e:
+        print(f"⚠️ [Events] 事件回调失败：{type(e).__name__}: {e}")
+
+
+def _preview(value: Any) -> str:
+    text = str(value or "").strip()
+    return text if len(text) <= STEP_PREVIEW_CHARS else text[:STEP_PREVIEW_CHARS] + "…"
+
+
+def describe_step(step: Any) -> Dict[str, Any]:
+    """
+    将 Crew step_callback 收到的对象（AgentAction / AgentFinish / ToolResult 等，
+    不同 crewai 版本字段略有差异）转换为精简的事件字段
+    """
+    tool = getattr(step, "tool", None)
+    if tool:
+        return {
+            "kind": "tool_call",
+            "tool": str(tool),
+            "tool_input": _preview(getattr(step, "tool_input", "")),
+            "thought": _preview(getattr(step, "thought", "")),
+        }
+    if hasattr(step, "result") and not hasattr(step, "output"):
+        return {"kind": "tool_result", "result": _preview(step.result)}
+    return {
+        "kind": "finish" if hasattr(step, "output") else "thought",
+        "thought": _preview(getattr(step, "thought", "") or getattr(step, "output", "") or step),
+    }
+
+
+def step_callback_for(on_event: Optional[EventCallback], phase: str, label: str = "") -> Optional[Callable[[Any], None]]:
+    """为某个阶段（及维度 / 章节）生成 Crew step_callback；未订阅事件时返回 None"""
+    if on_event is None:
+        return None
+
+    def _callback(step: Any):
+        emit(on_event, "agent_step", phase=phase, label=label, **describe_step(step))
+
+    return _callback
+
+
+def iter_events(run: Callable[[EventCallback], Any]) -> Iterator[Dict[str, Any]]:
+    """
+    在后台线程执行 run(on_event)，逐条产出事件
+
+    最后一条总是 report_done（附带 run 的返回值 result）或 error。
+    调用方中途停止迭代时，后台线程仍会跑完（CrewAI 任务无法安全中断），
+    其后的事件被丢弃。
+    """
+    events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    finished = object()
+
+    def _worker():
+        try:
+            result = run(events.put)
+            events.put(make_event("report_done", result=result))
+        except Exception as e:
+            events.put(make_event("error", error=f"{type(e).__name__}: {e}"))
+        finally:
+            events.put(finished)
+
+    threading.Thread(target=_worker, name="report-events", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is finished:
+            return
+        yield event
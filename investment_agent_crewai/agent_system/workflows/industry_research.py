@@ -8,13 +8,19 @@ Phase 0: 定义 Agents
 Phase 1: Planner（规划）- 基于六大维度设计研究蓝图
 Phase 2: Researcher（并行研究）- 财务/政策/行业/产业链/商业模式
 Phase 3: Analyst（综合分析）- 六维度综合分析
-Phase 4: Writer（分章节并行写作）
+Phase 4: Writer（分章节并行写作，每章独立 Agent）+ 本地统稿
 Phase 5: Reviewer（终审）
+
+各阶段作为 DAG 节点执行，输出按输入哈希写入 output/runs/<run_id>/，
+中途失败后以相同输入重跑即可从断点继续。
+
+run_industry_research 可传入 on_event 回调接收进度事件（阶段起止、工具调用、
+已完成章节正文）；stream_industry_research 以生成器形式逐条产出这些事件。
 """
 
 import os
 import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 
 from crewai import Agent, Task, Crew, Process
 
@@ -23,6 +29,21 @@ from config.network import setup_network
 from config.llm import get_deepseek_llm
 
 from agent_system.schemas.research_input import IndustryResearchInput
+from agent_system.workflows.context_builder import (
+    CONTEXT_ANALYSIS_TOKENS,
+    CONTEXT_RESEARCH_TOKENS,
+    ContextBuilder,
+    format_chapter_spec
+)
+from agent_system.workflows.events import EventCallback, emit, iter_events, step_callback_for
+from agent_system.workflows.pipeline import ReportPipeline, safe_filename
+from agent_system.workflows.research_scheduler import (
+    build_agent_factory,
+    format_dimension_outputs,
+    raise_for_failures,
+    run_chapter_tasks,
+    run_research_dimensions
+)
 
 # ===== Prompts =====
 from agent_system.prompts.planner_prompt import PLANNER_PROMPT
@@ -45,6 +66,7 @@ from agent_system.prompts.reviewer_prompt import REVIEWER_PROMPT
 from agent_system.postprocess.planner_parser import parse_planner_output
 from agent_system.postprocess.researcher_parser import parse_researcher_output
 from agent_system.postprocess.analyst_parser import parse_analyst_output
+from agent_system.postprocess.report_compiler import build_header, compile_chapter, compile_report
 
 # ===== Tools =====
 from agent_system.tools.tools_custom import (
@@ -62,17 +84,146 @@ from memory_system.memory_manager import memory_manager
 # ============================================================
 setup_runtime_env()
 setup_network()
+# 限流优先级通道（见 config/rate_limiter.py）：规划 / 审核是关键路径上的单次调用，优先放行；
+# 章节写作并发最高，令牌紧张时让位
 llm = get_deepseek_llm()
+priority_llm = get_deepseek_llm(lane="priority")
+bulk_llm = get_deepseek_llm(lane="bulk")
+
+# ============================================================
+# 研究员 Agent 工厂与研究维度（批量模式共享全国维度时也会用到）
+# ============================================================
+# 研究员 Agent（通用）：使用工厂，每个研究维度各自持有独立实例
+build_researcher = build_agent_factory(
+    role="Senior Industry Data Researcher",
+    goal="搜集关键年份的财务、政策、产业链与商业模式数据",
+    backstory=(
+        "你是一名高效研究员，只关心可验证的数据、数字与结论。"
+        "避免长篇描述，优先结构化信息。"
+        "你特别擅长产业链数据搜集，能够清晰区分上游、中游、下游。"
+        "关键原则："
+        "1. 抓大放小：重点找龙头的营收/净利/市值，以及核心政策KPI。"
+        "2. 产业链视角：必须按上游/中游/下游分类整理数据。"
+        "3. 拒绝冗余：不需要搜集过于细枝末节的技术参数，关注商业落地的核心指标。"
+        "4. 拥有读取本地知识库的能力，只提取最关键的结论。"
+    ),
+    tools=[stock_analysis, serper_tool, read_pdf, rag_tool, recall_tool],
+    llm=llm,
+    verbose=True
+)
+
+# 产业链专项研究员 Agent
+build_supply_chain_researcher = build_agent_factory(
+    role="Supply Chain Research Specialist",
+    goal="深度梳理产业链上下游结构，识别各环节投资机会",
+    backstory=(
+        "你是一名产业链研究专家，专注于产业链深度分析。"
+        "你能够清晰识别上游原材料、中游制造、下游应用各环节。"
+        "你特别关注产业链价值分配、议价能力、投资机会。"
+        "你熟悉各行业的产业链图谱，能够快速定位关键环节。"
+    ),
+    tools=[stock_analysis, serper_tool, read_pdf, rag_tool, recall_tool],
+    llm=llm,
+    verbose=True,
+    max_iter=5,
+    max_execution_time=2400
+)
+
+# 五个研究维度的固定顺序
+DIMENSION_KEYS = ("finance", "policy", "industry", "supply_chain", "business_model")
+
+# 与省份无关、可在同一行业的多个省份之间共享的维度（按"全国"口径研究一次）
+NATIONAL_DIMENSIONS = ("finance", "business_model")
+
+
+def build_dimension_specs(prompt_vars: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按 DIMENSION_KEYS 顺序返回五个研究维度的调度定义（见 research_scheduler）"""
+    # 提示词表头中的相对年份（str.format 不支持 {target_year-2} 这类表达式）
+    year = int(prompt_vars["target_year"])
+    prompt_vars = {**prompt_vars, "year_minus_2": year - 2, "year_minus_1": year - 1, "year_plus_2": year + 2}
+    return [
+        {
+            # 1. 财务数据研究
+            "key": "finance",
+            "label": "财务",
+            "description": RESEARCHER_FINANCE_PROMPT.format(**prompt_vars),
+            "expected_output": "一份包含5-8家龙头企业财务指标的原始财务数据列表，按产业链环节分类",
+            "agent_factory": build_researcher,
+        },
+        {
+            # 2. 政策研究
+            "key": "policy",
+            "label": "政策",
+            "description": RESEARCHER_POLICY_PROMPT.format(**prompt_vars),
+            "expected_output": "一份包含国家和省级政策的汇总表，标注对产业链各环节的影响",
+            "agent_factory": build_researcher,
+        },
+        {
+            # 3. 行业规模研究
+            "key": "industry",
+            "label": "行业",
+            "description": RESEARCHER_INDUSTRY_PROMPT.format(**prompt_vars),
+            "expected_output": "一份包含行业规模、增速、竞争格局的数据汇总",
+            "agent_factory": build_researcher,
+        },
+        {
+            # 4. 产业链专项研究（核心任务）
+            "key": "supply_chain",
+            "label": "产业链",
+            "description": RESEARCHER_SUPPLY_CHAIN_PROMPT.format(**prompt_vars),
+            "expected_output": "一份完整的产业链深度分析报告，包含上游/中游/下游各环节详细数据",
+            "agent_factory": build_supply_chain_researcher,
+        },
+        {
+            # 5. 商业模式研究
+            "key": "business_model",
+            "label": "商业模式",
+            "description": RESEARCHER_BUSINESS_MODEL_PROMPT.format(**prompt_vars),
+            "expected_output": "一份包含收入结构、成本结构、盈利能力的商业模式分析",
+            "agent_factory": build_researcher,
+        },
+    ]
+
+
+def research_national_dimensions(
+    inputs: Dict | IndustryResearchInput,
+    keys: tuple = NATIONAL_DIMENSIONS,
+    research_workers: int | None = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    以"全国"口径研究与省份无关的维度，返回结果可作为 shared_dimensions
+    传给同一行业、不同省份的 run_industry_research
+    """
+    if isinstance(inputs, dict):
+        inputs = IndustryResearchInput(**inputs)
+    prompt_vars = {**inputs.model_dump(), "province": "全国"}
+    specs = [spec for spec in build_dimension_specs(prompt_vars) if spec["key"] in keys]
+    print(f"🌐 共享维度研究：{inputs.industry} | {'、'.join(spec['label'] for spec in specs)}")
+    return run_research_dimensions(specs, max_workers=research_workers)
+
 
 # ============================================================
 # 主入口
 # ============================================================
-def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
+def run_industry_research(
+    inputs: Dict | IndustryResearchInput,
+    research_workers: int | None = None,
+    writer_workers: int | None = None,
+    resume: bool = True,
+    on_event: Optional[EventCallback] = None,
+    shared_dimensions: Optional[Dict[str, Dict[str, Any]]] = None
+) -> str:
     """
     行业深度研究主函数
     
     Args:
         inputs: 研究输入参数，包含 industry, province, target_year, focus
+        research_workers: Phase 2 并发研究的 worker 上限，默认读取 RESEARCH_MAX_WORKERS
+        writer_workers: Phase 4 并发写作的 worker 上限，默认读取 WRITER_MAX_WORKERS
+        resume: 同一输入上次运行未完成时，是否从最后一个完成的阶段继续
+        on_event: 进度事件回调，事件格式见 agent_system/workflows/events.py
+        shared_dimensions: 已完成的研究维度结果（如 research_national_dimensions 的输出），
+            对应维度在 Phase 2 中直接复用
     
     Returns:
         str: 生成的研究报告内容
@@ -87,6 +238,9 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     print(f"🚀 开始行业研究：{inputs.industry} | {inputs.province} | {inputs.target_year}")
     print(f"📋 研究侧重点：{inputs.focus}")
 
+    # 各阶段输出按输入哈希落盘，失败后可从断点续跑（节点在下方「组装 DAG」处注册）
+    pipeline = ReportPipeline(prompt_vars)
+
     # ============================================================
     # Phase 0: 定义 Agents
     # ============================================================
@@ -101,46 +255,10 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
             "你特别擅长产业链分析，能够清晰梳理上中下游结构。"
             "你熟悉六大研究维度：行业定义、市场规模、产业链结构、竞争格局、商业模式、政策环境。"
         ),
-        llm=llm,
+        llm=priority_llm,
         verbose=True
     )
 
-    # 研究员 Agent（通用）
-    researcher = Agent(
-        role="Senior Industry Data Researcher",
-        goal="搜集关键年份的财务、政策、产业链与商业模式数据",
-        backstory=(
-            "你是一名高效研究员，只关心可验证的数据、数字与结论。"
-            "避免长篇描述，优先结构化信息。"
-            "你特别擅长产业链数据搜集，能够清晰区分上游、中游、下游。"
-            "关键原则："
-            "1. 抓大放小：重点找龙头的营收/净利/市值，以及核心政策KPI。"
-            "2. 产业链视角：必须按上游/中游/下游分类整理数据。"
-            "3. 拒绝冗余：不需要搜集过于细枝末节的技术参数，关注商业落地的核心指标。"
-            "4. 拥有读取本地知识库的能力，只提取最关键的结论。"
-        ),
-        tools=[stock_analysis, serper_tool, read_pdf, rag_tool, recall_tool],
-        llm=llm,
-        verbose=True
-    )
-    
-    # 产业链专项研究员 Agent
-    supply_chain_researcher = Agent(
-        role="Supply Chain Research Specialist",
-        goal="深度梳理产业链上下游结构，识别各环节投资机会",
-        backstory=(
-            "你是一名产业链研究专家，专注于产业链深度分析。"
-            "你能够清晰识别上游原材料、中游制造、下游应用各环节。"
-            "你特别关注产业链价值分配、议价能力、投资机会。"
-            "你熟悉各行业的产业链图谱，能够快速定位关键环节。"
-        ),
-        tools=[stock_analysis, serper_tool, read_pdf, rag_tool, recall_tool],
-        llm=llm,
-        verbose=True,
-        max_iter=5,
-        max_execution_time=2400
-    )
-    
     # 分析师 Agent
     analyst = Agent(
         role="Senior Investment Analyst",
@@ -158,17 +276,17 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
         max_execution_time=2400
     )
 
-    # 写作者 Agent
-    writer = Agent(
+    # 写作者 Agent：使用工厂，每个章节各自持有独立实例
+    build_writer = build_agent_factory(
         role="Professional Report Writer",
         goal="撰写专业、结构清晰的行业研究报告",
         backstory=(
             "你遵循：结论先行、段落自洽、表格辅助。"
             "你特别擅长产业链分析的写作，能够清晰呈现上中下游结构。"
             "拒绝空话与堆砌。"
-            "时效性强：报告第一行注明日期。"
+            "只输出本章节正文，报告日期与免责声明由统稿统一添加。"
         ),
-        llm=llm,
+        llm=bulk_llm,
         verbose=True
     )
 
@@ -180,299 +298,332 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
             "你只做必要检查，不重写内容。"
             "你特别关注产业链分析是否完整、各环节是否覆盖。"
         ),
-        llm=llm,
+        llm=priority_llm,
         verbose=True
     )
 
     # ============================================================
     # Phase 1: Planner（规划）
     # ============================================================
-    print("\n📋 Phase 1: 规划研究蓝图...")
+    def phase_plan(outputs: Dict[str, Any]) -> Dict:
+        print("\n📋 Phase 1: 规划研究蓝图...")
     
-    plan_task = Task(
-        description=PLANNER_PROMPT.format(**prompt_vars),
-        expected_output="一份包含六大研究维度、三级目录、预设图表位置的详细大纲，产业链分析作为重点章节。",
-        agent=planner
-    )
+        plan_task = Task(
+            description=PLANNER_PROMPT.format(**prompt_vars),
+            expected_output="一份包含六大研究维度、三级目录、预设图表位置的详细大纲，产业链分析作为重点章节。",
+            agent=planner
+        )
 
-    plan_crew = Crew(
-        agents=[planner],
-        tasks=[plan_task],
-        process=Process.sequential,
-        verbose=True
-    )
+        plan_crew = Crew(
+            agents=[planner],
+            tasks=[plan_task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=step_callback_for(on_event, "plan")
+        )
 
-    plan_raw = plan_crew.kickoff()
-    plan_struct = parse_planner_output(str(plan_raw))
+        plan_raw = plan_crew.kickoff()
+        plan_struct = parse_planner_output(str(plan_raw))
     
-    print(f"✅ 规划完成，共 {len(plan_struct['chapters'])} 个章节")
+        print(f"✅ 规划完成，共 {len(plan_struct['chapters'])} 个章节")
+        return plan_struct
 
     # ============================================================
     # Phase 2: Researcher（并行研究）- 增强版
     # ============================================================
-    print("\n🔍 Phase 2: 数据研究（五维度并行）...")
-    
-    # 1. 财务数据研究任务
-    finance_task = Task(
-        description=RESEARCHER_FINANCE_PROMPT.format(**prompt_vars),
-        agent=researcher,
-        expected_output="一份包含5-8家龙头企业财务指标的原始财务数据列表，按产业链环节分类",
-        async_execution=True
-    )
+    def phase_research(outputs: Dict[str, Any]) -> str:
+        print("\n🔍 Phase 2: 数据研究（五维度并行）...")
     
-    # 2. 政策研究任务
-    policy_task = Task(
-        description=RESEARCHER_POLICY_PROMPT.format(**prompt_vars),
-        agent=researcher,
-        expected_output="一份包含国家和省级政策的汇总表，标注对产业链各环节的影响",
-        async_execution=True
-    )
-    
-    # 3. 行业规模研究任务
-    industry_task = Task(
-        description=RESEARCHER_INDUSTRY_PROMPT.format(**prompt_vars),
-        agent=researcher,
-        expected_output="一份包含行业规模、增速、竞争格局的数据汇总",
-        async_execution=True
-    )
-    
-    # 4. 产业链专项研究任务（新增核心任务）
-    supply_chain_task = Task(
-        description=RESEARCHER_SUPPLY_CHAIN_PROMPT.format(**prompt_vars),
-        agent=supply_chain_researcher,
-        expected_output="一份完整的产业链深度分析报告，包含上游/中游/下游各环节详细数据",
-        async_execution=True
-    )
-    
-    # 5. 商业模式研究任务（新增）
-    business_model_task = Task(
-        description=RESEARCHER_BUSINESS_MODEL_PROMPT.format(**prompt_vars),
-        agent=researcher,
-        expected_output="一份包含收入结构、成本结构、盈利能力的商业模式分析",
-        async_execution=True
-    )
+        # 五个维度各自独立 Agent + 独立 Crew，并发执行后统一汇合；
+        # 批量模式下已共享的全国维度直接复用，不再重复研究
+        shared = shared_dimensions or {}
+        dimension_specs = [
+            spec for spec in build_dimension_specs(prompt_vars) if spec["key"] not in shared
+        ]
+
+        for spec in dimension_specs:
+            spec["step_callback"] = step_callback_for(on_event, "research", spec["label"])
+
+        def _save_dimension(spec: Dict[str, Any], outcome: Dict[str, Any]):
+            # 成功的维度立即落盘：本阶段失败后续跑只重做失败的维度
+            if outcome["ok"]:
+                pipeline.save_partial("research", spec["key"], outcome)
+
+        fresh_results = (
+            run_research_dimensions(
+                dimension_specs,
+                max_workers=research_workers,
+                on_complete=_save_dimension,
+                completed=pipeline.load_partial("research"),
+            )
+            if dimension_specs else {}
+        )
+        # 任一维度失败则本阶段失败、不写检查点，避免数据缺口被后续续跑永久复用
+        raise_for_failures(fresh_results, "研究维度")
+        dimension_results = {
+            key: shared[key] if key in shared else fresh_results[key] for key in DIMENSION_KEYS
+        }
 
-    # 汇总任务
-    summary_task = Task(
-        description="""
-        作为首席研究员，汇总上述【财务】、【政策】、【行业】、【产业链】、【商业模式】五个维度的搜集结果。
+        # 汇总任务：各维度结果已在上方 join 完毕，直接作为上下文注入
+        summary_researcher = build_researcher()
+        summary_task = Task(
+            description="""
+            作为首席研究员，汇总下列【财务】、【政策】、【行业】、【产业链】、【商业模式】五个维度的搜集结果。
         
-        请将散落在各处的关键数据整理成一份结构化的"行业数据摘要"，去除重复信息，供分析师使用。
+            请将散落在各处的关键数据整理成一份结构化的"行业数据摘要"，去除重复信息，供分析师使用。
         
-        特别注意：
-        1. 产业链数据必须清晰区分上游、中游、下游
-        2. 必须保留各环节的关键企业和财务数据
-        3. 必须标注数据来源
-        """,
-        agent=researcher,
-        expected_output="一份包含财务、政策、行业、产业链、商业模式五方面关键数据的完整调研纪要。",
-        context=[finance_task, policy_task, industry_task, supply_chain_task, business_model_task],
-        async_execution=False
-    )
+            特别注意：
+            1. 产业链数据必须清晰区分上游、中游、下游
+            2. 必须保留各环节的关键企业和财务数据
+            3. 必须标注数据来源
+        
+            ===== 各维度搜集结果 =====
+            """ + format_dimension_outputs(dimension_results),
+            agent=summary_researcher,
+            expected_output="一份包含财务、政策、行业、产业链、商业模式五方面关键数据的完整调研纪要。"
+        )
 
-    research_crew = Crew(
-        agents=[researcher, supply_chain_researcher],
-        tasks=[finance_task, policy_task, industry_task, supply_chain_task, business_model_task, summary_task],
-        process=Process.sequential,
-        verbose=True
-    )
+        research_crew = Crew(
+            agents=[summary_researcher],
+            tasks=[summary_task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=step_callback_for(on_event, "research", "汇总")
+        )
     
-    research_result = research_crew.kickoff()
-    research_structs = [parse_researcher_output(str(research_result))]
-
-    # 存入长期记忆
-    memory_manager.save_insight(
-        content=str(research_result),
-        category="fact",
-        metadata={
-            "industry": inputs.industry,
-            "province": inputs.province,
-            "year": str(inputs.target_year),
-            "source_agent": "Researcher",
-            "dimensions": "finance,policy,industry,supply_chain,business_model"
-        }
-    )
+        research_result = research_crew.kickoff()
+
+        # 存入长期记忆
+        memory_manager.save_insight(
+            content=str(research_result),
+            category="fact",
+            metadata={
+                "industry": inputs.industry,
+                "province": inputs.province,
+                "year": str(inputs.target_year),
+                "source_agent": "Researcher",
+                "dimensions": "finance,policy,industry,supply_chain,business_model"
+            }
+        )
     
-    print("✅ 数据研究完成")
+        print("✅ 数据研究完成")
+        return str(research_result)
 
     # ============================================================
     # Phase 3: Analyst（综合分析）- 增强版
     # ============================================================
-    print("\n📊 Phase 3: 综合分析...")
+    def phase_analysis(outputs: Dict[str, Any]) -> str:
+        context = ContextBuilder(parse_researcher_output(outputs["research"]))
+
+        print("\n📊 Phase 3: 综合分析...")
     
-    analyst_task = Task(
-        description=ANALYST_PROMPT.format(
-            industry=inputs.industry,
-            target_year=inputs.target_year,
-            focus=inputs.focus,
-            province=inputs.province,
-            research_summary=research_structs
-        ),
-        expected_output="一份包含六维度综合分析、产业链投资机会矩阵、结构化对比数据的中间分析稿。",
-        agent=analyst
-    )
+        analyst_task = Task(
+            description=ANALYST_PROMPT.format(
+                industry=inputs.industry,
+                target_year=inputs.target_year,
+                focus=inputs.focus,
+                province=inputs.province,
+                research_summary=context.for_analyst(f"{inputs.industry} {inputs.province} {inputs.focus}")
+            ),
+            expected_output="一份包含六维度综合分析、产业链投资机会矩阵、结构化对比数据的中间分析稿。",
+            agent=analyst
+        )
 
-    analyst_crew = Crew(
-        agents=[analyst],
-        tasks=[analyst_task],
-        process=Process.sequential,
-        verbose=True
-    )
+        analyst_crew = Crew(
+            agents=[analyst],
+            tasks=[analyst_task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=step_callback_for(on_event, "analysis")
+        )
 
-    analysis_raw = analyst_crew.kickoff()
-    analysis_struct = parse_analyst_output(str(analysis_raw))
-
-    # 存入记忆
-    memory_manager.save_insight(
-        content=str(analysis_raw),
-        category="conclusion",
-        metadata={
-            "industry": inputs.industry,
-            "province": inputs.province,
-            "year": str(inputs.target_year),
-            "source_agent": "Analyst"
-        }
-    )
+        analysis_raw = analyst_crew.kickoff()
+
+        # 存入记忆
+        memory_manager.save_insight(
+            content=str(analysis_raw),
+            category="conclusion",
+            metadata={
+                "industry": inputs.industry,
+                "province": inputs.province,
+                "year": str(inputs.target_year),
+                "source_agent": "Analyst"
+            }
+        )
     
-    print("✅ 综合分析完成")
+        print("✅ 综合分析完成")
+        return str(analysis_raw)
 
     # ============================================================
     # Phase 4: Writer（分章节并行写作）- 增强版
     # ============================================================
-    print("\n✍️ Phase 4: 报告撰写...")
+    def phase_chapters(outputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        plan_struct = outputs["plan"]
+        # 每章只携带与其研究问题相关的研究数据与分析结论，大纲只保留章节标题
+        context = ContextBuilder(
+            parse_researcher_output(outputs["research"]),
+            parse_analyst_output(outputs["analysis"]),
+            plan_struct,
+        )
+        global_outline = context.outline()
+
+        print("\n✍️ Phase 4: 报告撰写...")
     
-    chapter_tasks = []
+        chapter_specs = []
     
-    for chapter in plan_struct["chapters"]:
-        # 判断是否为产业链章节，使用专门的提示词
-        chapter_title = chapter.get('title', '')
+        for index, chapter in enumerate(plan_struct["chapters"]):
+            # 判断是否为产业链章节，使用专门的提示词
+            chapter_title = chapter.get('title', '')
+            chapter_focus = ContextBuilder.chapter_focus(chapter, inputs.focus)
         
-        if '产业链' in chapter_title:
-            # 产业链专项章节
-            task_prompt = SUPPLY_CHAIN_WRITER_PROMPT.format(
-                industry=inputs.industry,
-                target_year=inputs.target_year,
-                province=inputs.province,
-                supply_chain_data=str(research_structs),
-                analysis_summary=analysis_struct
-            )
-        elif '摘要' in chapter_title or '要点' in chapter_title:
-            # 执行摘要章节
-            task_prompt = EXECUTIVE_SUMMARY_WRITER_PROMPT.format(
-                industry=inputs.industry,
-                target_year=inputs.target_year,
-                focus=inputs.focus,
-                province=inputs.province,
-                analysis_summary=analysis_struct
-            )
-        else:
-            # 通用章节
-            task_prompt = WRITER_PROMPT.format(
-                industry=inputs.industry,
-                target_year=inputs.target_year,
-                focus=inputs.focus,
-                province=inputs.province,
-                chapter_spec=chapter,
-                global_outline=plan_struct["raw_text"],
-                analysis_summary=analysis_struct
-            )
+            if '产业链' in chapter_title:
+                # 产业链专项章节
+                supply_chain_focus = ContextBuilder.chapter_focus(chapter, "产业链 上游 中游 下游 环节 企业")
+                task_prompt = SUPPLY_CHAIN_WRITER_PROMPT.format(
+                    industry=inputs.industry,
+                    target_year=inputs.target_year,
+                    province=inputs.province,
+                    supply_chain_data=context.research_for(supply_chain_focus, max_tokens=2 * CONTEXT_RESEARCH_TOKENS),
+                    analysis_summary=context.analysis_for(supply_chain_focus)
+                )
+            elif '摘要' in chapter_title or '要点' in chapter_title:
+                # 执行摘要章节
+                task_prompt = EXECUTIVE_SUMMARY_WRITER_PROMPT.format(
+                    industry=inputs.industry,
+                    target_year=inputs.target_year,
+                    focus=inputs.focus,
+                    province=inputs.province,
+                    analysis_summary=context.analysis_for(chapter_focus, max_tokens=2 * CONTEXT_ANALYSIS_TOKENS)
+                )
+            else:
+                # 通用章节
+                task_prompt = WRITER_PROMPT.format(
+                    industry=inputs.industry,
+                    target_year=inputs.target_year,
+                    focus=inputs.focus,
+                    province=inputs.province,
+                    chapter_spec=format_chapter_spec(chapter),
+                    global_outline=global_outline,
+                    chapter_research=context.research_for(chapter_focus),
+                    analysis_summary=context.analysis_for(chapter_focus)
+                )
         
-        chapter_tasks.append(
-            Task(
-                description=task_prompt,
-                expected_output=f"章节《{chapter['title']}》的Markdown内容，字数≥2000字。",
-                agent=writer,
-                async_execution=True
+            chapter_specs.append({
+                "key": str(index),
+                "label": chapter_title,
+                "description": task_prompt,
+                "expected_output": f"章节《{chapter_title}》的Markdown内容，字数≥2000字。",
+                "agent_factory": build_writer,
+                "step_callback": step_callback_for(on_event, "chapters", chapter_title),
+            })
+
+        def _on_chapter_done(spec: Dict[str, Any], outcome: Dict[str, Any]):
+            # 成功的章节立即落盘：本阶段失败后续跑只重写失败的章节
+            if outcome["ok"]:
+                pipeline.save_partial("chapters", spec["key"], outcome)
+            # 单章完成即推送（已按统稿规则整理标题），前端无需等待全部章节
+            index = int(spec["key"])
+            emit(
+                on_event, "chapter_done",
+                index=index,
+                total=len(chapter_specs),
+                title=spec["label"],
+                ok=outcome["ok"],
+                content=compile_chapter(index + 1, spec["label"], outcome["output"]) if outcome["ok"] else "",
+                error=outcome["error"],
             )
+
+        # 每章独立 Agent + 独立 Crew 并发撰写，按章节顺序汇合
+        chapter_results = run_chapter_tasks(
+            chapter_specs,
+            max_workers=writer_workers,
+            on_complete=_on_chapter_done,
+            completed=pipeline.load_partial("chapters"),
         )
-    
-    # 主编统稿任务
-    compile_task = Task(
-        description="""
-        你现在的身份是主编。
-        上述所有章节已经由你的团队撰写完毕。
-        
-        请将所有章节的内容按逻辑顺序拼接成一篇完整的行业研究报告。
-        
-        要求：
-        1. 保持Markdown格式，确保各章节标题层级（H1, H2, H3）正确
-        2. 不要丢失任何内容
-        3. 确保产业链分析章节内容完整
-        4. 在报告开头添加报告日期和免责声明
-        5. 在报告末尾添加数据来源说明
-        """,
-        agent=writer,
-        expected_output="一篇完整的、拼接好的行业研究报告Markdown全文，字数≥15000字。",
-        context=chapter_tasks,
-        async_execution=False
-    )
-    
-    writer_crew = Crew(
-        agents=[writer],
-        tasks=chapter_tasks + [compile_task],
-        process=Process.sequential,
-        verbose=True
-    )
-    
-    draft_report = str(writer_crew.kickoff())
-
-    # 存入记忆
-    memory_manager.save_insight(
-        content=draft_report,
-        category="report_segment",
-        metadata={
-            "industry": inputs.industry,
-            "province": inputs.province,
-            "year": str(inputs.target_year),
-            "source_agent": "Writer"
-        }
-    )
-    
-    print("✅ 报告撰写完成")
+        # 任一章节失败则本阶段失败、不写检查点，续跑时只补写失败的章节
+        raise_for_failures(chapter_results, "章节")
+
+        print("✅ 章节撰写完成")
+        return [
+            {"title": spec["label"], "content": chapter_results[spec["key"]]["output"]}
+            for spec in chapter_specs
+        ]
 
     # ============================================================
-    # Phase 5: Reviewer（终审）
+    # Phase 4.5: 本地统稿（不再调用 LLM 重新拼接全文）
     # ============================================================
-    print("\n🔍 Phase 5: 质量审核...")
-    
-    review_task = Task(
-        description=REVIEWER_PROMPT.format(report=draft_report),
-        expected_output="一份包含审核结论、问题清单和修改建议的评审纪要。",
-        agent=reviewer
-    )
+    def phase_compile(outputs: Dict[str, Any]) -> str:
+        print("\n🧩 统稿：按大纲顺序组装章节...")
 
-    review_crew = Crew(
-        agents=[reviewer],
-        tasks=[review_task],
-        process=Process.sequential,
-        verbose=True
-    )
+        draft_report = compile_report(
+            outputs["plan"],
+            outputs["chapters"],
+            header=build_header(inputs.industry, inputs.province, inputs.target_year, inputs.focus),
+        )
 
-    review_result = str(review_crew.kickoff())
+        # 存入记忆
+        memory_manager.save_insight(
+            content=draft_report,
+            category="report_segment",
+            metadata={
+                "industry": inputs.industry,
+                "province": inputs.province,
+                "year": str(inputs.target_year),
+                "source_agent": "Writer"
+            }
+        )
     
-    print("✅ 质量审核完成")
+        print("✅ 报告统稿完成")
+        return draft_report
 
     # ============================================================
-    # 最终组合：正文在前，审核意见在后
+    # Phase 5: Reviewer（终审）
     # ============================================================
-    
-    # 添加报告头部
-    report_header = f"""# {inputs.industry}行业深度研究报告
+    def phase_review(outputs: Dict[str, Any]) -> str:
+        draft_report = outputs["draft"]
 
-**研究区域**：{inputs.province}
-**目标年份**：{inputs.target_year}
-**报告日期**：{datetime.datetime.now().strftime('%Y年%m月%d日')}
-**研究侧重点**：{inputs.focus}
+        print("\n🔍 Phase 5: 质量审核...")
+    
+        review_task = Task(
+            description=REVIEWER_PROMPT.format(report=draft_report),
+            expected_output="一份包含审核结论、问题清单和修改建议的评审纪要。",
+            agent=reviewer
+        )
 
----
+        review_crew = Crew(
+            agents=[reviewer],
+            tasks=[review_task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=step_callback_for(on_event, "review")
+        )
 
-> **免责声明**：本报告基于公开信息和数据分析，仅供参考，不构成投资建议。投资者据此操作，风险自担。
+        review_result = str(review_crew.kickoff())
+    
+        print("✅ 质量审核完成")
+        return review_result
 
----
+    # ============================================================
+    # 组装 DAG
+    # ============================================================
+    pipeline.add_node("plan", phase_plan)
+    pipeline.add_node("research", phase_research)
+    pipeline.add_node("analysis", phase_analysis, deps=["research"])
+    pipeline.add_node("chapters", phase_chapters, deps=["plan", "research", "analysis"])
+    pipeline.add_node("draft", phase_compile, deps=["plan", "chapters"])
+    pipeline.add_node("review", phase_review, deps=["draft"])
+
+    print(f"🗂️ 运行目录：{pipeline.run_dir}")
+    outputs = pipeline.run(resume=resume, on_event=on_event)
+    draft_report = outputs["draft"]
+    review_result = outputs["review"]
 
-"""
+    # ============================================================
+    # 最终组合：正文在前，审核意见在后
+    # ============================================================
     
-    final_report_content = report_header + draft_report
+    # 报告头部、尾部已在统稿阶段添加
+    final_report_content = draft_report
     
     # 如果审核意见不是"通过"，则将其附在文末作为参考
     if "需修改" in review_result or "问题清单" in review_result:
@@ -490,7 +641,10 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     os.makedirs(output_dir, exist_ok=True)
 
     date_suffix = datetime.datetime.now().strftime("%Y%m%d")
-    filename = f"{inputs.target_year}_{inputs.province}_{inputs.industry}_行业研究报告_{date_suffix}.md"
+    filename = (
+        f"{inputs.target_year}_{safe_filename(inputs.province)}_{safe_filename(inputs.industry)}"
+        f"_行业研究报告_{date_suffix}.md"
+    )
     file_path = os.path.join(output_dir, filename)
 
     with open(file_path, "w", encoding="utf-8") as f:
@@ -500,3 +654,13 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     print(f"📊 报告字数：约 {len(final_report_content)} 字符")
 
     return final_report_content
+
+
+def stream_industry_research(inputs: Dict | IndustryResearchInput, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    以生成器形式运行行业研究，逐条产出进度事件
+
+    最后一条为 report_done（result 为最终报告全文）或 error；
+    其余参数与 run_industry_research 相同（on_event 除外）。
+    """
+    return iter_events(lambda on_event: run_industry_research(inputs, on_event=on_event, **kwargs))
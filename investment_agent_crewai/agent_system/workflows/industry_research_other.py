@@ -7,7 +7,8 @@ import numpy as np
 import torch
 import datetime
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process, LLM
+from crewai import Agent, Task, Crew, Process
+from config.llm import get_deepseek_llm
 from tools_custom import stock_analysis, read_pdf, serper_tool, calc_tool, meeting_tool, rag_tool
 
 
@@ -27,16 +28,8 @@ os.environ["no_proxy"] = "api.deepseek.com,127.0.0.1,localhost"
 # API Key
 os.environ["SERPER_API_KEY"] = "a7f48f6305f192f8867f6bedb2d2c5d53c9e374a"
 
-# DeepSeek 配置
-deepseek_llm = LLM(
-    model="openai/deepseek-chat", 
-    base_url=os.getenv("DEEPSEEK_API_BASE"),
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.3,               
-    timeout=1800,                  
-    max_tokens=8000,
-    max_retries=3  # 增加自动重试，防止网络抖动导致失败
-)
+# DeepSeek 配置（经过全局限流，见 config/rate_limiter.py）
+deepseek_llm = get_deepseek_llm()
 
 
 
@@ -0,0 +1,263 @@
+# agent_system/workflows/pipeline.py
+"""
+研报流水线（DAG）+ 阶段级检查点
+
+- 每个阶段是一个节点，声明其依赖节点，按拓扑序执行
+- 节点输出（需可 JSON 序列化）落盘到以输入哈希命名的运行目录
+- 中途失败后再次运行同一输入，会从最后一个完成的节点继续
+- 运行完整结束后标记为 completed，下一次同输入运行将重新开始
+- 节点内部可按子任务落部分结果（save_partial / load_partial）：节点失败后续跑时只重做未完成的子任务；
+  上游节点重跑时部分结果随之作废
+- 可选 on_event 回调：节点开始 / 结束 / 复用检查点 / 失败时推送事件（见 events.py）
+- 同一运行目录同时只允许一个执行者：运行前以 O_EXCL 创建 <run_id>.lock 认领，
+  相同输入的并发任务（不同 worker / 批量单元格）排队等待；持有者进程已退出的锁视为失效，
+  内容无法读取（持有者在写入前崩溃）且超过 PIPELINE_LOCK_GRACE_SECONDS 的锁同样视为失效
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from agent_system.workflows.events import EventCallback, emit
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
+RUNS_DIR = os.path.join(PROJECT_ROOT, "output", "runs")
+RUN_LOCK_POLL_SECONDS = float(os.getenv("PIPELINE_LOCK_POLL_SECONDS", "2"))
+RUN_LOCK_GRACE_SECONDS = float(os.getenv("PIPELINE_LOCK_GRACE_SECONDS", "30"))
+
+
+def compute_run_id(inputs: Dict[str, Any]) -> str:
+    """对输入参数做稳定哈希，作为运行目录名。"""
+    raw = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def safe_filename(text: str, max_length: int = 40) -> str:
+    """把用户输入（行业、省份等）转成可安全用作文件名的片段：路径分隔符、".." 等一律替换为 _"""
+    cleaned = re.sub(r"[^\w-]+", "_", str(text)).strip("_")
+    return cleaned[:max_length] or "_"
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """本机进程 pid 是否仍存在（无权限发信号时视为存在）；运行锁与任务表共用"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PipelineNode:
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+
+
+class ReportPipeline:
+    """
+    带检查点的 DAG 执行器
+
+    节点函数签名：fn(outputs) -> output
+    其中 outputs 为「节点名 -> 已完成节点输出」的字典
+    """
+
+    def __init__(self, inputs: Dict[str, Any], runs_dir: str = RUNS_DIR):
+        self.inputs = inputs
+        self.run_id = compute_run_id(inputs)
+        self.run_dir = os.path.join(runs_dir, self.run_id)
+        # 锁文件放在运行目录之外，清空运行目录时不受影响
+        self.lock_path = os.path.join(runs_dir, f"{self.run_id}.lock")
+        self.nodes: Dict[str, PipelineNode] = {}
+        self._partial_lock = threading.Lock()
+
+    def add_node(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()):
+        self.nodes[name] = PipelineNode(name, fn, deps)
+        return self
+
+    # ---------------- 检查点读写 ----------------
+    def _checkpoint_path(self, name: str) -> str:
+        return os.path.join(self.run_dir, f"{name}.json")
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.run_dir, "run.json")
+
+    def _write_json(self, path: str, payload: Dict[str, Any]):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)  # 原子替换，避免中断时留下半截文件
+
+    def _read_json(self, path: str) -> Dict[str, Any] | None:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def load_checkpoint(self, name: str) -> Dict[str, Any] | None:
+        return self._read_json(self._checkpoint_path(name))
+
+    def _partial_path(self, name: str) -> str:
+        return os.path.join(self.run_dir, f"{name}.partial.json")
+
+    def load_partial(self, name: str) -> Dict[str, Any]:
+        """节点 name 已完成的子任务结果 {key: value}，没有则为空"""
+        payload = self._read_json(self._partial_path(name))
+        return dict(payload.get("items", {})) if payload else {}
+
+    def save_partial(self, name: str, key: str, value: Any):
+        """记录节点 name 的一个已完成子任务，可在节点执行期间从多个线程调用"""
+        with self._partial_lock:
+            items = self.load_partial(name)
+            items[key] = value
+            self._write_json(self._partial_path(name), {"node": name, "items": items})
+
+    def _discard_partial(self, name: str):
+        try:
+            os.remove(self._partial_path(name))
+        except FileNotFoundError:
+            pass
+
+    def _save_checkpoint(self, name: str, output: Any):
+        self._write_json(
+            self._checkpoint_path(name),
+            {
+                "node": name,
+                "completed_at": datetime.datetime.now().isoformat(),
+                "output": output,
+            },
+        )
+
+    def _update_manifest(self, status: str, completed: List[str]):
+        # status: running / failed / completed
+        self._write_json(
+            self._manifest_path(),
+            {
+                "run_id": self.run_id,
+                "inputs": self.inputs,
+                "status": status,
+                "completed_nodes": completed,
+                "updated_at": datetime.datetime.now().isoformat(),
+            },
+        )
+
+    def _prepare_run_dir(self, resume: bool):
+        manifest = self._read_json(self._manifest_path())
+        finished_before = bool(manifest) and manifest.get("status") == "completed"
+        if os.path.exists(self.run_dir) and (not resume or finished_before):
+            shutil.rmtree(self.run_dir)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+    # ---------------- 运行目录认领 ----------------
+    def _lock_is_stale(self) -> bool:
+        holder = self._read_json(self.lock_path)
+        if holder is None:
+            # 持有者刚创建、尚未写完内容时也读不到：宽限期内留给下一轮判断，
+            # 超过宽限期说明持有者在写入前已崩溃
+            try:
+                age = time.time() - os.path.getmtime(self.lock_path)
+            except FileNotFoundError:
+                return False
+            return age > RUN_LOCK_GRACE_SECONDS
+        return holder.get("host") == socket.gethostname() and not pid_alive(holder.get("pid"))
+
+    @contextmanager
+    def _claim_run_dir(self):
+        """独占运行目录：已被其他执行者占用时等待，其结束后再按检查点续跑"""
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        waiting_logged = False
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._lock_is_stale():
+                    print(f"♻️ [Pipeline] 清理失效的运行锁：{self.lock_path}")
+                    try:
+                        os.remove(self.lock_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                if not waiting_logged:
+                    print(f"⏳ [Pipeline] 相同输入的运行 {self.run_id} 正在执行，等待其结束")
+                    waiting_logged = True
+                time.sleep(RUN_LOCK_POLL_SECONDS)
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"pid": os.getpid(), "host": socket.gethostname(),
+                           "acquired_at": datetime.datetime.now().isoformat()}, f)
+            break
+        try:
+            yield
+        finally:
+            try:
+                os.remove(self.lock_path)
+            except FileNotFoundError:
+                pass
+
+    # ---------------- 执行 ----------------
+    def execution_order(self) -> List[str]:
+        graph = {name: set(node.deps) for name, node in self.nodes.items()}
+        return list(TopologicalSorter(graph).static_order())
+
+    def run(self, resume: bool = True, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        with self._claim_run_dir():
+            return self._run(resume, on_event)
+
+    def _run(self, resume: bool, on_event: Optional[EventCallback]) -> Dict[str, Any]:
+        order = self.execution_order()
+        self._prepare_run_dir(resume)
+
+        outputs: Dict[str, Any] = {}
+        completed: List[str] = []
+        rerun: set = set()
+
+        for name in order:
+            node = self.nodes[name]
+            checkpoint = self.load_checkpoint(name)
+            upstream_rerun = any(dep in rerun for dep in node.deps)
+
+            if checkpoint is not None and not upstream_rerun:
+                print(f"⏭️ [Pipeline] 复用检查点：{name}")
+                outputs[name] = checkpoint["output"]
+                emit(on_event, "phase_cached", phase=name, output=outputs[name])
+            else:
+                if upstream_rerun:
+                    # 上游输出已变化，基于旧输入完成的子任务不可复用
+                    self._discard_partial(name)
+                self._update_manifest("running", completed)
+                emit(on_event, "phase_start", phase=name)
+                started = time.monotonic()
+                try:
+                    outputs[name] = node.fn(outputs)
+                except BaseException as e:
+                    self._update_manifest("failed", completed)
+                    emit(on_event, "phase_failed", phase=name, error=f"{type(e).__name__}: {e}")
+                    print(f"❌ [Pipeline] 节点 {name} 失败，已完成节点的检查点保存在 {self.run_dir}")
+                    raise
+                self._save_checkpoint(name, outputs[name])
+                self._discard_partial(name)
+                rerun.add(name)
+                emit(on_event, "phase_end", phase=name, output=outputs[name],
+                     elapsed=round(time.monotonic() - started, 1))
+
+            completed.append(name)
+
+        self._update_manifest("completed", completed)
+        return outputs
@@ -0,0 +1,164 @@
+# agent_system/workflows/research_scheduler.py
+"""
+Phase 2 研究 / Phase 4 写作阶段调度器
+
+- 每个研究维度（或章节）使用独立的 Agent 实例、独立的 Crew，互不共享执行状态
+- 各 Crew 在有界线程池中并发 kickoff，worker 上限可配置
+  （RESEARCH_MAX_WORKERS 默认 5，WRITER_MAX_WORKERS 默认 4）
+- 全部任务完成后统一汇合（join）；单个任务失败不影响其余任务跑完，
+  调用方再用 raise_for_failures 使整个阶段失败，避免把失败占位写入检查点
+- 可传入已完成的结果（completed），续跑时只执行其余任务
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from crewai import Agent, Crew, Process, Task
+
+RESEARCH_MAX_WORKERS = int(os.getenv("RESEARCH_MAX_WORKERS", "5"))
+WRITER_MAX_WORKERS = int(os.getenv("WRITER_MAX_WORKERS", "4"))
+
+
+def _run_dimension(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """在独立 Crew 中执行单个研究维度或章节。"""
+    started = time.monotonic()
+    try:
+        agent: Agent = spec["agent_factory"]()
+        task = Task(
+            description=spec["description"],
+            expected_output=spec["expected_output"],
+            agent=agent,
+        )
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=spec.get("step_callback"),
+        )
+        output = str(crew.kickoff())
+        return {"ok": True, "output": output, "error": None,
+                "elapsed": round(time.monotonic() - started, 1)}
+    except Exception as e:
+        return {"ok": False, "output": "", "error": f"{type(e).__name__}: {e}",
+                "elapsed": round(time.monotonic() - started, 1)}
+
+
+class CrewTasksFailed(RuntimeError):
+    """并发阶段中有任务失败；failures 为 {key: outcome}"""
+
+    def __init__(self, kind: str, failures: Dict[str, Dict[str, Any]]):
+        self.failures = failures
+        details = "；".join(f"{outcome['label']}：{outcome['error']}" for outcome in failures.values())
+        super().__init__(f"{len(failures)} 个{kind}失败（{details}）")
+
+
+def raise_for_failures(results: Dict[str, Dict[str, Any]], kind: str):
+    """存在失败任务时抛出 CrewTasksFailed，由流水线把该阶段标记为失败"""
+    failures = {key: outcome for key, outcome in results.items() if not outcome["ok"]}
+    if failures:
+        raise CrewTasksFailed(kind, failures)
+
+
+def run_parallel_crews(
+    specs: List[Dict[str, Any]],
+    max_workers: int,
+    kind: str,
+    on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    completed: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    在有界线程池中并发执行多个单任务 Crew，全部完成后按 specs 顺序返回
+
+    Args:
+        specs: 任务定义列表，每项包含
+            key / label / description / expected_output / agent_factory
+            可选 step_callback：透传给 Crew，用于推送 Agent 步骤事件
+        max_workers: 并发上限
+        kind: 日志中的任务类别，如「研究维度」「章节」
+        on_complete: 每个任务完成时立即回调 (spec, outcome)，按完成先后而非 specs 顺序；
+            复用 completed 中的结果时同样回调
+        completed: 已完成任务的结果 {key: outcome}（如上次中断前落盘的部分结果），对应任务不再执行
+
+    Returns:
+        {key: {"label", "ok", "output", "error", "elapsed"}}，顺序与 specs 一致
+    """
+    outcomes = {}
+    for spec in specs:
+        if completed and spec["key"] in completed:
+            outcome = {**completed[spec["key"]], "label": spec["label"]}
+            print(f"⏭️ {kind}【{spec['label']}】复用上次结果")
+            if on_complete is not None:
+                on_complete(spec, outcome)
+            outcomes[spec["key"]] = outcome
+    pending_specs = [spec for spec in specs if spec["key"] not in outcomes]
+    max_workers = max(1, min(max_workers, len(pending_specs) or 1))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew") as pool:
+        futures = {pool.submit(_run_dimension, spec): spec for spec in pending_specs}
+        # 全部 join 后才返回；先完成的任务先打印、先回调
+        for future in as_completed(futures):
+            spec = futures[future]
+            outcome = future.result()
+            outcome["label"] = spec["label"]
+            status = "✅" if outcome["ok"] else "⚠️"
+            print(f"{status} {kind}【{spec['label']}】完成，用时 {outcome['elapsed']}s")
+            if on_complete is not None:
+                on_complete(spec, outcome)
+            outcomes[spec["key"]] = outcome
+
+    return {spec["key"]: outcomes[spec["key"]] for spec in specs}
+
+
+def run_research_dimensions(
+    specs: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    completed: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    并发执行多个研究维度
+
+    Args:
+        specs: 维度定义列表，见 run_parallel_crews
+        max_workers: 并发上限，默认读取 RESEARCH_MAX_WORKERS
+        on_complete: 单个维度完成即回调，用于落盘部分结果
+        completed: 已完成维度的结果，续跑时直接复用
+    """
+    return run_parallel_crews(
+        specs, max_workers or RESEARCH_MAX_WORKERS, "研究维度", on_complete=on_complete, completed=completed
+    )
+
+
+def run_chapter_tasks(
+    specs: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    completed: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    并发撰写多个章节：每章独立 Writer Agent + 独立 Crew
+
+    Args:
+        specs: 章节定义列表，见 run_parallel_crews
+        max_workers: 并发上限，默认读取 WRITER_MAX_WORKERS
+        on_complete: 单章完成即回调，用于流式展示章节正文与落盘部分结果
+        completed: 已完成章节的结果，续跑时直接复用
+    """
+    return run_parallel_crews(
+        specs, max_workers or WRITER_MAX_WORKERS, "章节", on_complete=on_complete, completed=completed
+    )
+
+
+def format_dimension_outputs(results: Dict[str, Dict[str, Any]]) -> str:
+    """将各维度结果（均已成功，见 raise_for_failures）拼接为汇总任务可读的上下文。"""
+    return "\n\n".join(f"【{outcome['label']}】\n{outcome['output']}" for outcome in results.values())
+
+
+def build_agent_factory(**agent_kwargs: Any) -> Callable[[], Agent]:
+    """返回每次调用都新建 Agent 实例的工厂，避免并发任务共享同一个 Agent。"""
+    def _factory() -> Agent:
+        return Agent(**agent_kwargs)
+    return _factory
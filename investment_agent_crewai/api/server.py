@@ -0,0 +1,207 @@
+# api/server.py
+"""
+FinSight HTTP API（FastAPI）
+
+内部门户通过 HTTP 触发研报，无需经过 Streamlit 会话：
+- 提交接口只写任务表并立即返回 202，实际执行交给 jobs/worker_pool 的常驻 worker 进程；
+  worker 启动时预热，嵌入模型与向量库连接在请求之间复用（不再按会话重复加载）
+- 状态、结果下载、SSE 进度流都直接读任务表，API 进程本身不加载模型
+- 只开放行业研究与批量研究：接口无鉴权，不接受服务器端文件路径类参数
+  （会议纪要、BP 解读、财报分析等需要本地文件的模块仍只在 Streamlit 中使用）
+
+启动：
+    uvicorn api.server:app --host 0.0.0.0 --port 8000
+    （API_START_WORKERS=0 时不在本进程拉起 worker，改为单独运行 python -m jobs.worker_pool）
+
+接口：
+    POST   /jobs/industry-research            行业深度研究
+    POST   /jobs/batch-research               行业 × 省份批量研究
+    GET    /jobs                              最近任务列表
+    GET    /jobs/{job_id}                     任务状态（含排队位置、当前阶段）
+    GET    /jobs/{job_id}/result              下载 Markdown 结果
+    GET    /jobs/{job_id}/events              SSE 进度流（支持 Last-Event-ID 断点续读）
+    DELETE /jobs/{job_id}                     取消排队中的任务
+    GET    /metrics/llm                       LLM 限流指标（各通道调用数、等待时长、429 次数、重试数）
+    GET    /health
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from config.rate_limiter import get_llm_rate_limiter
+from jobs.worker_pool import report_worker_pool
+
+API_START_WORKERS = os.getenv("API_START_WORKERS", "1") != "0"
+SSE_POLL_SECONDS = float(os.getenv("API_SSE_POLL_SECONDS", "1"))
+SSE_KEEPALIVE_SECONDS = 15.0
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+
+
+# ============================================================
+# 请求模型
+# ============================================================
+class IndustryResearchRequest(BaseModel):
+    industry: str = Field(..., description="研究行业名称，如'半导体'")
+    province: str = Field(default="全国", description="研究省份/区域")
+    target_year: int = Field(default=2025, description="目标研究年份")
+    focus: str = Field(default="产业链深度分析与投资机会识别", description="研究侧重点")
+
+
+class BatchResearchRequest(BaseModel):
+    industries: List[str] = Field(..., min_length=1, description="行业列表")
+    provinces: List[str] = Field(..., min_length=1, description="省份列表")
+    target_year: int = Field(default=2025, description="目标研究年份")
+    focus: str = Field(default="产业链深度分析与投资机会识别", description="研究侧重点")
+    max_cells: Optional[int] = Field(default=None, description="同时运行的单元格上限")
+
+
+
+# ============================================================
+# 应用
+# ============================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if API_START_WORKERS:
+        report_worker_pool.ensure_started()
+    yield
+    if API_START_WORKERS:
+        await asyncio.to_thread(report_worker_pool.stop)
+
+
+app = FastAPI(title="FinSight API", version="1.0", lifespan=lifespan)
+
+
+def _job_or_404(job_id: str) -> Dict[str, Any]:
+    job = report_worker_pool.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在：{job_id}")
+    return job
+
+
+def _job_links(job_id: str) -> Dict[str, str]:
+    return {
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+        "result_url": f"/jobs/{job_id}/result",
+    }
+
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = {k: v for k, v in job.items() if k != "result"}
+    view["has_result"] = job.get("has_result", job.get("result") is not None)
+    view["queue_position"] = report_worker_pool.store.queue_position(job["id"]) if job["status"] == "queued" else None
+    return {**view, **_job_links(job["id"])}
+
+
+def _submit(kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = report_worker_pool.submit(kind, params)
+    return {"job_id": job_id, "status": "queued", **_job_links(job_id)}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "workers": report_worker_pool.workers}
+
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    limiter = get_llm_rate_limiter()
+    stats = await asyncio.to_thread(limiter.stats)
+    return {"rpm": limiter.rpm, "tpm": limiter.tpm, "shared": bool(limiter.db_path), "lanes": stats}
+
+
+@app.post("/jobs/industry-research", status_code=202)
+async def submit_industry_research(request: IndustryResearchRequest):
+    return await asyncio.to_thread(_submit, "industry_research", request.model_dump())
+
+
+@app.post("/jobs/batch-research", status_code=202)
+async def submit_batch_research(request: BatchResearchRequest):
+    return await asyncio.to_thread(_submit, "batch_research", request.model_dump())
+
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 20):
+    jobs = await asyncio.to_thread(report_worker_pool.list_jobs, min(max(limit, 1), 200))
+    return [{**job, **_job_links(job["id"])} for job in jobs]
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(_job_or_404, job_id)
+    return await asyncio.to_thread(_job_view, job)
+
+
+@app.get("/jobs/{job_id}/result")
+async def download_result(job_id: str):
+    job = await asyncio.to_thread(_job_or_404, job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"任务尚未完成（{job['status']}）")
+    params = job["params"]
+    filename = f"{params.get('target_year', '')}_{params.get('province', '')}_{params.get('industry', job['kind'])}_{job_id}.md"
+    return Response(
+        content=job["result"],
+        media_type="text/markdown; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    await asyncio.to_thread(_job_or_404, job_id)
+    if not await asyncio.to_thread(report_worker_pool.cancel, job_id):
+        raise HTTPException(status_code=409, detail="只能取消排队中的任务")
+    return {"job_id": job_id, "status": "cancelled"}
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_events(job_id: str, last_event_id: Optional[str] = Header(default=None)):
+    """
+    SSE 进度流：逐条推送任务事件（phase_start / agent_step / chapter_done / report_done / error ...），
+    任务结束且事件读尽后关闭；断线重连时浏览器自动携带 Last-Event-ID，从断点继续
+    """
+    await asyncio.to_thread(_job_or_404, job_id)
+    after_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def _event_stream():
+        seq, idle = after_seq, 0.0
+        while True:
+            events = await asyncio.to_thread(report_worker_pool.events_since, job_id, seq)
+            for event in events:
+                seq = event["seq"]
+                yield _sse(event)
+            if events:
+                idle = 0.0
+            else:
+                job = await asyncio.to_thread(report_worker_pool.get, job_id)
+                if job is None or job["status"] in TERMINAL_STATUSES:
+                    # 终态写入在最后一条事件之后，再读一次避免遗漏
+                    for event in await asyncio.to_thread(report_worker_pool.events_since, job_id, seq):
+                        yield _sse(event)
+                    if job is not None and job["status"] == "cancelled":
+                        yield f"event: cancelled\ndata: {json.dumps({'job_id': job_id})}\n\n"
+                    return
+                idle += SSE_POLL_SECONDS
+                if idle >= SSE_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(SSE_POLL_SECONDS)
+
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -31,11 +31,15 @@ except ImportError as e:
     HAS_BACKEND = False
     BACKEND_ERROR = str(e)
 
+from agent_system.postprocess.report_compiler import compile_chapter
+
 # 知识库引擎（RAG--knowledge_engine.py）
 try:
     from agent_system.knowledge import kb_manager
+    from ingestion.ingest_queue import ingest_queue
 except ImportError:
     kb_manager = None  #容错
+    ingest_queue = None
 
 # ----------- 页面配置（必须第一个 Streamlit 调用）-----------
 st.set_page_config(
@@ -56,6 +60,91 @@ ui.render_header()
 if not HAS_BACKEND:
     st.error(f"⚠️ 后端 main.py 未就绪：{BACKEND_ERROR}")
 
+
+# ----------- 研报后台任务 -----------
+PHASE_LABELS = {
+    "plan": "📋 Planner：规划研究蓝图",
+    "research": "🔍 Researcher：五维度数据研究",
+    "analysis": "📊 Analyst：六维度综合分析",
+    "chapters": "✍️ Writer：分章节并行撰写",
+    "draft": "🧩 统稿：按大纲组装章节",
+    "review": "🔍 Reviewer：质量审核",
+}
+JOB_STATUS_LABELS = {
+    "queued": "⏳ 排队中", "running": "⚙️ 运行中", "done": "✅ 完成",
+    "failed": "❌ 失败", "cancelled": "🚫 已取消",
+}
+
+
+def _apply_job_events(progress, events):
+    """把新增事件累积到 progress（保存在 session_state，轮询时只取增量）"""
+    for event in events:
+        progress["seq"] = event["seq"]
+        kind = event["type"]
+        label = PHASE_LABELS.get(event.get("phase"), event.get("phase"))
+        if kind == "phase_start":
+            progress["phase"] = label
+            progress["log"].append(f"▶️ {label}")
+        elif kind == "phase_cached":
+            progress["log"].append(f"⏭️ {label}（复用上次结果）")
+            if event["phase"] == "chapters":
+                for index, chapter in enumerate(event["output"]):
+                    progress["chapters"][index] = compile_chapter(index + 1, chapter["title"], chapter["content"])
+        elif kind == "phase_end":
+            progress["log"].append(f"✅ {label}（{event['elapsed']}s）")
+        elif kind == "phase_failed":
+            progress["log"].append(f"❌ {label}：{event['error']}")
+        elif kind == "agent_step" and event.get("kind") == "tool_call":
+            step = f"🛠️ [{event['label'] or label}] {event['tool']}：{event['tool_input']}"
+            progress["steps"] = (progress["steps"] + [step])[-5:]
+        elif kind == "chapter_done":
+            progress["chapters"][event["index"]] = event["content"] if event["ok"] else (
+                f"> ⚠️ 章节《{event['title']}》生成失败：{event['error']}"
+            )
+            progress["phase"] = f"✍️ 已完成 {len(progress['chapters'])}/{event['total']} 章"
+
+
+def render_job_progress(job_key, report_key):
+    """
+    轮询 session_state[job_key] 对应的后台任务：阶段日志与已完成章节逐步显示；
+    完成后把报告写入 session_state[report_key] 并整页刷新
+    """
+    job_id = st.session_state.get(job_key)
+    job = main.get_job(job_id) if job_id else None
+    if job is None:
+        return
+
+    progress_key = f"{job_key}_progress"
+    progress = st.session_state.setdefault(
+        progress_key, {"seq": 0, "phase": None, "log": [], "steps": [], "chapters": {}}
+    )
+    _apply_job_events(progress, main.get_job_events(job_id, progress["seq"]))
+
+    if job["status"] in ("done", "failed", "cancelled"):
+        del st.session_state[job_key]
+        del st.session_state[progress_key]
+        if job["status"] == "done":
+            st.session_state[report_key] = job["result"]
+        else:
+            st.session_state[f"{job_key}_error"] = job["error"] or JOB_STATUS_LABELS[job["status"]]
+        st.rerun()
+
+    title = JOB_STATUS_LABELS["queued"] if job["status"] == "queued" else f"⚙️ {progress['phase'] or '启动中'}..."
+    with st.status(f"{title}（任务 {job_id}）", expanded=True):
+        for line in progress["log"]:
+            st.write(line)
+        if progress["steps"]:
+            st.caption("\n\n".join(progress["steps"]))
+    st.caption("任务在后台 worker 进程中运行，刷新或关闭页面不会中断。")
+    for index in sorted(progress["chapters"]):
+        st.markdown(progress["chapters"][index])
+    if not hasattr(st, "fragment"):
+        st.button("🔄 刷新进度", key=f"{job_key}_refresh")
+
+
+if hasattr(st, "fragment"):
+    render_job_progress = st.fragment(run_every=3)(render_job_progress)
+
 # ============================================================
 # 侧边栏导航
 # ============================================================
@@ -82,6 +171,51 @@ with st.sidebar:
     st.divider()
     st.info(f"系统状态: {'🟢 在线' if HAS_BACKEND else '🔴 离线'}\n\n日期: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    # 后台入库任务进度（自动轮询刷新）
+    def render_ingest_progress():
+        jobs = ingest_queue.list_jobs(limit=10) if ingest_queue else []
+        if not jobs:
+            return
+        st.markdown("**📥 知识库入库任务**")
+        status_labels = {
+            "queued": "排队中", "parsing": "解析中", "embedding": "向量化",
+            "done": "✅ 完成", "skipped": "⏭️ 未变化", "failed": "❌ 失败",
+        }
+        for job in jobs:
+            detail = status_labels.get(job["status"], job["status"])
+            if job["pages_total"]:
+                detail += f" | {job['pages_parsed']}/{job['pages_total']} 页"
+            if job["chunks_total"]:
+                detail += f" | {job['chunks_embedded']}/{job['chunks_total']} 块"
+            elif job["chunks_embedded"]:
+                detail += f" | 已写入 {job['chunks_embedded']} 块"
+            if job["eta_seconds"] is not None:
+                detail += f" | 剩余约 {job['eta_seconds']:.0f}s"
+            if job["error"]:
+                detail += f" | {job['error']}"
+            st.progress(job["progress"], text=f"{job['file']} · {detail}")
+
+    if hasattr(st, "fragment"):
+        render_ingest_progress = st.fragment(run_every=2)(render_ingest_progress)
+    render_ingest_progress()
+
+    # 研报任务队列（所有会话共享，自动轮询刷新）
+    def render_report_jobs():
+        jobs = main.list_jobs(limit=8) if HAS_BACKEND else []
+        if not jobs:
+            return
+        st.markdown("**📝 研报任务队列**")
+        for job in jobs:
+            params = job["params"]
+            detail = JOB_STATUS_LABELS.get(job["status"], job["status"])
+            if job["status"] == "running" and job["phase"]:
+                detail += f" | {PHASE_LABELS.get(job['phase'], job['phase'])}"
+            st.caption(f"{params.get('industry', '')} · {params.get('province', '')} · {detail}")
+
+    if hasattr(st, "fragment"):
+        render_report_jobs = st.fragment(run_every=5)(render_report_jobs)
+    render_report_jobs()
+
     # 显示六大研究维度框架
     with st.expander("📚 研究维度框架", expanded=False):
         st.markdown("""
@@ -196,45 +330,53 @@ if menu == "📊 行业深度研究":
             uploaded_files = st.file_uploader("➕ 上传新研报 (PDF)", type=["pdf"], accept_multiple_files=True)
 
             if uploaded_files:
-                for uploaded_file in uploaded_files:
+                # 记录本会话已处理的上传，避免 rerun 后重复处理同一批文件
+                processed = st.session_state.setdefault("processed_uploads", set())
+                new_uploads = [f for f in uploaded_files if (f.name, f.size) not in processed]
+                saved_paths = []
+
+                for uploaded_file in new_uploads:
                     save_path = os.path.join(config.KNOWLEDGE_BASE_DIR, uploaded_file.name)
-                    
-                    if not os.path.exists(save_path):
+                    content = uploaded_file.getbuffer()
+
+                    # 同名文件内容不同时覆盖；内容相同则不改写，保留 mtime 以便入库清单快速跳过
+                    same_content = False
+                    if os.path.exists(save_path) and os.path.getsize(save_path) == len(content):
+                        with open(save_path, "rb") as f:
+                            same_content = f.read() == bytes(content)
+                    if not same_content:
                         with open(save_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
-                        
-                        if kb_manager:
-                            with st.spinner(f"正在学习 {uploaded_file.name} (向量化)..."):
-                                kb_manager.ingest_pdf(save_path)
-                        
-                        st.toast(f"✅ 已入库并学习: {uploaded_file.name}", icon="🧠")
-                    else:
-                        st.toast(f"ℹ️ 文件已存在: {uploaded_file.name}")
-                time.sleep(1)
-                st.rerun()
+                            f.write(content)
+
+                    saved_paths.append(save_path)
+                    processed.add((uploaded_file.name, uploaded_file.size))
+
+                # 解析与向量化交给后台队列，进度见侧边栏
+                if saved_paths and ingest_queue:
+                    ingest_queue.submit(saved_paths)
+                    st.toast(f"🧠 已提交 {len(saved_paths)} 个文件到后台入库队列", icon="📥")
+
+                if new_uploads:
+                    time.sleep(1)
+                    st.rerun()
 
             if st.button("🚀 生成深度研报", use_container_width=True):
                 if not HAS_BACKEND:
                     st.error("无法调用后端，请检查 main.py")
                 else:
-                    with st.status("正在调用多智能体团队...", expanded=True):
-                        st.write("📋 Planner: 正在基于六大维度规划研究蓝图...")
-                        st.write("🔍 Researcher: 正在搜集财务、政策、产业链数据...")
-                        st.write("🔗 Supply Chain Analyst: 正在深度分析产业链结构...")
-                        st.write("📊 Analyst: 正在进行六维度综合分析...")
-                        st.write("✍️ Writer: 正在撰写深度分析报告...")
-                        st.write("🔍 Reviewer: 正在进行质量审核...")
-                        try:
-                            res = main.run_investment_analysis(
-                                final_topic, sel_province, str(target_year), focus_prompt
-                            )
-                            st.session_state.ind_report = res
-                            st.success("研报生成完成！")
-                        except Exception as e:
-                            st.error(f"运行出错: {e}")
+                    # 提交到后台 worker 进程，进度在右侧展示区轮询显示
+                    st.session_state.pop("ind_report", None)
+                    st.session_state.ind_job_id = main.submit_investment_analysis(
+                        final_topic, sel_province, str(target_year), focus_prompt
+                    )
+                    st.toast("📝 研报任务已提交到后台队列", icon="🚀")
 
     with col_display:
-        if 'ind_report' in st.session_state:
+        if "ind_job_id_error" in st.session_state:
+            st.error(f"运行出错: {st.session_state.pop('ind_job_id_error')}")
+        if st.session_state.get("ind_job_id"):
+            render_job_progress("ind_job_id", "ind_report")
+        elif 'ind_report' in st.session_state:
             with st.container():
                 # 显示报告统计
                 report_content = st.session_state.ind_report
@@ -384,23 +526,18 @@ elif menu == "🔗 产业链专项分析":
                 请重点分析产业链各环节的投资价值和风险。
                 """
                 
-                with st.status("正在进行产业链深度分析...", expanded=True):
-                    st.write("🔗 正在梳理产业链结构...")
-                    st.write("🔼 正在分析上游环节...")
-                    st.write("⏺️ 正在分析中游环节...")
-                    st.write("🔽 正在分析下游环节...")
-                    st.write("💰 正在分析价值链分配...")
-                    try:
-                        res = main.run_investment_analysis(
-                            industry_name, sel_province, str(target_year), supply_chain_focus
-                        )
-                        st.session_state.supply_chain_report = res
-                        st.success("产业链分析完成！")
-                    except Exception as e:
-                        st.error(f"运行出错: {e}")
-    
+                st.session_state.pop("supply_chain_report", None)
+                st.session_state.supply_chain_job_id = main.submit_investment_analysis(
+                    industry_name, sel_province, str(target_year), supply_chain_focus
+                )
+                st.toast("🔗 产业链分析任务已提交到后台队列", icon="🚀")
+
     with col_display:
-        if 'supply_chain_report' in st.session_state:
+        if "supply_chain_job_id_error" in st.session_state:
+            st.error(f"运行出错: {st.session_state.pop('supply_chain_job_id_error')}")
+        if st.session_state.get("supply_chain_job_id"):
+            render_job_progress("supply_chain_job_id", "supply_chain_report")
+        elif 'supply_chain_report' in st.session_state:
             report_content = st.session_state.supply_chain_report
             
             # 显示报告统计
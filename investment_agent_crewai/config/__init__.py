@@ -8,7 +8,13 @@ config 包统一出口
 
 from .runtime_env import setup_runtime_env
 from .network import setup_network
-from .llm import get_deepseek_llm
+
+
+def get_deepseek_llm(*args, **kwargs):
+    # 延迟导入 CrewAI：只用到 rate_limiter 等轻量配置的进程（如 API 服务）不必加载 LLM 依赖
+    from .llm import get_deepseek_llm as _get_deepseek_llm
+    return _get_deepseek_llm(*args, **kwargs)
+
 
 __all__ = [
     "setup_runtime_env",
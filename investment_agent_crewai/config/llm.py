@@ -1,15 +1,161 @@
 # config/llm.py
 
 import os
-from crewai import LLM
+import random
+import re
+import time
 
-def get_deepseek_llm():
-    return LLM(
+from crewai import BaseLLM, LLM
+
+from config.rate_limiter import get_llm_rate_limiter
+
+# LLM_MAX_RETRIES：限流 / 瞬时错误的重试次数（退避在本模块完成，底层客户端不再自行重试）
+# LLM_BACKOFF_BASE / LLM_BACKOFF_CAP：指数退避的基数与上限（秒），实际等待取 [0, 上限] 内随机值
+# LLM_EXPECTED_OUTPUT_TOKENS：取令牌时为输出预留的 token 数，调用结束后按实际输出校正
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "60"))
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1500"))
+
+_RETRY_AFTER = re.compile(r"retry[- ]after\D{0,10}(\d+(?:\.\d+)?)", re.IGNORECASE)
+_TRANSIENT_MARKERS = ("timeout", "timed out", "connection", "502", "503", "504", "overloaded", "server error")
+_MIRRORED_FIELDS = ("max_tokens", "base_url")
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text.replace(" ", "").replace("_", "") or "429" in text
+
+
+def _is_transient(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _TRANSIENT_MARKERS)
+
+
+def _retry_after(error: Exception) -> float:
+    """优先使用服务端给出的 Retry-After（响应头或错误信息），取不到返回 0"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value is None:
+        match = _RETRY_AFTER.search(str(error))
+        value = match.group(1) if match else None
+    try:
+        return float(value) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _backoff(attempt: int) -> float:
+    """带全抖动的指数退避：并发调用方错开重试时间"""
+    return random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _prompt_tokens(messages) -> int:
+    from rag.token_budget import estimate_tokens
+
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(str(m.get("content") or "")) for m in messages or [] if isinstance(m, dict))
+
+
+class RateLimitedLLM(BaseLLM):
+    """
+    经过全局限流的 LLM：包装实际发请求的 LLM（inner），每次调用先按通道取令牌
+    （见 config/rate_limiter.py），遇到 429 / 瞬时错误时让整个桶冷却并抖动退避重试
+
+    采用组合而非继承 crewai.LLM：不同版本的 CrewAI 会把 LLM(...) 分派为各原生 provider 类，
+    继承后覆盖的 call 可能被绕过；包装后所有调用都必然经过这里
+    """
+
+    def __init__(self, inner: BaseLLM, lane: str = "normal"):
+        super().__init__(model=inner.model, temperature=getattr(inner, "temperature", None))
+        self.inner = inner
+        self.lane = lane
+        # 新版 CrewAI 的 BaseLLM 自带 max_tokens / base_url 等字段（默认 None），
+        # 这些属性不会走 __getattr__，直接同步 inner 的取值
+        for name in _MIRRORED_FIELDS:
+            if name in self.__dict__ and getattr(inner, name, None) is not None:
+                setattr(self, name, getattr(inner, name))
+
+    def __getattr__(self, name: str):
+        # 未在包装层定义的属性（max_tokens、base_url 等）转交给 inner
+        inner = self.__dict__.get("inner")
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        # CrewAI 把停止词写在 Agent 持有的 LLM（即包装层）上，转交给实际发请求的 LLM
+        stop = getattr(self, "stop", None)
+        if stop and self.inner.supports_stop_words():
+            self.inner.stop = stop
+
+        max_tokens = getattr(self.inner, "max_tokens", None)
+        expected_output = min(LLM_EXPECTED_OUTPUT_TOKENS, max_tokens or LLM_EXPECTED_OUTPUT_TOKENS)
+        reserved = _prompt_tokens(messages) + expected_output
+        limiter = get_llm_rate_limiter()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            limiter.acquire(reserved, lane=self.lane)
+            try:
+                result = self.inner.call(
+                    messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs
+                )
+            except Exception as e:
+                rate_limited = _is_rate_limited(e)
+                if not (rate_limited or _is_transient(e)) or attempt == LLM_MAX_RETRIES:
+                    limiter.record(self.lane, failures=1)
+                    raise
+                delay = _backoff(attempt)
+                if rate_limited:
+                    delay = max(delay, _retry_after(e))
+                    limiter.cooldown(delay)
+                    limiter.record(self.lane, rate_limited=1, retries=1)
+                else:
+                    limiter.record(self.lane, retries=1)
+                print(f"⏳ [LLM:{self.lane}] {type(e).__name__}，{delay:.1f}s 后第 {attempt + 1} 次重试")
+                time.sleep(delay)
+                continue
+            # 按实际输出校正 token 桶（输入部分沿用估算）
+            if isinstance(result, str):
+                from rag.token_budget import estimate_tokens
+
+                limiter.settle(reserved, reserved - expected_output + estimate_tokens(result))
+            return result
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        # token 用量由实际发请求的 LLM 统计
+        return self.inner.get_token_usage_summary()
+
+
+def get_deepseek_llm(lane: str = "normal"):
+    """
+    lane：限流优先级通道 priority / normal / bulk（见 config/rate_limiter.py），
+    同一进程内令牌紧张时 priority 先于 normal、normal 先于 bulk 取得调用机会
+    """
+    # FINSIGHT_LLM_MODE=stub：离线桩 LLM，不访问网络，用于本地联调与测试
+    # （调用时读取，.env 由 setup_runtime_env 加载）
+    if os.getenv("FINSIGHT_LLM_MODE", "real") == "stub":
+        from config.stub_llm import StubLLM
+        return StubLLM()
+
+    # 重试与退避由 RateLimitedLLM 负责，底层客户端不再自行重试（否则重试请求会绕过限流）
+    deepseek = LLM(
         model="openai/deepseek-chat",
         base_url=os.getenv("DEEPSEEK_API_BASE"),
         api_key=os.getenv("DEEPSEEK_API_KEY"),
         temperature=0.3,
         timeout=1800,
         max_tokens=8000,
-        max_retries=3
+        max_retries=0
     )
+    return RateLimitedLLM(deepseek, lane=lane)
@@ -0,0 +1,230 @@
+# config/rate_limiter.py
+"""
+LLM 全局限流（令牌桶：每分钟请求数 RPM + 每分钟 token 数 TPM）
+
+- 每次 LLM 调用前按"请求 1 次 + 预估 token 数"取令牌，不足则排队等待；调用后按实际输出校正
+- 优先级通道：priority（Planner / Reviewer）> normal（Researcher / Analyst）> bulk（章节写作）；
+  同一进程内等待者按通道优先、同通道先到先得
+- 跨进程共享：桶状态与指标存于 SQLite（BEGIN IMMEDIATE），Streamlit、任务 worker、批量任务
+  共用同一份额度；通道优先级只在进程内生效
+- 遇到 429 时整个桶进入冷却（优先使用 Retry-After），所有调用方一起退避，避免重试风暴
+    DEEPSEEK_RPM               每分钟请求数上限，默认 60
+    DEEPSEEK_TPM               每分钟 token 上限，默认 300000
+    LLM_RATE_LIMIT_SHARED      1（默认）跨进程共享；0 仅进程内
+    LLM_RATE_LIMIT_DB          共享库路径，默认 output/llm_rate_limit.sqlite3
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import heapq
+import itertools
+from typing import Dict, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, "output", "llm_rate_limit.sqlite3")
+
+LANES = {"priority": 0, "normal": 1, "bulk": 2}
+_METRIC_KEYS = ("calls", "waited_seconds", "rate_limited", "retries", "failures", "tokens")
+
+
+class TokenBucketLimiter:
+    """RPM + TPM 双令牌桶（线程安全；可选 SQLite 跨进程共享）"""
+
+    def __init__(self, rpm: float, tpm: float, name: str = "deepseek", db_path: Optional[str] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.name = name
+        self.db_path = db_path
+        self._state = {"requests": rpm, "tokens": tpm, "updated": time.time(), "cooldown_until": 0.0}
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    # ---------------- 存储 ----------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS llm_buckets (
+                    name TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    cooldown_until REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS llm_metrics (
+                    name TEXT NOT NULL,
+                    lane TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, lane, metric)
+                );
+                """
+            )
+        return self._conn
+
+    def _transact(self, fn):
+        """在（进程内锁 + 可选的 SQLite 排他事务）中读写桶状态：fn(state) -> result"""
+        with self._lock:
+            if not self.db_path:
+                return fn(self._state)
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT requests, tokens, updated, cooldown_until FROM llm_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                state = (
+                    dict(zip(("requests", "tokens", "updated", "cooldown_until"), row))
+                    if row else {"requests": self.rpm, "tokens": self.tpm, "updated": time.time(), "cooldown_until": 0.0}
+                )
+                result = fn(state)
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_buckets (name, requests, tokens, updated, cooldown_until) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.name, state["requests"], state["tokens"], state["updated"], state["cooldown_until"]),
+                )
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _refill(self, state: Dict[str, float], now: float):
+        elapsed = max(0.0, now - state["updated"])
+        state["requests"] = min(self.rpm, state["requests"] + elapsed * self.rpm / 60)
+        state["tokens"] = min(self.tpm, state["tokens"] + elapsed * self.tpm / 60)
+        state["updated"] = now
+
+    def _try_take(self, tokens: float) -> float:
+        """取令牌成功返回 0，否则返回还需等待的秒数"""
+        tokens = min(tokens, self.tpm)  # 单次超过整桶容量时按满桶计，避免永远等待
+
+        def _take(state):
+            now = time.time()
+            self._refill(state, now)
+            if now < state["cooldown_until"]:
+                return state["cooldown_until"] - now
+            if state["requests"] >= 1 and state["tokens"] >= tokens:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                return 0.0
+            wait_requests = (1 - state["requests"]) * 60 / self.rpm if state["requests"] < 1 else 0.0
+            wait_tokens = (tokens - state["tokens"]) * 60 / self.tpm if state["tokens"] < tokens else 0.0
+            return max(wait_requests, wait_tokens, 0.01)
+
+        return self._transact(_take)
+
+    # ---------------- 对外接口 ----------------
+    def acquire(self, tokens: float, lane: str = "normal") -> float:
+        """阻塞直到取得 1 个请求令牌与 tokens 个 token 令牌，返回等待秒数"""
+        started = time.monotonic()
+        ticket = (LANES.get(lane, LANES["normal"]), next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    # 只有队首（最高优先级、最早到达）的等待者可以取令牌
+                    while self._waiters[0] != ticket:
+                        self._cond.wait()
+                wait = self._try_take(tokens)
+                if wait <= 0:
+                    break
+                with self._cond:
+                    # 等待期间若有更高优先级的调用到达，会在醒来后让出队首
+                    self._cond.wait(timeout=min(wait, 1.0))
+        finally:
+            with self._cond:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self.record(lane, calls=1, waited_seconds=waited, tokens=tokens)
+        return waited
+
+    def settle(self, reserved: float, actual: float):
+        """按实际 token 数校正：多预留的退回，少预留的补扣（可为负，之后的调用相应等待）"""
+        delta = reserved - actual
+        if abs(delta) < 1:
+            return
+
+        def _adjust(state):
+            self._refill(state, time.time())
+            state["tokens"] = min(self.tpm, state["tokens"] + delta)
+
+        self._transact(_adjust)
+
+    def cooldown(self, seconds: float):
+        """收到 429 后让整个桶冷却：所有进程、所有通道一起退避"""
+        def _pause(state):
+            state["cooldown_until"] = max(state["cooldown_until"], time.time() + seconds)
+            # 清空请求令牌，冷却结束后逐步恢复，而不是所有等待者同时涌入
+            state["requests"] = 0.0
+
+        self._transact(_pause)
+        with self._cond:
+            self._cond.notify_all()
+
+    # ---------------- 指标 ----------------
+    def record(self, lane: str, **deltas: float):
+        with self._lock:
+            lane_metrics = self._metrics.setdefault(lane, dict.fromkeys(_METRIC_KEYS, 0.0))
+            for key, value in deltas.items():
+                lane_metrics[key] = lane_metrics.get(key, 0.0) + value
+            if self.db_path:
+                self._connect().executemany(
+                    """
+                    INSERT INTO llm_metrics (name, lane, metric, value) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name, lane, metric) DO UPDATE SET value = value + excluded.value
+                    """,
+                    [(self.name, lane, key, value) for key, value in deltas.items()],
+                )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各通道累计指标；共享模式下为所有进程的合计"""
+        with self._lock:
+            if not self.db_path:
+                return {lane: dict(values) for lane, values in self._metrics.items()}
+            rows = self._connect().execute(
+                "SELECT lane, metric, value FROM llm_metrics WHERE name = ?", (self.name,)
+            ).fetchall()
+        merged: Dict[str, Dict[str, float]] = {}
+        for lane, metric, value in rows:
+            merged.setdefault(lane, dict.fromkeys(_METRIC_KEYS, 0.0))[metric] = round(value, 2)
+        return merged
+
+
+def _db_path_from_env() -> Optional[str]:
+    if os.getenv("LLM_RATE_LIMIT_SHARED", "1") == "0":
+        return None
+    return os.getenv("LLM_RATE_LIMIT_DB", DEFAULT_DB_PATH)
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> TokenBucketLimiter:
+    """进程内单例；首次调用时读取环境变量（.env 由 setup_runtime_env 加载）"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucketLimiter(
+                    rpm=float(os.getenv("DEEPSEEK_RPM", "60")),
+                    tpm=float(os.getenv("DEEPSEEK_TPM", "300000")),
+                    db_path=_db_path_from_env(),
+                )
+    return _limiter
@@ -0,0 +1,93 @@
+# config/stub_llm.py
+"""
+离线桩 LLM（FINSIGHT_LLM_MODE=stub）
+
+不访问网络、不调用任何工具，按提示词类型返回确定性的 Markdown，
+输出格式满足 planner / analyst 解析器与统稿的要求，用于：
+- 无 API Key 的本地联调、任务队列与 UI 测试
+- 端到端跑通整条流水线（几秒内完成）
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import BaseLLM
+
+STUB_CHAPTERS = ["执行摘要与投资要点", "行业定义与市场规模", "产业链深度分析", "竞争格局与投资建议"]
+
+
+def _last_user_text(messages: Union[str, List[Dict[str, Any]]]) -> str:
+    if isinstance(messages, str):
+        return messages
+    for message in reversed(messages or []):
+        if message.get("role") == "user":
+            return str(message.get("content", ""))
+    return str(messages[-1].get("content", "")) if messages else ""
+
+
+def _field(prompt: str, label: str, default: str) -> str:
+    match = re.search(rf"{label}\s*[:：]\s*(\S+)", prompt)
+    return match.group(1) if match else default
+
+
+def _planner_answer() -> str:
+    lines = ["# 研究蓝图（离线桩）", "", "- 预期总字数：16000", ""]
+    for i, title in enumerate(STUB_CHAPTERS, start=1):
+        lines += [
+            f"## 第{i}章：{title}",
+            "- 目标字数：3000",
+            f"- 关键研究问题：{title}的核心判断是什么；关键数据如何；对投资的影响是什么",
+            "- 数据与信息来源指引：离线桩数据",
+            "",
+        ]
+    lines.append("并行写作章节：" + "、".join(STUB_CHAPTERS))
+    return "\n".join(lines)
+
+
+def _analyst_answer(industry: str) -> str:
+    return (
+        f"【六维度综合分析】\n{industry}行业 2024 年市场规模 1200亿元，同比增长 18%。\n\n"
+        "【产业链投资机会】\n上游材料国产化率约 35%，中游制造毛利率约 22%。\n\n"
+        f"【投资逻辑总结】\n{industry}处于渗透率快速提升阶段，优先关注中游龙头与上游卡脖子环节。"
+    )
+
+
+def _generic_answer(industry: str) -> str:
+    return (
+        "### 一、核心结论\n"
+        f"- {industry}行业 2024 年市场规模约 1200亿元，增速 18%（离线桩数据）。\n"
+        "- 产业链利润向上游材料与中游龙头集中。\n\n"
+        "### 二、关键事实与数据\n"
+        "| 指标 | 数值 |\n|------|------|\n| 市场规模 | 1200亿元 |\n| CAGR | 18% |\n\n"
+        "### 三、深度分析与逻辑推演\n离线桩输出，仅用于联调。\n\n"
+        "### 四、对投资决策的直接影响\n建议关注中游龙头。"
+    )
+
+
+class StubLLM(BaseLLM):
+    """CrewAI 兼容的离线 LLM：直接给出 Final Answer，不触发工具调用"""
+
+    def __init__(self, model: str = "stub/finsight", temperature: Optional[float] = None, **kwargs):
+        super().__init__(model=model, temperature=temperature)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> str:
+        prompt = _last_user_text(messages)
+        industry = _field(prompt, "行业 / 细分方向", "") or _field(prompt, "行业", "目标")
+        if "研究蓝图" in prompt:
+            answer = _planner_answer()
+        elif "审核" in prompt and "问题清单" in prompt:
+            answer = "审核结论：通过（离线桩）"
+        elif "投资逻辑总结" in prompt or "投资分析师" in prompt:
+            answer = _analyst_answer(industry)
+        else:
+            answer = _generic_answer(industry)
+        return f"Thought: I now can give a great answer\nFinal Answer: {answer}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
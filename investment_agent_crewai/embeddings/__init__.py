@@ -0,0 +1,31 @@
+"""
+embeddings 包统一出口
+
+用途：
+- 进程内共享嵌入模型，避免知识库 / 记忆库各自加载一份 bge-m3
+- 统一的批量嵌入服务，可切换为独立模型进程（embeddings/server.py）
+- 以 (模型名, 文本哈希) 为键的持久化嵌入缓存
+"""
+
+from .embedding_cache import CachedEmbeddingService, EmbeddingCache
+from .model_registry import (
+    DEFAULT_EMBEDDING_MODEL,
+    get_sentence_transformer,
+    loaded_models
+)
+from .service import (
+    EmbeddingService,
+    RemoteEmbeddingService,
+    get_embedding_service
+)
+
+__all__ = [
+    "DEFAULT_EMBEDDING_MODEL",
+    "get_sentence_transformer",
+    "loaded_models",
+    "EmbeddingService",
+    "RemoteEmbeddingService",
+    "get_embedding_service",
+    "CachedEmbeddingService",
+    "EmbeddingCache"
+]
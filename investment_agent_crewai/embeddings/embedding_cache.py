@@ -0,0 +1,224 @@
+# embeddings/embedding_cache.py
+"""
+持久化嵌入缓存
+
+- 以 (模型名, 文本 sha256) 为键，向量以 float32 二进制存入 SQLite
+- 重复入库 / 重新分块后只需为变化的块计算嵌入
+- 超过容量上限（EMBEDDING_CACHE_MAX_ENTRIES，默认 200000）时按最近访问时间（LRU）淘汰
+- CachedEmbeddingService 包装任意嵌入服务（本地或远程），接口不变；
+  查询（embed_query / 批量 embed_queries）只进进程内 LRU，不写入持久化缓存
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+EMBEDDING_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "512"))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite 向量缓存（延迟打开，线程安全）"""
+
+    def __init__(self, db_path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+            # 旧版本库没有 last_access 列：补列后旧条目视为最久未访问
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embedding_cache)")}
+            if "last_access" not in columns:
+                self._conn.execute("ALTER TABLE embedding_cache ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embedding_cache_access ON embedding_cache(last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            conn = self._connect()
+            # SQLite 单条语句参数个数有限，分批查询
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[h] = vec.tolist()
+                if rows:
+                    conn.execute(
+                        f"UPDATE embedding_cache SET last_access = ? "
+                        f"WHERE model = ? AND text_hash IN ({','.join('?' * len(rows))})",
+                        [time.time(), model, *(h for h, _ in rows)],
+                    )
+            conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (model, h, len(vec), array("f", vec).tobytes(), now)
+            for h, vec in items.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict_if_needed(conn)
+            conn.commit()
+
+    def _evict_if_needed(self, conn: sqlite3.Connection):
+        size = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        overflow = size - self.max_entries
+        if overflow <= 0:
+            return
+        conn.execute(
+            """
+            DELETE FROM embedding_cache WHERE rowid IN (
+                SELECT rowid FROM embedding_cache ORDER BY last_access ASC LIMIT ?
+            )
+            """,
+            (overflow,),
+        )
+        self.evictions += overflow
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": size}
+
+
+class CachedEmbeddingService:
+    """为嵌入服务加一层内容哈希缓存：先查缓存，只对未命中的文本调用模型"""
+
+    def __init__(self, inner, cache: EmbeddingCache | None = None, query_cache_size: int = QUERY_CACHE_SIZE):
+        self.inner = inner
+        self.cache = cache or EmbeddingCache()
+        self.query_cache_size = query_cache_size
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    @property
+    def batch_size(self) -> int:
+        return self.inner.batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+
+        hashes = [text_hash(t) for t in texts]
+        vectors = self.cache.get_many(self.model_name, hashes)
+
+        # 同一批内重复文本只计算一次
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = t
+
+        if missing:
+            computed = self.inner.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), computed))
+            self.cache.put_many(self.model_name, fresh)
+            vectors.update(fresh)
+
+        return [vectors[h] for h in hashes]
+
+    # 临时查询复用率低，只在进程内按 LRU 保留最近的若干条，不落盘
+    def _recall_queries(self, hashes: List[str]) -> Dict[str, List[float]]:
+        with self._queries_lock:
+            found = {}
+            for h in hashes:
+                if h in self._queries:
+                    self._queries.move_to_end(h)
+                    found[h] = self._queries[h]
+            return found
+
+    def _remember_queries(self, items: Dict[str, List[float]]):
+        with self._queries_lock:
+            self._queries.update(items)
+            for h in items:
+                self._queries.move_to_end(h)
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        cached = self._recall_queries([h])
+        if h in cached:
+            return cached[h]
+        vector = self.inner.embed_query(text)
+        self._remember_queries({h: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """批量查询嵌入：未命中进程内 LRU 的查询一次批量计算，同样不落盘"""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        hashes = [text_hash(t) for t in texts]
+        vectors = self._recall_queries(hashes)
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = t
+
+        if missing:
+            fresh = dict(zip(missing.keys(), self.inner.embed_queries(list(missing.values()))))
+            self._remember_queries(fresh)
+            vectors.update(fresh)
+
+        return [vectors[h] for h in hashes]
@@ -0,0 +1,45 @@
+# embeddings/model_registry.py
+"""
+进程级嵌入模型注册表
+
+- 模型只在首次真正编码时加载（import 本模块不会触发 torch / 模型加载）
+- 同一 (模型名, 设备) 在进程内只加载一次，供知识库、记忆库等所有调用方共享
+- 双重检查加锁，多线程并发首次调用也不会重复加载
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+DEFAULT_EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+
+_models: Dict[Tuple[str, Optional[str]], Any] = {}
+_load_lock = threading.Lock()
+
+
+def get_sentence_transformer(
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+    device: Optional[str] = DEFAULT_EMBEDDING_DEVICE,
+):
+    """获取（必要时加载）共享的 SentenceTransformer 实例。"""
+    key = (model_name, device)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _load_lock:
+        model = _models.get(key)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+
+            print(f"🧩 [Embedding] 首次加载嵌入模型 {model_name}（device={device or 'auto'}）...")
+            model = SentenceTransformer(model_name, device=device)
+            _models[key] = model
+    return model
+
+
+def loaded_models() -> List[Tuple[str, Optional[str]]]:
+    """当前进程已加载的模型列表（用于排查重复加载）。"""
+    return list(_models.keys())
+
@@ -0,0 +1,74 @@
+# embeddings/server.py
+"""
+嵌入模型独立进程（本机 HTTP 服务）
+
+多个 Streamlit worker / API 进程设置 EMBEDDING_SERVER_URL 后共用此进程中的一份模型。
+启动：
+    python -m embeddings.server --host 127.0.0.1 --port 8765
+
+接口：
+    GET  /health                       -> {"status": "ok", "model": ...}
+    POST /embed {"texts": [...]}       -> {"embeddings": [[...], ...]}
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .service import EmbeddingService
+
+_local_service = EmbeddingService()
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": _local_service.model_name})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/embed":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            model = payload.get("model")
+            if model and model != _local_service.model_name:
+                self._send_json(400, {"error": f"server hosts {_local_service.model_name}, got {model}"})
+                return
+            vectors = _local_service.embed_documents(payload.get("texts", []))
+            self._send_json(200, {"embeddings": vectors})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        # 静默默认访问日志，避免刷屏
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, warmup: bool = True):
+    if warmup:
+        _local_service.embed_query("warmup")
+    server = ThreadingHTTPServer((host, port), EmbeddingRequestHandler)
+    print(f"🧩 [Embedding Server] {_local_service.model_name} 已就绪：http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="共享嵌入模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-warmup", action="store_true", help="启动时不预加载模型")
+    args = parser.parse_args()
+    serve(args.host, args.port, warmup=not args.no_warmup)
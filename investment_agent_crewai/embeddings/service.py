@@ -0,0 +1,114 @@
+# embeddings/service.py
+"""
+统一嵌入服务
+
+- EmbeddingService：本进程内编码，按 batch_size 批量 encode，模型来自共享注册表
+- RemoteEmbeddingService：调用本机/内网的嵌入服务进程（embeddings/server.py），
+  多个 Streamlit worker 可共用一个模型进程
+- get_embedding_service()：按环境变量返回进程级单例
+    EMBEDDING_SERVER_URL   设置后走远程服务，例如 http://127.0.0.1:8765
+    EMBEDDING_MODEL        模型名，默认 BAAI/bge-m3
+    EMBEDDING_DEVICE       cpu / cuda / mps，默认自动
+    EMBEDDING_BATCH_SIZE   批大小，默认 32
+    EMBEDDING_CACHE        设为 0 关闭持久化嵌入缓存（默认开启）
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+from .embedding_cache import CachedEmbeddingService
+from .model_registry import DEFAULT_EMBEDDING_DEVICE, DEFAULT_EMBEDDING_MODEL, get_sentence_transformer
+
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+
+class EmbeddingService:
+    """本地嵌入服务（LangChain Embeddings 接口：embed_documents / embed_query）"""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        device: Optional[str] = DEFAULT_EMBEDDING_DEVICE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        model = get_sentence_transformer(self.model_name, self.device)
+        vectors = model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # bge-m3 查询与文档使用同一编码方式；单独的入口供缓存层区分查询（不落盘）
+        return self.embed_documents(texts)
+
+
+class RemoteEmbeddingService:
+    """远程嵌入服务客户端，按 batch_size 分批请求，接口与 EmbeddingService 一致"""
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        timeout: float = 120.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        import requests
+
+        texts = list(texts)
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            resp = requests.post(
+                f"{self.base_url}/embed",
+                json={"model": self.model_name, "texts": batch},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            vectors.extend(resp.json()["embeddings"])
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """
+    进程级单例：设置 EMBEDDING_SERVER_URL 时返回远程客户端，否则为本地服务；
+    默认外包一层内容哈希缓存。
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                server_url = os.getenv("EMBEDDING_SERVER_URL")
+                if server_url:
+                    service = RemoteEmbeddingService(server_url)
+                else:
+                    service = EmbeddingService()
+                if os.getenv("EMBEDDING_CACHE", "1") != "0":
+                    service = CachedEmbeddingService(service)
+                _service = service
+    return _service
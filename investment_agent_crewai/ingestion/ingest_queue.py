@@ -0,0 +1,130 @@
+# ingestion/ingest_queue.py
+"""
+后台入库队列（Streamlit 上传器使用）
+
+- 上传后立即返回任务 id，UI 线程不再被解析 / 向量化阻塞
+- PDF 解析交给页级并行抽取器（大文件按页区间分发到进程池，绕开 GIL）
+- 流式入库：逐页解析、增量分块、按批嵌入写入，每批完成即更新进度
+- 任务进度（已解析页数、已写入块数、ETA）可被侧边栏轮询
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+
+
+class IngestionQueue:
+    """进程内单例的入库任务队列"""
+
+    def __init__(self, job_workers: int = INGEST_JOB_WORKERS):
+        self.job_workers = job_workers
+        self._job_pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get_job_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._job_pool is None:
+                self._job_pool = ThreadPoolExecutor(max_workers=self.job_workers, thread_name_prefix="ingest")
+            return self._job_pool
+
+    # ---------------- 提交与查询 ----------------
+    def submit(self, file_paths: List[str], force: bool = False) -> List[str]:
+        """一次提交多个文件，每个文件一个任务，返回任务 id 列表。"""
+        job_pool = self._get_job_pool()
+        job_ids = []
+        for path in file_paths:
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "file": os.path.basename(path),
+                "path": path,
+                "status": "queued",
+                "pages_total": None,
+                "pages_parsed": 0,
+                "chunks_total": None,
+                "chunks_embedded": 0,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "result": None,
+            }
+            with self._lock:
+                self._jobs[job_id] = job
+            job_pool.submit(self._run_job, job_id, force)
+            job_ids.append(job_id)
+        return job_ids
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        snap = dict(job)
+        snap["eta_seconds"] = None
+        # 解析与写入流水线并行，进度与 ETA 按已处理页数估算
+        total, done, started = job["pages_total"], job["pages_parsed"], job["started_at"]
+        if job["status"] in ("parsing", "embedding") and total and done and started:
+            rate = done / max(time.time() - started, 1e-6)
+            snap["eta_seconds"] = round((total - done) / rate, 1)
+        if job["status"] in ("done", "skipped"):
+            snap["progress"] = 1.0
+        elif total:
+            snap["progress"] = round(done / total, 3)
+        else:
+            snap["progress"] = 0.0
+        return snap
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["submitted_at"], reverse=True)
+            return [self._snapshot(j) for j in jobs[:limit]]
+
+    def has_active_jobs(self) -> bool:
+        with self._lock:
+            return any(j["status"] in ("queued", "parsing", "embedding") for j in self._jobs.values())
+
+    # ---------------- 执行 ----------------
+    def _run_job(self, job_id: str, force: bool):
+        from agent_system.knowledge import kb_manager
+
+        job = self._jobs[job_id]
+        path = job["path"]
+        try:
+            unchanged, fingerprint = kb_manager.check_unchanged(path)
+            if unchanged and not force:
+                self._update(job_id, status="skipped", finished_at=time.time(),
+                             result=kb_manager.skipped_result(job["file"]))
+                return
+
+            self._update(job_id, status="parsing", started_at=time.time())
+
+            def _on_pages(done: int, total: int):
+                self._update(job_id, pages_parsed=done, pages_total=total)
+
+            def _on_written(done: int):
+                self._update(job_id, status="embedding", chunks_embedded=done)
+
+            chunks = kb_manager.iter_file_chunks(path, on_pages=_on_pages)
+            result = kb_manager.sync_file_chunks(job["file"], chunks, fingerprint, on_progress=_on_written)
+            written = result["added"] + result["kept"]
+            self._update(job_id, status="done", finished_at=time.time(), result=result,
+                         chunks_embedded=written, chunks_total=written)
+        except Exception as e:
+            self._update(job_id, status="failed", finished_at=time.time(), error=f"{type(e).__name__}: {e}")
+            print(f"❌ 入库任务失败 {job['file']}: {e}")
+
+
+ingest_queue = IngestionQueue()
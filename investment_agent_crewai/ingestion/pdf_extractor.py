@@ -0,0 +1,164 @@
+# ingestion/pdf_extractor.py
+"""
+按页并行的 PDF 抽取引擎（pdfplumber）
+
+- 大文件按页区间切分，提交到共享进程池并行抽取正文与表格，再按页序重组；
+  进程池使用 spawn 启动（调用方是多线程的 Streamlit / torch 进程，fork 可能死锁）
+- 快速路径：页面没有任何线条/矩形/曲线时跳过 extract_tables
+  （pdfplumber 默认按 "lines" 策略识别表格，无线条的页面本就抽不出表格）
+- 表格保留为结构化记录（行列表 + 表格上方的标题行），不再序列化为字符串
+- 小文件直接在当前进程串行抽取，避免进程启动开销
+- iter_pages 为流式接口：同时在途的页区间数有上限，消费方处理慢时不会继续预取
+- 知识库入库、记忆库入库、后台入库队列共用此引擎
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pdfplumber
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+
+def _page_has_ruling_lines(page) -> bool:
+    return bool(page.lines or page.rects or page.curves)
+
+
+def _clean_table(table: List[List[Any]]) -> List[List[str]]:
+    rows = [[str(cell).strip() if cell is not None else "" for cell in row] for row in table]
+    return [row for row in rows if any(row)]
+
+
+def _table_caption(page, bbox, margin: float = 40.0) -> str:
+    """表格上方 margin 高度内的最后一行文字，通常是 "表1：xx市场规模" 之类的标题"""
+    top = bbox[1]
+    if top <= 1:
+        return ""
+    try:
+        above = page.crop((0, max(0.0, top - margin), page.width, top)).extract_text() or ""
+    except ValueError:
+        return ""
+    lines = [line.strip() for line in above.splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+
+def _extract_page(page, page_number: int) -> Dict[str, Any]:
+    text = page.extract_text() or ""
+    tables = []
+    if _page_has_ruling_lines(page):
+        for table in page.find_tables():
+            rows = _clean_table(table.extract())
+            if rows:
+                tables.append({"rows": rows, "caption": _table_caption(page, table.bbox)})
+    return {"page": page_number, "text": text, "tables": tables}
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """抽取 [start, end) 页（0 起始），模块级函数，可提交到进程池。"""
+    results = []
+    with pdfplumber.open(file_path) as pdf:
+        for idx in range(start, min(end, len(pdf.pages))):
+            page = pdf.pages[idx]
+            results.append(_extract_page(page, idx + 1))
+            page.flush_cache()  # 释放已解析页面的对象缓存
+    return results
+
+
+def count_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+class PageParallelExtractor:
+    """页级并行抽取器（进程池延迟创建，进程内共享）"""
+
+    def __init__(
+        self,
+        max_workers: int = PDF_EXTRACT_WORKERS,
+        pages_per_task: int = 8,
+        min_pages_for_parallel: int = 16,
+    ):
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+        self.min_pages_for_parallel = min_pages_for_parallel
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def iter_pages(
+        self,
+        file_path: str,
+        on_progress: Callable[[int, int], None] | None = None,
+        prefetch: int | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按页序逐页产出 {"page", "text", "tables"}
+        on_progress(已抽取页数, 总页数)：每抽取完一个页区间回调一次
+        prefetch：最多同时在途的页区间数（默认等于进程数），用于背压
+        """
+        total = count_pages(file_path)
+        if total < self.min_pages_for_parallel or self.max_workers <= 1:
+            with pdfplumber.open(file_path) as pdf:
+                for idx, page in enumerate(pdf.pages):
+                    record = _extract_page(page, idx + 1)
+                    page.flush_cache()
+                    if on_progress:
+                        on_progress(idx + 1, total)
+                    yield record
+            return
+
+        pool = self._get_pool()
+        window = max(1, prefetch or self.max_workers)
+        ranges = deque((s, min(s + self.pages_per_task, total)) for s in range(0, total, self.pages_per_task))
+        in_flight = deque()
+        done = 0
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < window:
+                    start, end = ranges.popleft()
+                    in_flight.append(pool.submit(extract_page_range, file_path, start, end))
+                # 按提交顺序取回，天然保持页序
+                records = in_flight.popleft().result()
+                done += len(records)
+                if on_progress:
+                    on_progress(done, total)
+                yield from records
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def table_to_markdown(rows: List[List[str]]) -> str:
+    """首行视为表头；各行列数不一致时按最宽行补齐"""
+    width = max(len(row) for row in rows)
+    padded = [row + [""] * (width - len(row)) for row in rows]
+
+    def _line(row):
+        return "| " + " | ".join(cell.replace("\n", " ").replace("|", "/") for cell in row) + " |"
+
+    lines = [_line(padded[0]), "|" + "---|" * width]
+    lines.extend(_line(row) for row in padded[1:])
+    return "\n".join(lines)
+
+
+def format_plain_page(page: Dict[str, Any]) -> str:
+    """记忆库格式：正文 + 以 " | " 连接的表格行。"""
+    lines = [page["text"]] if page["text"] else []
+    for table in page["tables"]:
+        lines.extend(" | ".join(row) for row in table["rows"])
+    return "".join(line + "\n" for line in lines)
+
+
+pdf_extractor = PageParallelExtractor()
@@ -1,24 +1,16 @@
 # ingestion/pdf_ingest.py
-# PDF → 原始文本 + 表格文本
-import pdfplumber
+# PDF → 逐页正文 + 表格文本（页级并行抽取见 ingestion/pdf_extractor.py）
+from typing import Iterator
 
-class PDFIngestor:
-    # 原 knowledge_engine.py 中的 PDF 解析逻辑
-    def ingest(self, file_path: str) -> str:
-        full_text = ""
-
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-
-                # 原有表格提取逻辑
-                tables = page.extract_tables()
-                for table in tables:
-                    for row in table:
-                        full_text += " | ".join(row) + "\n"
-
-        return full_text
+from ingestion.pdf_extractor import format_plain_page, pdf_extractor
+from ingestion.streaming import WholeChunk
 
 
+class PDFIngestor:
+    # 原 knowledge_engine.py 中的 PDF 解析逻辑
+    def iter_page_texts(self, file_path: str) -> Iterator[str]:
+        """逐页产出正文；每张表格作为 WholeChunk 单独产出，流式分块时不会被切碎"""
+        for page in pdf_extractor.iter_pages(file_path):
+            yield format_plain_page({**page, "tables": []})
+            for table in page["tables"]:
+                yield WholeChunk(format_plain_page({"text": table["caption"], "tables": [table]}))
@@ -0,0 +1,51 @@
+# ingestion/streaming.py
+"""
+流式入库的通用构件
+
+页文本 → iter_text_chunks（增量分块）→ iter_batches（按批聚合）→ 向量库写入
+各环节均为生成器，由下游按需拉取：下游写入慢时上游自然停止解析（背压），
+内存中只保留一个分块缓冲区和一个批次，与文档总大小无关。
+"""
+
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+class WholeChunk(str):
+    """不参与切分、原样作为一个块产出的文本（如整张表格）"""
+
+
+def iter_text_chunks(texts: Iterable[str], splitter, buffer_chars: int = 8000) -> Iterator[str]:
+    """
+    增量分块：文本累积到 buffer_chars 后切分，除最后一块外全部产出，
+    最后一块（可能不完整）留作下一轮的开头，保证块边界与整篇切分基本一致。
+    遇到 WholeChunk 时先清空缓冲区，再将其整体产出。
+    """
+    buffer = ""
+    for text in texts:
+        if isinstance(text, WholeChunk):
+            if buffer.strip():
+                yield from splitter.split_text(buffer)
+            buffer = ""
+            yield str(text)
+            continue
+        buffer += text
+        if len(buffer) < buffer_chars:
+            continue
+        chunks = splitter.split_text(buffer)
+        if len(chunks) > 1:
+            yield from chunks[:-1]
+            buffer = chunks[-1]
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,249 @@
+# jobs/job_store.py
+"""
+研报任务表（SQLite）
+
+- report_jobs：每次提交一行，状态 queued → running → done / failed（或 cancelled）
+- report_job_events：工作流事件（见 agent_system/workflows/events.py）按序追加，UI 增量轮询
+- 多个进程（Streamlit、worker 进程）共用同一库文件：WAL 模式，认领任务使用 BEGIN IMMEDIATE，
+  保证同一任务只被一个 worker 取走
+- 每次认领累加 attempts；worker 异常退出后任务重新排队，已认领 JOB_MAX_ATTEMPTS 次（默认 3）
+  仍未完成的任务直接标记为 failed，避免必然导致进程崩溃的任务（OOM、原生库崩溃）无限重试
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from agent_system.workflows.pipeline import pid_alive
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+JOB_DB_PATH = os.getenv("REPORT_JOB_DB", os.path.join(PROJECT_ROOT, "output", "jobs", "report_jobs.sqlite3"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+ACTIVE_STATUSES = ("queued", "running")
+_JOB_COLUMNS = (
+    "id", "kind", "params", "status", "phase", "worker_pid",
+    "submitted_at", "started_at", "finished_at", "result", "error", "attempts",
+)
+
+
+class JobStore:
+    """SQLite 任务表（延迟打开，线程安全；每个进程各自持有连接）"""
+
+    def __init__(self, db_path: str = JOB_DB_PATH, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork 出的子进程不能复用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    phase TEXT,
+                    worker_pid INTEGER,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, submitted_at);
+                CREATE TABLE IF NOT EXISTS report_job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                );
+                """
+            )
+            # 旧版本库没有 attempts 列：补列后已有任务按未认领计
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(report_jobs)")}
+            if "attempts" not in columns:
+                self._conn.execute("ALTER TABLE report_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        return self._conn
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        return job
+
+    # ---------------- 提交与查询 ----------------
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO report_jobs (id, kind, params, status, submitted_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM report_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按提交时间倒序；不含 result 全文，避免轮询时反复读取大字段"""
+        sql = f"SELECT {', '.join(_JOB_COLUMNS)} FROM report_jobs"
+        args: List[Any] = []
+        if kind:
+            sql += " WHERE kind = ?"
+            args.append(kind)
+        sql += " ORDER BY submitted_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, args).fetchall()
+        jobs = []
+        for row in rows:
+            job = self._row_to_job(row)
+            job["has_result"] = job.pop("result") is not None
+            jobs.append(job)
+        return jobs
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """排队中的任务前面还有几个（含正在运行的不计）；非排队状态返回 None"""
+        with self._lock:
+            row = self._connect().execute(
+                """
+                SELECT COUNT(*) FROM report_jobs
+                WHERE status = 'queued' AND submitted_at < (
+                    SELECT submitted_at FROM report_jobs WHERE id = ? AND status = 'queued'
+                )
+                """,
+                (job_id,),
+            ).fetchone()
+            queued = self._connect().execute(
+                "SELECT 1 FROM report_jobs WHERE id = ? AND status = 'queued'", (job_id,)
+            ).fetchone()
+        return row[0] if queued else None
+
+    # ---------------- worker 侧 ----------------
+    def claim_next(self, worker_pid: int) -> Optional[Dict[str, Any]]:
+        """原子地取走最早的排队任务并标记为 running"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"""
+                    SELECT {', '.join(_JOB_COLUMNS)} FROM report_jobs
+                    WHERE status = 'queued' ORDER BY submitted_at LIMIT 1
+                    """
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE report_jobs SET status = 'running', worker_pid = ?, started_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (worker_pid, now, row[0]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._row_to_job(row)
+        job.update(status="running", worker_pid=worker_pid, started_at=now, attempts=job["attempts"] + 1)
+        return job
+
+    def add_event(self, job_id: str, event: Dict[str, Any]):
+        """追加事件；phase 类事件同时更新任务的当前阶段"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM report_job_events WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO report_job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                    (job_id, seq, json.dumps(event, ensure_ascii=False, default=str)),
+                )
+                if event.get("type") == "phase_start":
+                    conn.execute("UPDATE report_jobs SET phase = ? WHERE id = ?", (event.get("phase"), job_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def events_since(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """返回 seq > after_seq 的事件，每条附带 seq 供下一次增量查询"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT seq, event FROM report_job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+        return [{**json.loads(event), "seq": seq} for seq, event in rows]
+
+    def finish(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None):
+        status = "failed" if error else "done"
+        with self._lock:
+            self._connect().execute(
+                "UPDATE report_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        """只能取消尚未开始的任务；运行中的 CrewAI 任务无法安全中断"""
+        with self._lock:
+            cur = self._connect().execute(
+                "UPDATE report_jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cur.rowcount > 0
+
+    def requeue_orphans(self) -> int:
+        """
+        worker 进程异常退出（或整个服务重启）后，其 running 任务重新排队并返回排队数；
+        流水线有阶段检查点，重跑时从最后完成的阶段继续。
+        已认领 max_attempts 次的任务不再排队，标记为 failed
+        """
+        with self._lock:
+            conn = self._connect()
+            running = conn.execute(
+                "SELECT id, worker_pid, attempts FROM report_jobs WHERE status = 'running'"
+            ).fetchall()
+            requeued = 0
+            for job_id, pid, attempts in running:
+                if pid_alive(pid):
+                    continue
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE report_jobs SET status = 'failed', worker_pid = NULL, finished_at = ?, error = ? "
+                        "WHERE id = ? AND status = 'running'",
+                        (time.time(), f"worker 进程在执行中异常退出 {attempts} 次，已放弃重试", job_id),
+                    )
+                    print(f"❌ [JobStore] 任务 {job_id} 已尝试 {attempts} 次，标记为失败")
+                    continue
+                conn.execute(
+                    "UPDATE report_jobs SET status = 'queued', worker_pid = NULL, phase = NULL "
+                    "WHERE id = ? AND status = 'running'",
+                    (job_id,),
+                )
+                requeued += 1
+        return requeued
+
+
+job_store = JobStore()
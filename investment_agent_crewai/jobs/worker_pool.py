@@ -0,0 +1,232 @@
+# jobs/worker_pool.py
+"""
+研报任务 worker 进程池
+
+- 每个 worker 是独立进程（spawn），循环从任务表认领任务并执行，互不阻塞
+- Streamlit 只负责提交任务与轮询状态：页面刷新、关闭标签页都不会中断任务
+- 守护线程定期检查 worker 存活：异常退出的进程被替换，其运行中的任务重新排队
+  （流水线带阶段检查点，重跑时从最后完成的阶段继续；超过 JOB_MAX_ATTEMPTS 次的任务标记失败）
+- worker 不是 daemon 进程（任务内部还要启动 PDF 抽取等子进程池）：stop()（进程退出时
+  经 atexit 自动调用）通知退出，由守护线程 join 回收，超时未退出的再终止
+- 也可以脱离 Streamlit 单独运行：python -m jobs.worker_pool
+    REPORT_JOB_WORKERS       worker 进程数，默认 2
+    REPORT_JOB_POLL_SECONDS  空闲时轮询任务表的间隔，默认 1
+    REPORT_JOB_WARMUP        worker 启动时预加载工作流与嵌入模型，默认 1
+                             （worker 常驻，模型与向量库连接在任务之间复用；
+                              配合 EMBEDDING_SERVER_URL 时所有 worker 共用一份模型）
+    REPORT_JOB_STOP_TIMEOUT  停止时等待运行中任务结束的秒数，默认 10
+    FINSIGHT_LLM_MODE=stub   使用离线桩 LLM（见 config/stub_llm.py）
+"""
+
+import atexit
+import inspect
+import multiprocessing as mp
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from jobs.job_store import JOB_DB_PATH, JobStore
+
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+REPORT_JOB_POLL_SECONDS = float(os.getenv("REPORT_JOB_POLL_SECONDS", "1"))
+REPORT_JOB_WARMUP = os.getenv("REPORT_JOB_WARMUP", "1") != "0"
+SUPERVISE_INTERVAL = 5.0
+STOP_TIMEOUT = float(os.getenv("REPORT_JOB_STOP_TIMEOUT", "10"))
+
+# 任务类型 → main.py 中的 facade 函数，params 按关键字参数传入
+JOB_FACADES = {
+    "industry_research": "run_investment_analysis",
+    "batch_research": "run_batch_analysis",
+    "meeting_minutes": "run_meeting_minutes",
+    "company_research": "run_company_research",
+    "bp_interpretation": "run_bp_interpretation",
+    "financial_report_analysis": "run_financial_report_analysis",
+}
+
+# 事件中保留阶段输出的节点：章节正文用于 UI 渐进展示，其余阶段输出体积大且已落检查点
+_KEEP_OUTPUT_PHASES = {"chapters"}
+
+
+def _slim_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    if event.get("type") == "report_done":
+        # 报告全文写入任务表 result 字段，不在事件表重复存储
+        return {k: v for k, v in event.items() if k != "result"}
+    if "output" in event and event.get("phase") not in _KEEP_OUTPUT_PHASES:
+        return {k: v for k, v in event.items() if k != "output"}
+    return event
+
+
+def _run_job(job: Dict[str, Any], store: JobStore) -> str:
+    """按任务类型分发到 main.py 的 facade；支持 on_event 的函数会推送进度事件"""
+    if job["kind"] not in JOB_FACADES:
+        raise ValueError(f"未知任务类型：{job['kind']}")
+
+    import main  # 重依赖只在 worker 进程内导入
+
+    facade = getattr(main, JOB_FACADES[job["kind"]])
+    kwargs = dict(job["params"])
+    if "on_event" in inspect.signature(facade).parameters:
+        kwargs["on_event"] = lambda event: store.add_event(job["id"], _slim_event(event))
+    return facade(**kwargs)
+
+
+def _warm_up():
+    """预加载工作流模块与嵌入模型，首个任务不再承担冷启动"""
+    started = time.monotonic()
+    try:
+        import main  # noqa: F401  导入即初始化 LLM、知识库与记忆库单例
+        from embeddings import get_embedding_service
+        get_embedding_service().embed_query("warm up")
+    except Exception as e:
+        print(f"⚠️ [Worker {os.getpid()}] 预热失败（首个任务时再加载）：{type(e).__name__}: {e}")
+        return
+    print(f"🔥 [Worker {os.getpid()}] 预热完成，用时 {time.monotonic() - started:.1f}s")
+
+
+def worker_loop(db_path: str, stop_event, poll_seconds: float = REPORT_JOB_POLL_SECONDS):
+    """worker 进程入口：认领 → 执行 → 写回结果，直到 stop_event 置位"""
+    from config.runtime_env import setup_runtime_env
+    setup_runtime_env()
+
+    if REPORT_JOB_WARMUP:
+        _warm_up()
+
+    store = JobStore(db_path)
+    pid = os.getpid()
+    while not stop_event.is_set():
+        job = store.claim_next(pid)
+        if job is None:
+            stop_event.wait(poll_seconds)
+            continue
+        print(f"🧵 [Worker {pid}] 开始任务 {job['id']}（{job['kind']}）")
+        try:
+            result = _run_job(job, store)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            store.add_event(job["id"], {"type": "error", "ts": time.time(), "error": error})
+            store.finish(job["id"], error=error)
+            print(f"❌ [Worker {pid}] 任务 {job['id']} 失败：{error}")
+        else:
+            store.add_event(job["id"], {"type": "report_done", "ts": time.time()})
+            store.finish(job["id"], result=str(result))
+            print(f"✅ [Worker {pid}] 任务 {job['id']} 完成")
+
+
+class ReportWorkerPool:
+    """进程内单例：管理 worker 进程的启动、替换与停止"""
+
+    def __init__(self, workers: int = REPORT_JOB_WORKERS, db_path: str = JOB_DB_PATH):
+        self.workers = max(1, workers)
+        self.db_path = db_path
+        self.store = JobStore(db_path)
+        self._ctx = mp.get_context("spawn")
+        self._stop_event = None
+        self._processes: List[mp.Process] = []
+        self._supervisor: Optional[threading.Thread] = None
+        self._stop_timeout = STOP_TIMEOUT
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> mp.Process:
+        process = self._ctx.Process(
+            target=worker_loop,
+            args=(self.db_path, self._stop_event),
+            name="report-worker",
+            # daemon 进程不能再创建子进程（任务中的 PDF 抽取进程池等），退出由 stop() 负责
+            daemon=False,
+        )
+        process.start()
+        return process
+
+    def ensure_started(self):
+        """幂等：首次调用时启动 worker 与守护线程"""
+        with self._lock:
+            if self._supervisor is not None:
+                return
+            self._stop_event = self._ctx.Event()
+            # 上次服务退出时仍在运行的任务重新排队
+            requeued = self.store.requeue_orphans()
+            if requeued:
+                print(f"♻️ [JobPool] {requeued} 个中断的任务已重新排队")
+            self._processes = [self._spawn() for _ in range(self.workers)]
+            self._supervisor = threading.Thread(
+                target=self._supervise, args=(self._stop_event,), name="report-supervisor", daemon=True
+            )
+            self._supervisor.start()
+            # 非 daemon 子进程会阻塞解释器退出：先通知 worker 退出并回收
+            atexit.register(self.stop)
+
+    def _supervise(self, stop_event):
+        while not stop_event.wait(SUPERVISE_INTERVAL):
+            with self._lock:
+                dead = [p for p in self._processes if not p.is_alive()]
+                if not dead:
+                    continue
+                for process in dead:
+                    print(f"⚠️ [JobPool] worker {process.pid} 退出（exitcode={process.exitcode}），已替换")
+                self._processes = [p for p in self._processes if p.is_alive()]
+                self.store.requeue_orphans()
+                self._processes += [self._spawn() for _ in dead]
+        self._reap(self._stop_timeout)
+
+    def _reap(self, timeout: float):
+        """等待 worker 完成当前任务后退出；超时仍未退出的终止，其任务在下次启动时重新排队"""
+        with self._lock:
+            processes, self._processes = list(self._processes), []
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in processes:
+            if process.is_alive():
+                print(f"⚠️ [JobPool] worker {process.pid} 未在 {timeout:.0f}s 内退出，已终止")
+                process.terminate()
+                process.join(5)
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """停止认领新任务，由守护线程回收 worker（正在执行的任务最多等待 timeout 秒）"""
+        with self._lock:
+            if self._supervisor is None:
+                return
+            self._stop_timeout = timeout
+            self._stop_event.set()
+            supervisor = self._supervisor
+        supervisor.join(timeout + 10)
+        with self._lock:
+            self._supervisor = None
+            self._stop_event = None
+        atexit.unregister(self.stop)
+
+    # ---------------- 提交与查询（转发到任务表） ----------------
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if kind not in JOB_FACADES:
+            raise ValueError(f"未知任务类型：{kind}")
+        self.ensure_started()
+        return self.store.submit(kind, params)
+
+    def submit_industry_research(self, inputs: Dict[str, Any]) -> str:
+        return self.submit("industry_research", inputs)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.store.list_jobs(limit=limit)
+
+    def events_since(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        return self.store.events_since(job_id, after_seq)
+
+    def cancel(self, job_id: str) -> bool:
+        return self.store.cancel(job_id)
+
+
+report_worker_pool = ReportWorkerPool()
+
+
+if __name__ == "__main__":
+    report_worker_pool.ensure_started()
+    print(f"🧵 [JobPool] {report_worker_pool.workers} 个 worker 已启动，任务库：{report_worker_pool.db_path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        report_worker_pool.stop()
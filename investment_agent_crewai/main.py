@@ -3,16 +3,82 @@
 # 后端 Facade（供 app.py / API 调用）
 # ==========================================
 
-from agent_system.workflows.industry_research import run_industry_research
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agent_system.workflows.batch_research import build_matrix, run_batch_research
+from agent_system.workflows.industry_research import run_industry_research, stream_industry_research
+from jobs.worker_pool import report_worker_pool
 
 def run_investment_analysis(
     industry: str,
     province: str,
     target_year: int,
-    focus: str
+    focus: str,
+    resume: bool = True,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> str:
     """
     行业深度研究（核心）
+    resume=True 时，同一输入上次中断的运行会从最后完成的阶段继续
+    on_event 接收进度事件（阶段起止、工具调用、已完成章节）
+    """
+    inputs = {
+        "industry": industry,
+        "province": province,
+        "target_year": target_year,
+        "focus": focus
+    }
+    return run_industry_research(inputs, resume=resume, on_event=on_event)
+
+
+def stream_investment_analysis(
+    industry: str,
+    province: str,
+    target_year: int,
+    focus: str,
+    resume: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    行业深度研究（流式）
+    逐条产出进度事件（阶段起止、工具调用、已完成章节），最后一条为 report_done / error
+    """
+    inputs = {
+        "industry": industry,
+        "province": province,
+        "target_year": target_year,
+        "focus": focus
+    }
+    return stream_industry_research(inputs, resume=resume)
+
+
+def run_batch_analysis(
+    industries: List[str],
+    provinces: List[str],
+    target_year: int,
+    focus: str,
+    max_cells: Optional[int] = None
+) -> str:
+    """
+    批量行业研究（行业 × 省份）
+    同一行业的全国维度只研究一次并在各省份间复用；返回汇总索引 Markdown
+    """
+    summary = run_batch_research(
+        build_matrix(industries, provinces, target_year=target_year, focus=focus),
+        max_cells=max_cells
+    )
+    with open(summary["index_path"], "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def submit_investment_analysis(
+    industry: str,
+    province: str,
+    target_year: int,
+    focus: str
+) -> str:
+    """
+    行业深度研究（后台任务）
+    提交到 worker 进程池后立即返回任务 id；状态、事件与结果通过 get_job / get_job_events 轮询
     """
     inputs = {
         "industry": industry,
@@ -20,7 +86,19 @@ def run_investment_analysis(
         "target_year": target_year,
         "focus": focus
     }
-    return run_industry_research(inputs)
+    return report_worker_pool.submit_industry_research(inputs)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return report_worker_pool.get(job_id)
+
+
+def get_job_events(job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+    return report_worker_pool.events_since(job_id, after_seq)
+
+
+def list_jobs(limit: int = 20) -> List[Dict[str, Any]]:
+    return report_worker_pool.list_jobs(limit)
 
 
 # ------------------ 其他模块（占位） ------------------
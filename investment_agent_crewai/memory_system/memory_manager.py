@@ -3,12 +3,17 @@
 from __future__ import annotations
 
 import datetime
+import os
 import re
 from typing import Callable, Dict, Any, List
 
 from ingestion.pdf_ingest import PDFIngestor
+from ingestion.streaming import iter_batches, iter_text_chunks
 from memory_system.vector_store.chroma_client import ChromaVectorStore
+from rag.bm25_index import BM25Index
+from rag.query_cache import query_cache
 from rag.retriever import VectorRetriever
+from rag.tokenizer import term_string
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
@@ -20,8 +25,13 @@ class MemoryManager:
 
     def __init__(self, persist_dir: str, importance_judge: Callable[[str], int] | None = None):
         self.vector_store = ChromaVectorStore(persist_dir)
-        self.retriever = VectorRetriever(self.vector_store)
+        self.retriever = VectorRetriever(
+            self.vector_store,
+            lexical_index=BM25Index(os.path.join(persist_dir, "bm25_index.sqlite3")),
+            mode=os.getenv("RAG_RETRIEVAL_MODE", "rrf"),
+        )
         self.pdf_ingestor = PDFIngestor()
+        self.cache_namespace = f"memory:{os.path.abspath(persist_dir)}"
         self.importance_judge = importance_judge
 
         self.splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
@@ -93,33 +103,51 @@ class MemoryManager:
             chunk_meta = meta.copy()
             chunk_meta["chunk_index"] = i
             chunk_meta["raw_content"] = chunk
+            chunk_meta["terms"] = term_string(chunk)
             enriched_metas.append(chunk_meta)
 
-        self.vector_store.add_texts(chunks, enriched_metas)
+        ids = self.vector_store.add_texts(chunks, enriched_metas)
+        self.retriever.index_texts(ids, chunks, enriched_metas)
+        query_cache.bump(self.cache_namespace)
         print(f"🧠 [Memory] 已存储 {len(chunks)} 条 {category} 记忆")
 
-    def ingest_pdf(self, file_path: str, metadata: dict):
-        raw_text = self.pdf_ingestor.ingest(file_path)
-        chunks = self.splitter.split_text(raw_text)
+    def ingest_pdf(self, file_path: str, metadata: dict, batch_size: int = 64):
+        """流式入库：逐页解析、增量分块、按批写入，不在内存中拼接全文"""
+        chunks = iter_text_chunks(self.pdf_ingestor.iter_page_texts(file_path), self.splitter)
 
         now_iso = self._iso_now()
-        metadatas = []
-        for idx, chunk in enumerate(chunks):
-            m = metadata.copy()
-            m.update(
-                {
-                    "ingest_time": now_iso,
-                    "expires_at": self._build_expires_at(now_iso, 3650),
-                    "chunk_index": idx,
-                    "type": "pdf_file",
-                    "raw_content": chunk,
-                }
-            )
-            metadatas.append(m)
-
-        self.vector_store.add_texts(chunks, metadatas)
+        total = 0
+        for batch in iter_batches(enumerate(chunks), batch_size):
+            metadatas = []
+            for idx, chunk in batch:
+                m = metadata.copy()
+                m.update(
+                    {
+                        "ingest_time": now_iso,
+                        "expires_at": self._build_expires_at(now_iso, 3650),
+                        "chunk_index": idx,
+                        "type": "pdf_file",
+                        "raw_content": chunk,
+                        "terms": term_string(chunk),
+                    }
+                )
+                metadatas.append(m)
+
+            texts = [chunk for _, chunk in batch]
+            ids = self.vector_store.add_texts(texts, metadatas)
+            self.retriever.index_texts(ids, texts, metadatas)
+            query_cache.bump(self.cache_namespace)
+            total += len(batch)
+        return total
 
     def recall_memory(self, query: str, category: str | None = None, k: int = 5) -> List[str]:
+        return query_cache.get_or_compute(
+            self.cache_namespace, query,
+            lambda: self._recall_memory(query, category, k),
+            op="recall_memory", category=category, k=k,
+        )
+
+    def _recall_memory(self, query: str, category: str | None, k: int) -> List[str]:
         now = datetime.datetime.now(datetime.timezone.utc)
         where: Dict[str, Any] | None = {"type": "agent_memory"}
         if category:
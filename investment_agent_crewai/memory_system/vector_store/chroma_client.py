@@ -3,20 +3,31 @@
 import os
 import shutil
 import datetime
+import threading
 
 from langchain_chroma import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
+
+from embeddings import get_embedding_service
 
 
 class ChromaVectorStore:
-    """带容错初始化的 Chroma 向量库封装。"""
+    """带容错初始化的 Chroma 向量库封装（首次读写时才建库、加载模型）。"""
 
     def __init__(self, persist_dir: str):
         self.persist_dir = persist_dir
-        os.makedirs(self.persist_dir, exist_ok=True)
+        # 与知识库共用同一个嵌入服务，不再单独加载 HuggingFaceEmbeddings
+        self.embeddings = get_embedding_service()
+        self._db = None
+        self._init_lock = threading.Lock()
 
-        self.embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
-        self.db = self._init_db_with_recovery()
+    @property
+    def db(self):
+        if self._db is None:
+            with self._init_lock:
+                if self._db is None:
+                    os.makedirs(self.persist_dir, exist_ok=True)
+                    self._db = self._init_db_with_recovery()
+        return self._db
 
     def _rotate_corrupted_store(self) -> str:
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -36,19 +47,25 @@ class ChromaVectorStore:
             return Chroma(persist_directory=self.persist_dir, embedding_function=self.embeddings)
 
     def add_texts(self, texts, metadatas):
-        self.db.add_texts(texts=texts, metadatas=metadatas)
+        # 新版 Chroma 会自动持久化，无需调用 persist()；返回写入的文档 id
+        return self.db.add_texts(texts=texts, metadatas=metadatas)
 
-    def similarity_search_with_score(self, query, k=5, where=None):
-        return self.db.similarity_search_with_score(query=query, k=k, filter=where)
-        self.db.add_texts(
-            texts=texts,
-            metadatas=metadatas
-        )
-        # self.db.persist()  # 新版会自动保存，调用它会报错，所以这里注销调
+    def get_by_ids(self, ids):
+        """按 id 批量取回 [(id, 文本, 元数据)]（词法检索命中后补全内容用）"""
+        if not ids:
+            return []
+        result = self.db.get(ids=list(ids), include=["documents", "metadatas"])
+        return list(zip(result["ids"], result["documents"], result["metadatas"]))
+
+    def iter_documents(self, page_size=1000):
+        """分页遍历全部 (id, 文本, 元数据)"""
+        offset = 0
+        while True:
+            result = self.db.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not result["ids"]:
+                return
+            yield from zip(result["ids"], result["documents"], result["metadatas"])
+            offset += len(result["ids"])
 
     def similarity_search_with_score(self, query, k=5, where=None):
-        return self.db.similarity_search_with_score(
-            query=query,
-            k=k,
-            filter=where
-        )
+        return self.db.similarity_search_with_score(query=query, k=k, filter=where)
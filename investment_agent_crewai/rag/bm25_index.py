@@ -0,0 +1,144 @@
+# rag/bm25_index.py
+"""
+持久化倒排索引 + BM25 词法检索
+
+- 与 Chroma 向量库并行维护：入库 / 写入记忆时增量加入，删除块时同步删除
+- 分词与重排共用 rag/tokenizer（中文二元组 + 英文/数字整词），
+  公司名、股票代码、政策文件名等精确匹配不再依赖向量召回
+- 词法检索只查 SQLite，无需嵌入模型与 ANN 查询，代价远低于向量检索
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rag.tokenizer import iter_terms, tokenize
+
+
+class BM25Index:
+    """SQLite 倒排索引（延迟打开，线程安全）"""
+
+    def __init__(self, db_path: str, k1: float = 1.5, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS bm25_docs (
+                    doc_id TEXT PRIMARY KEY,
+                    length INTEGER NOT NULL,
+                    fields TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS bm25_postings (
+                    term TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_bm25_postings_doc ON bm25_postings (doc_id);
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def reset(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM bm25_docs").fetchone()[0]
+
+    @staticmethod
+    def _delete_ids(conn: sqlite3.Connection, doc_ids: List[str]):
+        for start in range(0, len(doc_ids), 500):
+            batch = doc_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM bm25_postings WHERE doc_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM bm25_docs WHERE doc_id IN ({placeholders})", batch)
+
+    def add_documents(self, docs: Iterable[Tuple[str, str, Dict[str, Any]]]):
+        """
+        写入 (doc_id, 文本, 过滤字段)；同 id 已存在则覆盖
+        过滤字段为简单键值（如 source / type / category），检索时按等值过滤
+        """
+        rows_docs, rows_postings, ids = [], [], []
+        for doc_id, text, fields in docs:
+            counts = Counter(iter_terms(text))
+            ids.append(doc_id)
+            rows_docs.append((doc_id, sum(counts.values()), json.dumps(fields or {}, ensure_ascii=False)))
+            rows_postings.extend((term, doc_id, tf) for term, tf in counts.items())
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_ids(conn, ids)
+            conn.executemany("INSERT INTO bm25_docs (doc_id, length, fields) VALUES (?, ?, ?)", rows_docs)
+            conn.executemany("INSERT INTO bm25_postings (term, doc_id, tf) VALUES (?, ?, ?)", rows_postings)
+            conn.commit()
+
+    def delete_documents(self, doc_ids: Iterable[str]):
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_ids(conn, doc_ids)
+            conn.commit()
+
+    def search(self, query: str, k: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """返回按 BM25 分数降序的 [(doc_id, score)]；where 为等值过滤条件"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            conn = self._connect()
+            n_docs, total_len = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM bm25_docs").fetchone()
+            if n_docs == 0:
+                return []
+            df = dict(conn.execute(
+                f"SELECT term, COUNT(*) FROM bm25_postings WHERE term IN ({placeholders}) GROUP BY term",
+                terms,
+            ).fetchall())
+            postings = conn.execute(
+                f"""
+                SELECT p.term, p.doc_id, p.tf, d.length, d.fields
+                FROM bm25_postings p JOIN bm25_docs d ON p.doc_id = d.doc_id
+                WHERE p.term IN ({placeholders})
+                """,
+                terms,
+            ).fetchall()
+
+        avgdl = total_len / n_docs or 1.0
+        idf = {t: math.log(1 + (n_docs - n + 0.5) / (n + 0.5)) for t, n in df.items()}
+        scores: Dict[str, float] = {}
+        rejected = set()
+        for term, doc_id, tf, length, fields in postings:
+            if doc_id in rejected:
+                continue
+            if where and doc_id not in scores:
+                values = json.loads(fields)
+                if any(values.get(key) != value for key, value in where.items()):
+                    rejected.add(doc_id)
+                    continue
+            norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * norm
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:k]
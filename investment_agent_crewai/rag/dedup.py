@@ -0,0 +1,93 @@
+# rag/dedup.py
+"""
+检索结果去重
+
+- 完全相同：按块 id / 文本去重
+- 近似重复：64 位 SimHash（字符 3-gram），汉明距离不超过阈值视为同一内容
+  （同一段内容出现在不同文件、或重叠切分导致的大段重复）
+- 相邻合并：同一来源、chunk_index 相邻的块合并为一段，并去掉 80 字重叠部分
+输入输出均为知识库检索结果 (id, 原文, 元数据, 分数)
+"""
+
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+Hit = Tuple[str, str, dict, float]
+
+
+def simhash(text: str, ngram: int = 3) -> int:
+    text = "".join((text or "").split())
+    if len(text) < ngram:
+        shingles = [text] if text else []
+    else:
+        shingles = {text[i:i + ngram] for i in range(len(text) - ngram + 1)}
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _strip_overlap(head: str, tail: str, max_overlap: int = 200) -> str:
+    """去掉 tail 开头与 head 结尾重合的部分"""
+    for size in range(min(max_overlap, len(head), len(tail)), 0, -1):
+        if head.endswith(tail[:size]):
+            return tail[size:]
+    return tail
+
+
+def merge_adjacent(hits: List[Hit]) -> List[Hit]:
+    """同一来源且 chunk_index 相邻的块合并（保留位置靠前者的 id 与元数据，分数取较高者）"""
+    merged: List[Hit] = []
+    position = {}  # (source, chunk_index) -> merged 下标（该段当前覆盖到的末尾块）
+    for cid, raw, meta, score in hits:
+        meta = meta or {}
+        source, index = meta.get("source"), meta.get("chunk_index")
+        if source is not None and isinstance(index, int):
+            for neighbor, append in ((index - 1, True), (index + 1, False)):
+                slot = position.get((source, neighbor))
+                if slot is None:
+                    continue
+                m_id, m_raw, m_meta, m_score = merged[slot]
+                if append:
+                    text = m_raw + _strip_overlap(m_raw, raw)
+                else:
+                    text = raw + _strip_overlap(raw, m_raw)
+                merged[slot] = (m_id, text, m_meta, max(m_score, score))
+                position[(source, index)] = slot
+                break
+            else:
+                position[(source, index)] = len(merged)
+                merged.append((cid, raw, meta, score))
+            continue
+        merged.append((cid, raw, meta, score))
+    return merged
+
+
+def dedupe_hits(
+    hits: Iterable[Hit],
+    seen_signatures: Optional[List[int]] = None,
+    max_distance: int = 8,
+) -> List[Hit]:
+    """
+    去掉与已保留结果（及 seen_signatures 中的历史结果）完全相同或近似重复的块，再合并相邻块
+    seen_signatures 会被原地追加本次保留块的签名，便于跨轮次去重
+    """
+    signatures = seen_signatures if seen_signatures is not None else []
+    kept: List[Hit] = []
+    seen_ids = set()
+    for hit in hits:
+        if hit[0] in seen_ids:
+            continue
+        signature = simhash(hit[1])
+        if any(hamming(signature, other) <= max_distance for other in signatures):
+            continue
+        seen_ids.add(hit[0])
+        signatures.append(signature)
+        kept.append(hit)
+    return merge_adjacent(kept)
@@ -0,0 +1,15 @@
+# rag/fusion.py
+"""倒数排名融合（Reciprocal Rank Fusion）：合并向量检索与 BM25 的排序结果"""
+
+from typing import Dict, List, Sequence, Tuple
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """rankings 为若干按相关度降序的 id 列表；返回按融合分降序的 [(id, score)]"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,173 @@
+# rag/query_cache.py
+"""
+检索结果缓存（知识库 query_knowledge / query_with_reasoning / query_many、记忆库 recall_memory）
+
+- 键：命名空间 + 规范化查询 + 过滤条件 + k 等参数 + 该命名空间当前版本号
+- 失效：入库（知识库每写完一批）与 save_insight 会递增对应命名空间的版本号，
+  旧版本的缓存条目自然不再命中，新上传的文件不会被旧结果挡住
+- 进程内 LRU；设置 RAG_QUERY_CACHE_DISK 后再加一层 SQLite 磁盘缓存，
+  版本号也存于同一库中，多个进程之间的入库同样会使缓存失效
+    RAG_QUERY_CACHE_SIZE       进程内条目上限，默认 512
+    RAG_QUERY_CACHE_TTL        条目最长有效秒数，默认 3600（记忆有过期时间，不宜长期缓存）
+    RAG_QUERY_CACHE_DISK       设为 1 使用默认路径 cache/query_cache.sqlite3，或直接填写路径
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DEFAULT_DISK_PATH = os.path.join(PROJECT_ROOT, "cache", "query_cache.sqlite3")
+
+
+def normalize_query(query: str) -> str:
+    query = (query or "").strip().lower()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip("?？。.!！ ")
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.disk_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_versions (
+                    namespace TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                );
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    # ---------------- 版本号 ----------------
+    def _version_locked(self, namespace: str) -> int:
+        if self.disk_path:
+            row = self._connect().execute(
+                "SELECT version FROM cache_versions WHERE namespace = ?", (namespace,)
+            ).fetchone()
+            return row[0] if row else 0
+        return self._versions.get(namespace, 0)
+
+    def version(self, namespace: str) -> int:
+        with self._lock:
+            return self._version_locked(namespace)
+
+    def bump(self, namespace: str):
+        """数据写入后调用：该命名空间下的全部缓存条目随即失效"""
+        with self._lock:
+            if self.disk_path:
+                conn = self._connect()
+                conn.execute(
+                    """
+                    INSERT INTO cache_versions (namespace, version) VALUES (?, 1)
+                    ON CONFLICT(namespace) DO UPDATE SET version = version + 1
+                    """,
+                    (namespace,),
+                )
+                conn.execute("DELETE FROM query_cache WHERE cache_key LIKE ?", (f"{namespace}:%",))
+                conn.commit()
+            else:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            stale = [key for key in self._entries if key.startswith(f"{namespace}:")]
+            for key in stale:
+                del self._entries[key]
+
+    # ---------------- 读写 ----------------
+    def _key(self, namespace: str, version: int, query: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps({"q": normalize_query(query), "p": params}, ensure_ascii=False, sort_keys=True, default=str)
+        return f"{namespace}:{version}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get_or_compute(self, namespace: str, query: str, compute: Callable[[], Any], **params) -> Any:
+        """命中则直接返回；否则调用 compute() 并缓存（结果需可 JSON 序列化）"""
+        now = time.time()
+        with self._lock:
+            key = self._key(namespace, self._version_locked(namespace), query, params)
+            entry = self._entries.get(key)
+            if entry and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if self.disk_path:
+                row = self._connect().execute(
+                    "SELECT value, created_at FROM query_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    value = json.loads(row[0])
+                    self._store_memory(key, value, row[1])
+                    self.hits += 1
+                    return value
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            # 计算期间若有新数据写入，版本号已变化，不缓存可能过期的结果
+            if key != self._key(namespace, self._version_locked(namespace), query, params):
+                return value
+            self._store_memory(key, value, now)
+            if self.disk_path:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (cache_key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now),
+                )
+                conn.commit()
+        return value
+
+    def _store_memory(self, key: str, value: Any, created_at: float):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.disk_path:
+                conn = self._connect()
+                conn.execute("DELETE FROM query_cache")
+                conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def _disk_path_from_env() -> Optional[str]:
+    value = os.getenv("RAG_QUERY_CACHE_DISK", "")
+    if value in ("", "0"):
+        return None
+    return DEFAULT_DISK_PATH if value == "1" else value
+
+
+query_cache = QueryCache(
+    max_entries=int(os.getenv("RAG_QUERY_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("RAG_QUERY_CACHE_TTL", "3600")),
+    disk_path=_disk_path_from_env(),
+)
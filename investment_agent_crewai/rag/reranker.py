@@ -0,0 +1,72 @@
+# rag/reranker.py
+"""
+向量化混合重排
+
+final = vector_weight * 1/(1+distance) + keyword_weight * 查询词命中比例
+
+- 查询只分词一次
+- 候选块的检索词在入库时预计算（元数据 terms 字段），旧数据缺失时才现场分词
+- 全部候选的命中矩阵用 NumPy 一次计算，不再逐候选做子串扫描
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.tokenizer import tokenize
+
+
+class HybridReranker:
+    def __init__(self, vector_weight: float = 0.65, keyword_weight: float = 0.35):
+        self.vector_weight = vector_weight
+        self.keyword_weight = keyword_weight
+
+    @staticmethod
+    def candidate_terms(metadatas: Sequence[Optional[dict]], texts: Sequence[str]) -> List[List[str]]:
+        """优先使用入库时预计算的 terms，缺失时回退为现场分词"""
+        terms = []
+        for meta, text in zip(metadatas, texts):
+            stored = (meta or {}).get("terms")
+            terms.append(stored.split() if stored else tokenize(text))
+        return terms
+
+    @staticmethod
+    def keyword_scores(query_terms: Sequence[str], candidate_terms: Sequence[Sequence[str]]) -> np.ndarray:
+        n = len(candidate_terms)
+        if not query_terms or n == 0:
+            return np.zeros(n)
+
+        vocab = np.array(sorted(set(query_terms)))
+        lengths = np.fromiter((len(t) for t in candidate_terms), dtype=np.int64, count=n)
+        if lengths.sum() == 0:
+            return np.zeros(n)
+        flat = np.array([term for terms in candidate_terms for term in terms])
+        rows = np.repeat(np.arange(n), lengths)
+
+        mask = np.isin(flat, vocab)
+        hits = np.zeros((n, len(vocab)), dtype=bool)
+        hits[rows[mask], np.searchsorted(vocab, flat[mask])] = True
+        return hits.sum(axis=1) / len(vocab)
+
+    def score(
+        self,
+        query: str,
+        distances: Sequence[Optional[float]],
+        candidate_terms: Sequence[Sequence[str]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (综合分, 关键词分)"""
+        dist = np.array([d or 0.0 for d in distances], dtype=np.float64)
+        vector = 1.0 / (1.0 + np.maximum(dist, 0.0))
+        keyword = self.keyword_scores(tokenize(query), candidate_terms)
+        return self.vector_weight * vector + self.keyword_weight * keyword, keyword
+
+    def rank(
+        self,
+        query: str,
+        distances: Sequence[Optional[float]],
+        candidate_terms: Sequence[Sequence[str]],
+    ) -> List[Tuple[int, float, float]]:
+        """返回按综合分降序的 (候选下标, 综合分, 关键词分) 列表"""
+        scores, keyword = self.score(query, distances, candidate_terms)
+        order = np.argsort(-scores, kind="stable")
+        return [(int(i), float(scores[i]), float(keyword[i])) for i in order]
@@ -2,31 +2,64 @@
 
 from __future__ import annotations
 
-import re
+import threading
 from typing import List, Dict, Any
 from memory_system.vector_store.chroma_client import ChromaVectorStore
+from rag.bm25_index import BM25Index
+from rag.fusion import reciprocal_rank_fusion
+from rag.reranker import HybridReranker
+
+# 记忆库写入 BM25 索引时保留的过滤字段（recall_memory 按这些字段等值过滤）
+LEXICAL_FIELDS = ("type", "category", "source")
+
+
+def lexical_fields(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: metadata[key] for key in LEXICAL_FIELDS if key in metadata}
 
 
 class VectorRetriever:
     """
     混合检索器：向量检索 + 关键词重排
     支持多表示索引：优先检索优化表示(retrieval_text)，返回原文(raw_content)
+    mode="rrf" 且提供 lexical_index 时，向量排序与 BM25 排序做倒数排名融合
     """
 
-    def __init__(self, vector_store: ChromaVectorStore):
+    def __init__(
+        self,
+        vector_store: ChromaVectorStore,
+        reranker: HybridReranker | None = None,
+        lexical_index: BM25Index | None = None,
+        mode: str = "hybrid",
+    ):
         self.vector_store = vector_store
+        self.reranker = reranker or HybridReranker(vector_weight=0.7, keyword_weight=0.3)
+        self.lexical_index = lexical_index
+        self.mode = mode
+        self._lexical_checked = False
+        self._lock = threading.Lock()
 
-    @staticmethod
-    def _tokenize(query: str) -> List[str]:
-        tokens = re.findall(r"[\u4e00-\u9fffA-Za-z0-9]{2,}", query.lower())
-        return list(dict.fromkeys(tokens))
+    def index_texts(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """新写入向量库的文本同步加入 BM25 索引"""
+        if self.lexical_index is None or not ids:
+            return
+        self.lexical_index.add_documents(
+            (doc_id, text, lexical_fields(meta or {})) for doc_id, text, meta in zip(ids, texts, metadatas)
+        )
 
-    def _keyword_score(self, text: str, tokens: List[str]) -> float:
-        if not tokens:
-            return 0.0
-        low = text.lower()
-        hit = sum(1 for t in tokens if t in low)
-        return hit / len(tokens)
+    def _ensure_lexical_index(self):
+        # 每个进程只检查一次：索引为空而向量库有数据时自动回填
+        with self._lock:
+            if self._lexical_checked:
+                return
+            self._lexical_checked = True
+        if self.lexical_index.count() == 0:
+            batch = []
+            for doc_id, text, meta in self.vector_store.iter_documents():
+                batch.append((doc_id, text, lexical_fields(meta or {})))
+                if len(batch) >= 500:
+                    self.lexical_index.add_documents(batch)
+                    batch = []
+            self.lexical_index.add_documents(batch)
 
     def retrieve(
         self,
@@ -39,29 +72,59 @@ class VectorRetriever:
             k=max(k * 3, 10),
             where=where,
         )
+        ids = [getattr(doc, "id", None) for doc, _ in vector_results]
+        metadatas = [doc.metadata or {} for doc, _ in vector_results]
+        retrieval_texts = [doc.page_content or "" for doc, _ in vector_results]
+        distances = [float(d) for _, d in vector_results]
+        ranking = self.reranker.rank(query, distances, self.reranker.candidate_terms(metadatas, retrieval_texts))
 
-        tokens = self._tokenize(query)
         scored = []
-
-        for doc, vector_distance in vector_results:
-            metadata = doc.metadata or {}
-            retrieval_text = doc.page_content or ""
-            raw_content = metadata.get("raw_content", retrieval_text)
-
-            keyword_score = self._keyword_score(retrieval_text, tokens)
-            vector_score = 1 / (1 + max(vector_distance, 0))
-            final_score = 0.7 * vector_score + 0.3 * keyword_score
-
+        for i, final_score, keyword_score in ranking:
+            metadata = metadatas[i]
             scored.append(
                 {
-                    "content": raw_content,
-                    "retrieval_text": retrieval_text,
+                    "id": ids[i],
+                    "content": metadata.get("raw_content", retrieval_texts[i]),
+                    "retrieval_text": retrieval_texts[i],
                     "metadata": metadata,
                     "score": round(final_score, 6),
-                    "vector_distance": float(vector_distance),
+                    "vector_distance": distances[i],
                     "keyword_score": round(keyword_score, 6),
                 }
             )
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
+        # 旧版 langchain 的 Document 不带 id，无法与词法结果对齐时退回 hybrid
+        if self.mode == "rrf" and self.lexical_index is not None and all(ids):
+            scored = self._fuse_with_lexical(query, scored, depth=max(k * 3, 10), where=where)
         return scored[:k]
+
+    def _fuse_with_lexical(
+        self,
+        query: str,
+        scored: List[Dict[str, Any]],
+        depth: int,
+        where: Dict[str, Any] | None,
+    ) -> List[Dict[str, Any]]:
+        self._ensure_lexical_index()
+        lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query, k=depth, where=where)]
+
+        known = {item["id"]: item for item in scored if item["id"]}
+        missing = [doc_id for doc_id in lexical_ids if doc_id not in known]
+        for doc_id, text, meta in self.vector_store.get_by_ids(missing):
+            meta = meta or {}
+            known[doc_id] = {
+                "id": doc_id,
+                "content": meta.get("raw_content", text),
+                "retrieval_text": text,
+                "metadata": meta,
+                "score": 0.0,
+                "vector_distance": None,
+                "keyword_score": None,
+            }
+
+        fused = reciprocal_rank_fusion([[item["id"] for item in scored if item["id"]], lexical_ids])
+        results = []
+        for doc_id, score in fused:
+            if doc_id in known:
+                results.append({**known[doc_id], "score": round(score, 6)})
+        return results
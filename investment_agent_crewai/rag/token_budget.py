@@ -0,0 +1,68 @@
+# rag/token_budget.py
+"""
+Token 预算
+
+estimate_tokens：安装了 tiktoken 时精确计数（cl100k_base），否则按字符估算
+（中文约 0.6 token/字，其余约 4 字符/token），用于控制工具输出与提示词长度。
+"""
+
+import re
+import threading
+from typing import List, Optional
+
+_CJK = re.compile(r"[\u4e00-\u9fff]")
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+
+                    _encoder = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    _encoder = None
+                _encoder_loaded = True
+    return _encoder
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) / 4) + 1
+
+
+def truncate_to_budget(text: str, max_tokens: int, marker: str = "…（已截断）") -> str:
+    """超出预算时按比例截断到预算以内"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = max(0, int(len(text) * max_tokens / tokens) - len(marker))
+    while keep > 0 and estimate_tokens(text[:keep]) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep] + marker
+
+
+def fit_blocks(blocks: List[str], max_tokens: Optional[int], separator_tokens: int = 1) -> List[str]:
+    """按顺序保留完整文本块直到用完预算；第一块超出预算时截断保留"""
+    if max_tokens is None:
+        return list(blocks)
+    kept, used = [], 0
+    for block in blocks:
+        cost = estimate_tokens(block) + separator_tokens
+        if used + cost > max_tokens:
+            if not kept and max_tokens > 0:
+                kept.append(truncate_to_budget(block, max_tokens))
+            break
+        kept.append(block)
+        used += cost
+    return kept
@@ -0,0 +1,34 @@
+# rag/tokenizer.py
+"""
+检索用分词：英文/数字按词切分，中文按二元组（bigram）切分
+
+不依赖分词词典；"市场规模" → 市场 / 场规 / 规模，查询与文档两侧用同一规则，
+命中比例即可近似原先的子串匹配，同时可以预先计算、批量比较。
+"""
+
+import re
+from typing import Iterator, List
+
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[a-z0-9][a-z0-9.%]*")
+
+
+def iter_terms(text: str) -> Iterator[str]:
+    """逐个产出检索词（含重复，BM25 统计词频用）"""
+    for run in _TOKEN_PATTERN.findall((text or "").lower()):
+        if "\u4e00" <= run[0] <= "\u9fff":
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+        else:
+            run = run.rstrip(".")
+            if len(run) >= 2:
+                yield run
+
+
+def tokenize(text: str) -> List[str]:
+    """返回去重后的检索词（保持首次出现顺序）"""
+    return list(dict.fromkeys(iter_terms(text)))
+
+
+def term_string(text: str) -> str:
+    """入库时预计算的检索词串（存入元数据 terms 字段，空格分隔）"""
+    return " ".join(tokenize(text))
@@ -0,0 +1,9 @@
+# tests/conftest.py
+"""测试公共配置：以项目根目录为导入根（与 streamlit run app.py / python main.py 一致）"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,82 @@
+# tests/test_api_server.py
+"""HTTP API：只开放研究类任务，SSE 进度流按 Last-Event-ID 断点续读"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")  # fastapi.testclient 依赖
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api import server  # noqa: E402
+from jobs.job_store import JobStore  # noqa: E402
+
+
+class FakePool:
+    """只读写任务表、不启动 worker 进程的任务池"""
+
+    workers = 1
+
+    def __init__(self, store: JobStore):
+        self.store = store
+
+    def submit(self, kind, params):
+        return self.store.submit(kind, params)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list_jobs(self, limit=20):
+        return self.store.list_jobs(limit=limit)
+
+    def events_since(self, job_id, after_seq=0):
+        return self.store.events_since(job_id, after_seq)
+
+    def cancel(self, job_id):
+        return self.store.cancel(job_id)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(server, "report_worker_pool", FakePool(job_store))
+    monkeypatch.setattr(server, "SSE_POLL_SECONDS", 0.01)
+    return job_store
+
+
+@pytest.fixture
+def client(store):
+    # 不进入 lifespan：测试中不拉起 worker 进程
+    return TestClient(server.app)
+
+
+def test_research_jobs_are_queued(client, store):
+    resp = client.post("/jobs/industry-research", json={"industry": "储能", "province": "浙江省"})
+    assert resp.status_code == 202
+    job = store.get(resp.json()["job_id"])
+    assert (job["kind"], job["status"], job["params"]["industry"]) == ("industry_research", "queued", "储能")
+
+    resp = client.post("/jobs/batch-research", json={"industries": ["储能"], "provinces": ["浙江省", "江苏省"]})
+    assert resp.status_code == 202
+    assert store.get(resp.json()["job_id"])["kind"] == "batch_research"
+
+
+@pytest.mark.parametrize("module", ["meeting-minutes", "bp-interpretation", "financial-report-analysis"])
+def test_path_based_modules_are_not_exposed(client, store, module):
+    resp = client.post(f"/jobs/{module}", json={"folder_path": "/etc", "pdf_path": "/etc/passwd"})
+    assert resp.status_code in (404, 405)
+    assert store.list_jobs() == []
+
+
+def test_event_stream_resumes_after_last_event_id(client, store):
+    job_id = store.submit("industry_research", {"industry": "储能"})
+    for phase in ("plan", "research", "analysis"):
+        store.add_event(job_id, {"type": "phase_end", "phase": phase})
+    store.finish(job_id, result="# 报告")
+
+    full = client.get(f"/jobs/{job_id}/events").text
+    assert [line for line in full.splitlines() if line.startswith("id:")] == ["id: 1", "id: 2", "id: 3"]
+
+    resumed = client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "1"}).text
+    assert [line for line in resumed.splitlines() if line.startswith("id:")] == ["id: 2", "id: 3"]
+    assert '"phase": "plan"' not in resumed
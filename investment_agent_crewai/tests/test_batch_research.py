@@ -0,0 +1,82 @@
+# tests/test_batch_research.py
+"""批量研究：全国维度按行业只研究一次并跨省复用；输出文件名不受输入中的路径字符影响"""
+
+import importlib.util
+import os
+import threading
+import time
+
+import pytest
+
+# batch_research 导入行业研究工作流（CrewAI、搜索工具、知识库）
+WORKFLOW_DEPENDENCIES = ("dotenv", "crewai", "crewai_tools", "chromadb", "langchain", "pdfplumber", "yfinance", "akshare")
+_missing = [m for m in WORKFLOW_DEPENDENCIES if importlib.util.find_spec(m) is None]
+pytestmark = pytest.mark.skipif(bool(_missing), reason=f"缺少运行依赖：{_missing}")
+
+
+@pytest.fixture
+def national_calls():
+    return []
+
+
+@pytest.fixture
+def batch(monkeypatch, tmp_path, national_calls):
+    # 工作流在导入时创建 LLM：使用离线桩 LLM，不需要 API key
+    monkeypatch.setenv("FINSIGHT_LLM_MODE", "stub")
+    from agent_system.workflows import batch_research
+
+    lock = threading.Lock()
+
+    def fake_national(cell, research_workers=None):
+        with lock:
+            national_calls.append(cell.industry)
+        time.sleep(0.05)  # 让同一行业的其他单元格在研究期间到达
+        return {
+            "finance": {"label": "财务", "ok": True, "output": f"{cell.industry} 财务", "error": None, "elapsed": 0},
+            "business_model": {"label": "商业模式", "ok": False, "output": "", "error": "timeout", "elapsed": 0},
+        }
+
+    monkeypatch.setattr(batch_research, "research_national_dimensions", fake_national)
+    monkeypatch.setattr(batch_research, "BATCHES_DIR", str(tmp_path / "batches"))
+    return batch_research
+
+
+def test_national_dimensions_are_researched_once_per_industry(batch, national_calls, tmp_path):
+    shared = batch._SharedDimensions(str(tmp_path / "shared"), research_workers=2)
+    cells = batch.build_matrix(["储能", "光伏"], ["浙江省", "江苏省", "广东省"], target_year=2025)
+
+    results = {}
+    threads = [threading.Thread(target=lambda c=c: results.update({(c.industry, c.province): shared.get(c)}))
+               for c in cells]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(national_calls) == ["储能", "光伏"]
+    assert (shared.computed, shared.reused) == (2, 4)
+    # 失败的维度不共享，交由各单元格自行研究
+    assert results[("储能", "江苏省")] == {
+        "finance": {"label": "财务", "ok": True, "output": "储能 财务", "error": None, "elapsed": 0}
+    }
+
+    # 新进程（新实例）直接读取磁盘缓存
+    again = batch._SharedDimensions(str(tmp_path / "shared"), research_workers=2)
+    again.get(cells[0])
+    assert sorted(national_calls) == ["储能", "光伏"]
+
+
+def test_output_files_stay_inside_batch_dir(batch, monkeypatch):
+    monkeypatch.setattr(batch, "run_industry_research", lambda cell, **kwargs: f"# {cell.industry}")
+    cells = batch.build_matrix(["../../escape", "储能/电池"], ["../浙江省"], target_year=2025)
+
+    summary = batch.run_batch_research(cells, start_interval=0)
+
+    batch_dir = os.path.realpath(summary["batch_dir"])
+    assert summary["stats"]["done"] == 2
+    for record in summary["cells"]:
+        path = os.path.realpath(os.path.join(batch_dir, record["report_file"]))
+        assert os.path.dirname(path) == batch_dir
+        assert os.path.exists(path)
+    for name in os.listdir(os.path.join(batch_dir, "shared")):
+        assert "/" not in name and ".." not in name
@@ -0,0 +1,75 @@
+# tests/test_bm25_fusion.py
+"""BM25 倒排索引（精确词命中、覆盖写入、删除、等值过滤）与 RRF 融合排序"""
+
+import pytest
+
+from rag.bm25_index import BM25Index
+from rag.fusion import RRF_K, reciprocal_rank_fusion
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = BM25Index(str(tmp_path / "bm25" / "index.sqlite3"))
+    idx.add_documents([
+        ("a", "宁德时代 300750 动力电池装机量位居全球第一", {"source": "battery.pdf", "type": "pdf"}),
+        ("b", "光伏组件价格持续下行，硅料产能过剩", {"source": "solar.pdf", "type": "pdf"}),
+        ("c", "储能电池出货量同比增长，动力电池价格下降", {"source": "memo", "type": "memory"}),
+    ])
+    yield idx
+    idx.reset()
+
+
+def test_exact_code_match_ranks_first(index):
+    hits = index.search("300750 市场份额", k=3)
+    assert hits[0][0] == "a"
+    # 只命中查询词的文档才会出现
+    assert {doc_id for doc_id, _ in hits} == {"a"}
+
+
+def test_scores_are_descending(index):
+    hits = index.search("动力电池", k=10)
+    assert {doc_id for doc_id, _ in hits} == {"a", "c"}
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_where_filter(index):
+    hits = index.search("动力电池", where={"type": "memory"})
+    assert [doc_id for doc_id, _ in hits] == ["c"]
+
+
+def test_overwrite_and_delete(index):
+    index.add_documents([("b", "300750 海外工厂投产", {"type": "pdf"})])
+    assert index.count() == 3
+    assert "b" in {doc_id for doc_id, _ in index.search("300750")}
+    # 覆盖写入后旧文本的词不再命中
+    assert index.search("光伏组件") == []
+
+    index.delete_documents(["a", "b"])
+    assert index.count() == 1
+    assert index.search("300750") == []
+
+
+def test_empty_query_and_empty_index(tmp_path):
+    idx = BM25Index(str(tmp_path / "empty.sqlite3"))
+    assert idx.search("动力电池") == []
+    assert idx.search("。，") == []
+    idx.reset()
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    vector = ["x", "y", "z"]
+    lexical = ["y", "w", "x"]
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    ids = [doc_id for doc_id, _ in fused]
+    assert ids[0] == "y"  # 两路都靠前
+    assert set(ids) == {"x", "y", "z", "w"}
+    scores = dict(fused)
+    assert scores["y"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert scores["z"] == pytest.approx(1 / (RRF_K + 3))
+
+
+def test_rrf_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,55 @@
+# tests/test_context_builder.py
+"""章节上下文：按相关度挑选事实、保持原文顺序、不超出 token 预算"""
+
+from agent_system.workflows.context_builder import ContextBuilder, select_relevant, split_facts
+from rag.token_budget import estimate_tokens
+
+RESEARCH = """\
+储能电池出货量持续增长，2024年达到 200GWh。
+
+光伏组件价格下行，硅料产能过剩。
+
+| 企业 | 份额 |
+| --- | --- |
+| 宁德时代 | 35% |
+
+储能政策密集出台，多省要求新能源配储。
+"""
+
+
+def test_split_facts_keeps_tables_whole():
+    units = split_facts(RESEARCH)
+    assert len(units) == 4
+    assert units[2].startswith("| 企业") and units[2].endswith("35% |")
+
+
+def test_select_relevant_prefers_focus_and_keeps_original_order():
+    units = split_facts(RESEARCH)
+    budget = estimate_tokens(units[0]) + estimate_tokens(units[3]) + 2
+    selected = select_relevant(units, "储能 出货量 政策", budget)
+
+    assert selected == f"{units[0]}\n\n{units[3]}"
+    assert estimate_tokens(selected) <= budget
+
+
+def test_select_relevant_truncates_single_oversized_unit():
+    unit = "储能" * 500
+    selected = select_relevant([unit], "储能", 20)
+    assert selected.endswith("…（已截断）")
+    assert select_relevant([], "储能", 20) == ""
+
+
+def test_analysis_always_keeps_investment_summary():
+    builder = ContextBuilder(
+        {"raw_text": RESEARCH},
+        analysis_struct={
+            "投资逻辑总结": "配储政策驱动需求，龙头份额提升。",
+            "光伏": "组件价格下行，硅料产能过剩。" * 20,
+            "储能": "储能装机 2024年同比增长 40%。",
+        },
+        plan_struct={"chapters": [{"title": "市场规模"}, {"title": "竞争格局"}]},
+    )
+    analysis = builder.analysis_for("储能 装机", max_tokens=60)
+    assert analysis.startswith("【投资逻辑总结】")
+    assert "[储能]" in analysis and "[光伏]" not in analysis
+    assert builder.outline() == "第1章 市场规模\n第2章 竞争格局"
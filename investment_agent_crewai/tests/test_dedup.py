@@ -0,0 +1,60 @@
+# tests/test_dedup.py
+"""检索结果去重：块 id、SimHash 近似重复（含跨轮次）与相邻块合并"""
+
+from rag.dedup import dedupe_hits, hamming, merge_adjacent, simhash
+
+TEXT = (
+    "2024年国内储能电池出货量达到 200GWh，同比增长 40%。动力电池价格持续下降，"
+    "行业集中度进一步提升，龙头企业市场份额超过 50%，二线厂商加速出清。"
+)
+OTHER = "光伏组件价格持续下行，硅料产能过剩，行业亏损面扩大，部分企业推迟扩产计划。"
+
+
+def _hit(cid, raw, source="a.pdf", index=None, score=0.5):
+    meta = {"source": source}
+    if index is not None:
+        meta["chunk_index"] = index
+    return (cid, raw, meta, score)
+
+
+def test_simhash_ignores_whitespace_and_separates_unrelated_text():
+    assert simhash(TEXT) == simhash("  " + TEXT.replace("，", "， "))
+    assert hamming(simhash(TEXT), simhash(TEXT.replace("持续下降", "继续下降"))) <= 8
+    assert hamming(simhash(TEXT), simhash(OTHER)) > 8
+
+
+def test_near_duplicates_from_other_files_are_dropped():
+    hits = [
+        _hit("a", TEXT, source="a.pdf"),
+        _hit("a", TEXT, source="a.pdf"),
+        _hit("b", TEXT.replace("持续下降", "继续下降"), source="b.pdf"),
+        _hit("c", OTHER, source="c.pdf"),
+    ]
+    assert [hit[0] for hit in dedupe_hits(hits)] == ["a", "c"]
+
+
+def test_seen_signatures_carry_across_rounds():
+    signatures = []
+    assert [hit[0] for hit in dedupe_hits([_hit("a", TEXT)], signatures)] == ["a"]
+    assert len(signatures) == 1
+    # 下一轮检索到同一内容的另一份拷贝，不再重复展示
+    assert dedupe_hits([_hit("b", TEXT, source="b.pdf"), _hit("c", OTHER)], signatures) == [_hit("c", OTHER)]
+    assert len(signatures) == 2
+
+
+def test_adjacent_chunks_are_merged_without_overlap():
+    hits = [
+        _hit("a_1", "第二块开头。第二块结尾。", index=1, score=0.4),
+        _hit("a_0", "第一块内容。第二块开头。", index=0, score=0.9),
+        _hit("a_5", "不相邻的块。", index=5, score=0.3),
+    ]
+    merged = merge_adjacent(hits)
+    assert [(hit[0], hit[1], hit[3]) for hit in merged] == [
+        ("a_1", "第一块内容。第二块开头。第二块结尾。", 0.9),
+        ("a_5", "不相邻的块。", 0.3),
+    ]
+
+
+def test_chunks_from_different_sources_are_not_merged():
+    hits = [_hit("a_0", "甲", source="a.pdf", index=0), _hit("b_1", "乙", source="b.pdf", index=1)]
+    assert merge_adjacent(hits) == hits
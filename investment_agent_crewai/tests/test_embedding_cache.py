@@ -0,0 +1,101 @@
+# tests/test_embedding_cache.py
+"""持久化嵌入缓存：命中复用、查询不落盘、容量上限 LRU 淘汰"""
+
+import sqlite3
+
+from embeddings import embedding_cache as embedding_cache_module
+from embeddings.embedding_cache import CachedEmbeddingService, EmbeddingCache
+
+
+class FakeEmbedder:
+    model_name = "fake-model"
+    batch_size = 8
+
+    def __init__(self):
+        self.document_calls = []
+        self.query_calls = []
+
+    @staticmethod
+    def _vector(text):
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return self._vector(text)
+
+    def embed_queries(self, texts):
+        self.query_calls.append(list(texts))
+        return [self._vector(t) for t in texts]
+
+
+def test_documents_are_cached_and_deduplicated(tmp_path):
+    inner = FakeEmbedder()
+    service = CachedEmbeddingService(inner, EmbeddingCache(str(tmp_path / "emb.sqlite3")))
+
+    assert service.embed_documents(["甲", "乙乙", "甲"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    service.embed_documents(["乙乙", "丙丙丙"])
+    assert inner.document_calls == [["甲", "乙乙"], ["丙丙丙"]]
+
+
+def test_queries_are_not_persisted(tmp_path):
+    inner = FakeEmbedder()
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"))
+    service = CachedEmbeddingService(inner, cache, query_cache_size=2)
+
+    for text in ("q1", "q2", "q1", "q3", "q1", "q2"):
+        service.embed_query(text)
+
+    assert cache.stats()["size"] == 0
+    # 容量 2：q2 在插入 q3 后被淘汰，再次查询需要重新计算
+    assert inner.query_calls == ["q1", "q2", "q3", "q2"]
+
+
+def test_batched_queries_use_the_in_memory_lru(tmp_path):
+    inner = FakeEmbedder()
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"))
+    service = CachedEmbeddingService(inner, cache, query_cache_size=8)
+
+    assert service.embed_queries(["储能", "光伏组件", "储能"]) == [[2.0, 1.0], [4.0, 1.0], [2.0, 1.0]]
+    service.embed_queries(["光伏组件", "锂电池"])
+    assert service.embed_query("锂电池") == [3.0, 1.0]
+
+    # 未命中的查询一次批量计算，命中的直接复用；全部不落盘
+    assert inner.query_calls == [["储能", "光伏组件"], ["锂电池"]]
+    assert inner.document_calls == []
+    assert cache.stats()["size"] == 0
+
+
+def test_persistent_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache_module.time, "time", lambda: now[0])
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=2)
+
+    cache.put_many("m", {"a": [1.0]})
+    now[0] += 1
+    cache.put_many("m", {"b": [2.0]})
+    now[0] += 1
+    assert cache.get_many("m", ["a"]) == {"a": [1.0]}  # a 最近访问
+    now[0] += 1
+    cache.put_many("m", {"c": [3.0]})
+
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_legacy_database_gains_last_access_column(tmp_path):
+    path = str(tmp_path / "legacy.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE embedding_cache (model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, "
+        "vector BLOB NOT NULL, PRIMARY KEY (model, text_hash))"
+    )
+    conn.commit()
+    conn.close()
+
+    cache = EmbeddingCache(path, max_entries=10)
+    cache.put_many("m", {"a": [1.0, 2.0]})
+    assert cache.get_many("m", ["a"]) == {"a": [1.0, 2.0]}
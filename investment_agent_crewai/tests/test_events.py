@@ -0,0 +1,46 @@
+# tests/test_events.py
+"""研报事件流：回调转生成器、结束事件、回调异常隔离与 Agent 步骤摘要"""
+
+from types import SimpleNamespace
+
+from agent_system.workflows.events import STEP_PREVIEW_CHARS, describe_step, emit, iter_events
+
+
+def test_iter_events_yields_progress_then_report_done():
+    def run(on_event):
+        emit(on_event, "phase_start", phase="research")
+        emit(on_event, "chapter_done", phase="chapters", title="第一章", content="正文")
+        return "# 报告"
+
+    events = list(iter_events(run))
+    assert [e["type"] for e in events] == ["phase_start", "chapter_done", "report_done"]
+    assert events[1]["content"] == "正文"
+    assert events[-1]["result"] == "# 报告"
+    assert all("ts" in e for e in events)
+
+
+def test_iter_events_ends_with_error_when_run_fails():
+    def run(on_event):
+        emit(on_event, "phase_start", phase="plan")
+        raise RuntimeError("LLM 不可用")
+
+    events = list(iter_events(run))
+    assert [e["type"] for e in events] == ["phase_start", "error"]
+    assert events[-1]["error"] == "RuntimeError: LLM 不可用"
+
+
+def test_emit_ignores_callback_errors():
+    def broken(event):
+        raise ValueError("UI 已关闭")
+
+    emit(broken, "phase_end", phase="plan")  # 不抛出
+    emit(None, "phase_end", phase="plan")
+
+
+def test_describe_step_truncates_tool_input():
+    step = SimpleNamespace(tool="search_knowledge", tool_input="储" * 1000, thought="需要市场数据")
+    described = describe_step(step)
+    assert described["kind"] == "tool_call"
+    assert len(described["tool_input"]) == STEP_PREVIEW_CHARS + 1
+    assert describe_step(SimpleNamespace(result="命中 3 条"))["kind"] == "tool_result"
+    assert describe_step(SimpleNamespace(output="完成"))["kind"] == "finish"
@@ -0,0 +1,58 @@
+# tests/test_job_store.py
+"""任务表：认领计数、孤儿任务重新排队与重试上限、旧库补列"""
+
+import os
+import sqlite3
+
+from jobs.job_store import JobStore
+
+DEAD_PID = 2 ** 22 + 12345  # 不存在的进程号，模拟已崩溃的 worker
+
+
+def test_orphan_is_requeued_until_attempt_limit(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), max_attempts=3)
+    job_id = store.submit("industry_research", {"industry": "储能"})
+
+    for attempt in (1, 2):
+        job = store.claim_next(DEAD_PID)
+        assert (job["id"], job["attempts"]) == (job_id, attempt)
+        assert store.requeue_orphans() == 1
+        assert store.get(job_id)["status"] == "queued"
+
+    assert store.claim_next(DEAD_PID)["attempts"] == 3
+    # 第三次认领后 worker 仍崩溃：不再排队，避免无限占用 worker
+    assert store.requeue_orphans() == 0
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert "3 次" in job["error"]
+    assert store.claim_next(DEAD_PID) is None
+
+
+def test_running_job_of_live_worker_is_left_alone(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.submit("industry_research", {})
+
+    store.claim_next(os.getpid())
+    assert store.requeue_orphans() == 0
+    assert store.get(job_id)["status"] == "running"
+
+
+def test_legacy_database_gains_attempts_column(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE report_jobs (
+            id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL,
+            phase TEXT, worker_pid INTEGER, submitted_at REAL NOT NULL, started_at REAL,
+            finished_at REAL, result TEXT, error TEXT
+        )
+        """
+    )
+    conn.execute("INSERT INTO report_jobs (id, kind, params, status, submitted_at) VALUES ('old', 'x', '{}', 'queued', 1)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(db_path)
+    assert store.get("old")["attempts"] == 0
+    assert store.claim_next(DEAD_PID)["attempts"] == 1
@@ -0,0 +1,153 @@
+# tests/test_knowledge_sync.py
+"""知识库增量入库：按块哈希 diff，失败回滚且不丢失旧块；入库后检索缓存失效；RAR 覆盖度达标提前停止；批量检索的查询向量不落盘"""
+
+import pytest
+
+# knowledge_engine 在导入时加载向量库客户端、文本切分器与 PDF 抽取器
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain")
+pytest.importorskip("pdfplumber")
+
+from agent_system.knowledge import knowledge_engine  # noqa: E402
+from rag.query_cache import QueryCache  # noqa: E402
+
+
+class FakeCollection:
+    """内存中的 Chroma collection，只实现增量入库与检索用到的接口"""
+
+    def __init__(self):
+        self.records = {}
+
+    def get(self, ids=None, where=None, include=None, **kwargs):
+        if ids is not None:
+            found = [cid for cid in ids if cid in self.records]
+            return {"ids": found, "documents": [""] * len(found), "metadatas": [self.records[cid] for cid in found]}
+        ids = [cid for cid, meta in self.records.items() if meta.get("source") == (where or {}).get("source")]
+        return {"ids": ids}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.records.update(zip(ids, metadatas))
+
+    def update(self, ids, metadatas):
+        for cid, meta in zip(ids, metadatas):
+            self.records[cid] = meta
+
+    def delete(self, ids):
+        for cid in ids:
+            self.records.pop(cid, None)
+
+    def query(self, query_embeddings, n_results):
+        empty = [[] for _ in query_embeddings]
+        return {"ids": empty, "documents": empty, "metadatas": empty, "distances": empty}
+
+    def ids_for(self, source):
+        return sorted(self.get(where={"source": source})["ids"])
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.document_calls = []
+        self.query_calls = []
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    def embed_queries(self, texts):
+        self.query_calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+@pytest.fixture
+def embedding_service():
+    return FakeEmbeddingService()
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch, embedding_service):
+    for name in ("INGEST_MANIFEST_PATH", "TABLE_STORE_PATH", "BM25_INDEX_PATH"):
+        monkeypatch.setattr(knowledge_engine, name, str(tmp_path / f"{name.lower()}.sqlite3"))
+    monkeypatch.setattr(knowledge_engine, "get_embedding_service", lambda: embedding_service)
+    manager = knowledge_engine.KnowledgeBaseManager()
+    manager._collection = FakeCollection()
+    manager._lexical_checked = True
+    manager.embed_batch_size = 2
+    return manager
+
+
+def _sync(kb, chunks, filename="report.pdf"):
+    return kb.sync_file_chunks(filename, iter(chunks), {"size": 1, "mtime": 1.0, "content_hash": "x"})
+
+
+def test_resync_only_writes_changed_chunks(kb):
+    first = _sync(kb, ["储能市场规模", "产业链上游", "下游需求", "储能市场规模"])
+    assert (first["status"], first["added"], first["kept"], first["removed"]) == ("created", 3, 0, 0)
+
+    second = _sync(kb, ["储能市场规模", "下游需求", "政策补贴"])
+    assert (second["status"], second["added"], second["kept"], second["removed"]) == ("updated", 1, 2, 1)
+
+    expected = sorted(kb._chunk_id("report.pdf", knowledge_engine.chunk_hash(c))
+                      for c in ("储能市场规模", "下游需求", "政策补贴"))
+    assert kb._collection.ids_for("report.pdf") == expected
+    assert sorted(kb.manifest.get_chunk_ids("report.pdf")) == expected
+    assert kb.lexical_index.count() == 3
+
+
+def test_failed_sync_keeps_legacy_chunks(kb):
+    collection = kb._collection
+    collection.records = {"report.pdf_0": {"source": "report.pdf"}, "report.pdf_1": {"source": "report.pdf"}}
+
+    def broken_chunks():
+        yield from ["块一", "块二", "块三"]
+        raise RuntimeError("embedding server down")
+
+    with pytest.raises(RuntimeError):
+        _sync(kb, broken_chunks())
+    # 本次新增的块回滚，旧版遗留块仍可检索
+    assert collection.ids_for("report.pdf") == ["report.pdf_0", "report.pdf_1"]
+    assert kb.manifest.get_file("report.pdf") is None
+
+    result = _sync(kb, ["块一", "块二"])
+    assert (result["added"], result["removed"]) == (2, 2)
+    assert "report.pdf_0" not in collection.ids_for("report.pdf")
+    assert len(collection.ids_for("report.pdf")) == 2
+
+
+def test_search_many_embeds_queries_without_document_cache(kb, embedding_service):
+    assert kb.search_many(["储能 市场规模", "储能 政策"], n_results=3, mode="hybrid") == [[], []]
+    assert embedding_service.query_calls == [["储能 市场规模", "储能 政策"]]
+    assert embedding_service.document_calls == []
+
+
+def test_ingest_invalidates_cached_queries(kb, embedding_service, monkeypatch):
+    monkeypatch.setattr(knowledge_engine, "query_cache", QueryCache())
+
+    kb.query_knowledge("储能 市场规模")
+    kb.query_knowledge("储能 市场规模")
+    assert len(embedding_service.query_calls) == 1
+
+    # 新文件入库后，旧的检索结果不再命中
+    _sync(kb, ["储能市场规模"], filename="new.pdf")
+    kb.query_knowledge("储能 市场规模")
+    assert len(embedding_service.query_calls) == 2
+
+
+def test_rar_stops_once_coverage_threshold_is_met(kb, monkeypatch):
+    monkeypatch.setattr(knowledge_engine, "query_cache", QueryCache())
+    rich = [
+        ("a", "2024年装机量 35GW，同比增长 40%", {"source": "a.pdf"}, 0.9),
+        ("b", "市场规模约 1200亿，CAGR 25%", {"source": "b.pdf"}, 0.8),
+    ]
+    planned = []
+
+    def fake_search_many(queries, n_results=5, **kwargs):
+        planned.append(list(queries))
+        return [rich] + [[("x", "补充材料", {"source": "c.pdf"}, 0.1)]] * (len(queries) - 1)
+
+    monkeypatch.setattr(kb, "search_many", fake_search_many)
+    output = kb.query_with_reasoning("2024年储能市场规模", n_results=2, max_rounds=3)
+
+    # 全部轮次一次批量检索，但第一轮覆盖度已达标，后续轮次不再展示
+    assert len(planned) == 1 and len(planned[0]) == 3
+    assert "[RAR Round 1]" in output
+    assert "[RAR Round 2]" not in output
@@ -0,0 +1,17 @@
+# tests/test_pdf_extractor.py
+"""PDF 抽取进程池的启动方式"""
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from ingestion.pdf_extractor import PageParallelExtractor  # noqa: E402
+
+
+def test_pool_uses_spawn_start_method():
+    extractor = PageParallelExtractor(max_workers=2)
+    pool = extractor._get_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        pool.shutdown()
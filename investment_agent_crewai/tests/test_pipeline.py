@@ -0,0 +1,154 @@
+# tests/test_pipeline.py
+"""研报流水线：检查点续跑与运行目录独占"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from agent_system.workflows import pipeline as pipeline_module
+from agent_system.workflows.pipeline import ReportPipeline
+
+
+@pytest.fixture(autouse=True)
+def fast_lock_poll(monkeypatch):
+    monkeypatch.setattr(pipeline_module, "RUN_LOCK_POLL_SECONDS", 0.02)
+
+
+def _build(runs_dir, calls, fail_on=None, delay=0.0):
+    def node(name, value):
+        def fn(outputs):
+            calls.append(name)
+            time.sleep(delay)
+            if name == fail_on:
+                raise RuntimeError(f"{name} failed")
+            return {"value": value, "upstream": sorted(outputs)}
+        return fn
+
+    return (
+        ReportPipeline({"industry": "储能", "province": "浙江省"}, runs_dir=str(runs_dir))
+        .add_node("plan", node("plan", 1))
+        .add_node("research", node("research", 2))
+        .add_node("draft", node("draft", 3), deps=["plan", "research"])
+    )
+
+
+def test_resume_from_last_completed_node(tmp_path):
+    calls = []
+    with pytest.raises(RuntimeError):
+        _build(tmp_path, calls, fail_on="draft").run()
+    assert set(calls) == {"plan", "research", "draft"}
+
+    calls.clear()
+    pipeline = _build(tmp_path, calls)
+    outputs = pipeline.run()
+    assert calls == ["draft"]
+    assert outputs["draft"]["upstream"] == ["plan", "research"]
+    assert not os.path.exists(pipeline.lock_path)
+
+
+def test_identical_runs_do_not_share_run_dir_concurrently(tmp_path):
+    active, overlaps, errors = [0], [], []
+    lock = threading.Lock()
+
+    def tracked(outputs):
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"ok": True}
+
+    def run():
+        try:
+            pipeline = ReportPipeline({"industry": "储能"}, runs_dir=str(tmp_path))
+            pipeline.add_node("plan", tracked).add_node("draft", tracked, deps=["plan"])
+            pipeline.run()
+        except Exception as e:  # pragma: no cover - 失败时在断言中报告
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert max(overlaps) == 1
+
+
+def test_stale_lock_from_dead_process_is_taken_over(tmp_path):
+    calls = []
+    pipeline = _build(tmp_path, calls)
+    with open(pipeline.lock_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": 2 ** 22 + 12345, "host": pipeline_module.socket.gethostname()}, f)
+
+    pipeline.run()
+    assert set(calls) == {"plan", "research", "draft"}
+    assert not os.path.exists(pipeline.lock_path)
+
+
+def _build_partial(runs_dir, calls, fail_keys=(), plan_value=1):
+    """draft 节点按子任务落部分结果，fail_keys 中的子任务失败"""
+    pipeline = ReportPipeline({"industry": "储能", "province": "浙江省"}, runs_dir=str(runs_dir))
+
+    def draft(outputs):
+        done = pipeline.load_partial("draft")
+        for key in ("a", "b", "c"):
+            if key in done:
+                continue
+            calls.append(key)
+            if key not in fail_keys:
+                pipeline.save_partial("draft", key, f"{key}@{outputs['plan']}")
+        if set(fail_keys) & {"a", "b", "c"}:
+            raise RuntimeError("some subtasks failed")
+        return pipeline.load_partial("draft")
+
+    return pipeline.add_node("plan", lambda outputs: plan_value).add_node("draft", draft, deps=["plan"])
+
+
+def test_resume_reruns_only_failed_subtasks(tmp_path):
+    calls = []
+    with pytest.raises(RuntimeError):
+        _build_partial(tmp_path, calls, fail_keys=("b",)).run()
+    assert calls == ["a", "b", "c"]
+
+    calls.clear()
+    pipeline = _build_partial(tmp_path, calls)
+    outputs = pipeline.run()
+    assert calls == ["b"]
+    assert outputs["draft"] == {"a": "a@1", "b": "b@1", "c": "c@1"}
+    # 节点完成后部分结果不再保留
+    assert pipeline.load_partial("draft") == {}
+
+
+def test_partial_results_discarded_when_upstream_reruns(tmp_path):
+    calls = []
+    with pytest.raises(RuntimeError):
+        _build_partial(tmp_path, calls, fail_keys=("b",)).run()
+
+    # 上游 plan 的检查点丢失而重跑：基于旧 plan 的子任务结果作废
+    pipeline = _build_partial(tmp_path, calls, plan_value=2)
+    os.remove(pipeline._checkpoint_path("plan"))
+    calls.clear()
+    outputs = pipeline.run()
+    assert calls == ["a", "b", "c"]
+    assert outputs["draft"] == {"a": "a@2", "b": "b@2", "c": "c@2"}
+
+
+def test_unreadable_lock_is_stale_only_after_grace(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "RUN_LOCK_GRACE_SECONDS", 5)
+    pipeline = _build(tmp_path, [])
+    # 持有者在 O_EXCL 创建之后、写入内容之前崩溃：锁文件为空
+    open(pipeline.lock_path, "w").close()
+    assert not pipeline._lock_is_stale()
+
+    old = time.time() - 10
+    os.utime(pipeline.lock_path, (old, old))
+    assert pipeline._lock_is_stale()
+
+    pipeline.run()
+    assert not os.path.exists(pipeline.lock_path)
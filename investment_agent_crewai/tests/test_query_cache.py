@@ -0,0 +1,107 @@
+# tests/test_query_cache.py
+"""检索结果缓存：命中、入库递增版本号后失效、计算期间写入不缓存、过期与跨进程（磁盘）失效"""
+
+import pytest
+
+from rag import query_cache as query_cache_module
+from rag.query_cache import QueryCache
+
+
+class Counter:
+    """记录 compute 调用次数，每次返回不同结果"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"result-{self.calls}"
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(query_cache_module.time, "time", fake.time)
+    return fake
+
+
+def test_hit_uses_normalized_query_and_params(clock):
+    cache = QueryCache()
+    compute = Counter()
+
+    assert cache.get_or_compute("kb", "储能 市场规模？", compute, k=5) == "result-1"
+    assert cache.get_or_compute("kb", "  储能   市场规模 ", compute, k=5) == "result-1"
+    assert cache.get_or_compute("kb", "储能 市场规模", compute, k=3) == "result-2"
+    assert compute.calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_bump_invalidates_only_its_namespace(clock):
+    cache = QueryCache()
+    kb, memory = Counter(), Counter()
+    cache.get_or_compute("kb", "储能", kb)
+    cache.get_or_compute("memory", "储能", memory)
+
+    cache.bump("kb")  # 入库新文件
+    assert cache.get_or_compute("kb", "储能", kb) == "result-2"
+    assert cache.get_or_compute("memory", "储能", memory) == "result-1"
+    assert cache.version("kb") == 1 and cache.version("memory") == 0
+
+
+def test_result_computed_across_a_bump_is_not_cached(clock):
+    cache = QueryCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            cache.bump("kb")  # 检索进行中另一批文件入库完成
+        return f"result-{len(calls)}"
+
+    assert cache.get_or_compute("kb", "储能", compute) == "result-1"
+    assert cache.get_or_compute("kb", "储能", compute) == "result-2"
+    assert cache.get_or_compute("kb", "储能", compute) == "result-2"
+    assert len(calls) == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(ttl_seconds=60)
+    compute = Counter()
+    cache.get_or_compute("kb", "储能", compute)
+
+    clock.now += 59
+    assert cache.get_or_compute("kb", "储能", compute) == "result-1"
+    clock.now += 2
+    assert cache.get_or_compute("kb", "储能", compute) == "result-2"
+
+
+def test_lru_evicts_oldest_entry(clock):
+    cache = QueryCache(max_entries=2)
+    compute = Counter()
+    for query in ("a", "b", "c"):
+        cache.get_or_compute("kb", query, compute)
+    assert cache.stats()["size"] == 2
+    assert cache.get_or_compute("kb", "a", compute) == "result-4"
+
+
+def test_disk_cache_is_shared_and_invalidated_across_instances(tmp_path, clock):
+    path = str(tmp_path / "query_cache.sqlite3")
+    writer, reader = QueryCache(disk_path=path), QueryCache(disk_path=path)
+    compute = Counter()
+
+    writer.get_or_compute("kb", "储能", compute)
+    assert reader.get_or_compute("kb", "储能", compute) == "result-1"
+
+    # 另一个进程（writer）入库后，本进程的内存条目同样失效
+    writer.bump("kb")
+    assert reader.version("kb") == 1
+    assert reader.get_or_compute("kb", "储能", compute) == "result-2"
+    assert compute.calls == 2
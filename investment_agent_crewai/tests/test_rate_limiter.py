@@ -0,0 +1,184 @@
+# tests/test_rate_limiter.py
+"""LLM 全局限流：令牌桶优先级通道、429 冷却，以及 RateLimitedLLM 的每次调用都经过限流"""
+
+import threading
+import time
+
+import pytest
+
+# config 包导入时加载 config.runtime_env（python-dotenv）
+pytest.importorskip("dotenv")
+
+from config import rate_limiter as rate_limiter_module  # noqa: E402
+from config.rate_limiter import TokenBucketLimiter  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    db_path = str(tmp_path / "limiter.sqlite3") if request.param == "sqlite" else None
+    return TokenBucketLimiter(rpm=120, tpm=1_000_000, db_path=db_path)
+
+
+def _drain(limiter):
+    for _ in range(int(limiter.rpm)):
+        limiter.acquire(1, "normal")
+
+
+def test_priority_lane_goes_before_queued_bulk(limiter):
+    _drain(limiter)
+    order = []
+
+    def call(lane, i):
+        limiter.acquire(1, lane)
+        order.append((lane, i))
+
+    bulk = [threading.Thread(target=call, args=("bulk", i)) for i in range(3)]
+    for t in bulk:
+        t.start()
+    time.sleep(0.05)  # bulk 已在排队
+    priority = [threading.Thread(target=call, args=("priority", i)) for i in range(2)]
+    for t in priority:
+        t.start()
+    for t in bulk + priority:
+        t.join(timeout=30)
+
+    assert [lane for lane, _ in order] == ["priority", "priority", "bulk", "bulk", "bulk"]
+    stats = limiter.stats()
+    assert stats["priority"]["calls"] == 2
+    assert stats["bulk"]["calls"] == 3
+    assert stats["bulk"]["waited_seconds"] > stats["priority"]["waited_seconds"]
+
+
+def test_cooldown_blocks_all_lanes(limiter):
+    limiter.cooldown(0.5)
+    started = time.monotonic()
+    limiter.acquire(1, "priority")
+    assert time.monotonic() - started >= 0.45
+
+
+def test_token_bucket_limits_tokens_per_minute(tmp_path):
+    limiter = TokenBucketLimiter(rpm=10_000, tpm=600, db_path=None)
+    limiter.acquire(600, "normal")
+    started = time.monotonic()
+    limiter.acquire(10, "normal")  # 每秒回填 10 个 token
+    assert 0.8 <= time.monotonic() - started <= 3
+
+
+# ============================================================
+# RateLimitedLLM（需要 CrewAI）
+# ============================================================
+class _SpyLimiter(TokenBucketLimiter):
+    def __init__(self):
+        super().__init__(rpm=10_000, tpm=10_000_000, db_path=None)
+        self.acquired = []
+        self.cooldowns = []
+
+    def acquire(self, tokens, lane="normal"):
+        self.acquired.append((lane, tokens))
+        return super().acquire(tokens, lane)
+
+    def cooldown(self, seconds):
+        self.cooldowns.append(seconds)
+
+
+@pytest.fixture
+def llm_module(monkeypatch):
+    pytest.importorskip("crewai")
+    from config import llm as llm_module
+
+    spy = _SpyLimiter()
+    monkeypatch.setattr(llm_module, "get_llm_rate_limiter", lambda: spy)
+    monkeypatch.setattr(llm_module, "_backoff", lambda attempt: 0.0)
+    llm_module.spy = spy
+    return llm_module
+
+
+def _stub_provider(llm_module, failures=()):
+    from crewai import BaseLLM
+
+    class StubProvider(BaseLLM):
+        """替代 DeepSeek 的桩 provider：按顺序抛出预设异常，之后返回固定回答"""
+
+        def __init__(self):
+            super().__init__(model="stub/provider", temperature=0.3)
+            self.max_tokens = 8000
+            self.failures = list(failures)
+            self.calls = []
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+            self.calls.append(messages)
+            if self.failures:
+                raise self.failures.pop(0)
+            return "Final Answer: 储能行业景气度高"
+
+        def supports_function_calling(self):
+            return False
+
+        def supports_stop_words(self):
+            return True
+
+        def get_context_window_size(self):
+            return 64000
+
+    return StubProvider()
+
+
+def test_every_call_goes_through_limiter_with_lane(llm_module):
+    provider = _stub_provider(llm_module)
+    llm = llm_module.RateLimitedLLM(provider, lane="bulk")
+
+    assert llm.call([{"role": "user", "content": "写第一章"}]) == "Final Answer: 储能行业景气度高"
+    assert llm.call("写第二章") == "Final Answer: 储能行业景气度高"
+
+    assert [lane for lane, _ in llm_module.spy.acquired] == ["bulk", "bulk"]
+    assert len(provider.calls) == 2
+    assert llm.get_context_window_size() == 64000
+    assert llm.max_tokens == 8000  # 未定义的属性转交给 inner
+
+
+def test_rate_limited_call_cools_down_and_retries(llm_module):
+    class RateLimitError(Exception):
+        pass
+
+    provider = _stub_provider(llm_module, failures=[RateLimitError("429 Too Many Requests, retry after 0.2")])
+    llm = llm_module.RateLimitedLLM(provider, lane="priority")
+
+    assert llm.call("规划") == "Final Answer: 储能行业景气度高"
+    # 重试前重新取令牌
+    assert [lane for lane, _ in llm_module.spy.acquired] == ["priority", "priority"]
+    assert llm_module.spy.cooldowns == [0.2]
+    assert llm_module.spy.stats()["priority"]["rate_limited"] == 1
+
+
+def test_non_retryable_error_is_raised(llm_module):
+    provider = _stub_provider(llm_module, failures=[ValueError("bad request")])
+    llm = llm_module.RateLimitedLLM(provider, lane="normal")
+
+    with pytest.raises(ValueError):
+        llm.call("x")
+    assert len(provider.calls) == 1
+    assert llm_module.spy.stats()["normal"]["failures"] == 1
+
+
+def test_stop_words_are_forwarded_to_provider(llm_module):
+    provider = _stub_provider(llm_module)
+    llm = llm_module.RateLimitedLLM(provider)
+    llm.stop = ["\nObservation:"]
+    llm.call("x")
+    assert provider.stop == ["\nObservation:"]
+
+
+def test_deepseek_llm_is_wrapped_with_lane(llm_module, monkeypatch):
+    monkeypatch.delenv("FINSIGHT_LLM_MODE", raising=False)
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    llm = llm_module.get_deepseek_llm(lane="bulk")
+    assert isinstance(llm, llm_module.RateLimitedLLM)
+    assert llm.lane == "bulk"
+
+
+def test_default_limiter_reads_env(monkeypatch, tmp_path):
+    monkeypatch.setattr(rate_limiter_module, "_limiter", None)
+    monkeypatch.setenv("DEEPSEEK_RPM", "30")
+    monkeypatch.setenv("LLM_RATE_LIMIT_DB", str(tmp_path / "shared.sqlite3"))
+    limiter = rate_limiter_module.get_llm_rate_limiter()
+    assert (limiter.rpm, limiter.db_path) == (30.0, str(tmp_path / "shared.sqlite3"))
@@ -0,0 +1,22 @@
+# tests/test_report_compiler.py
+"""本地统稿：章节标题规范化、章内标题下调、头尾拼接"""
+
+from agent_system.postprocess.report_compiler import build_header, compile_chapter, compile_report
+
+
+def test_compile_chapter_normalizes_wrapper_and_headings():
+    content = "```markdown\n# 第三章：产业链分析\n报告日期：2025年1月\n\n# 上游\n正文\n## 材料\n```"
+    assert compile_chapter(2, "第三章 产业链分析", content) == "## 第2章 产业链分析\n\n### 上游\n正文\n#### 材料"
+
+
+def test_compile_report_orders_chapters_between_header_and_footer():
+    plan = {"chapters": [{"title": "行业概览", "data_sources": "国家统计局；公司年报"}, {"title": "投资建议"}]}
+    chapters = [{"title": "行业概览", "content": "规模持续增长"}, {"title": "投资建议", "content": "关注龙头"}]
+    header = build_header("储能", "浙江省", 2025, "产业链", report_date="2025年01月01日")
+
+    report = compile_report(plan, chapters, header=header)
+
+    assert report.startswith("# 储能行业深度研究报告")
+    assert report.index("## 第1章 行业概览") < report.index("## 第2章 投资建议") < report.index("## 数据来源说明")
+    assert "- 国家统计局\n- 公司年报" in report
+    assert "生成失败" not in report
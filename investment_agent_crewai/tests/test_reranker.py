@@ -0,0 +1,38 @@
+# tests/test_reranker.py
+"""向量化混合重排：关键词命中比例、预计算检索词与综合排序"""
+
+import pytest
+
+from rag.reranker import HybridReranker
+from rag.tokenizer import term_string, tokenize
+
+
+def test_keyword_scores_are_hit_ratios():
+    query_terms = tokenize("储能 300750")  # 储能 / 300750
+    candidates = [tokenize("宁德时代 300750 储能业务"), tokenize("储能电池"), tokenize("光伏组件"), []]
+    scores = HybridReranker.keyword_scores(query_terms, candidates)
+    assert scores.tolist() == [1.0, 0.5, 0.0, 0.0]
+
+    assert HybridReranker.keyword_scores([], candidates).tolist() == [0.0] * 4
+    assert HybridReranker.keyword_scores(query_terms, []).tolist() == []
+
+
+def test_candidate_terms_prefer_precomputed_metadata():
+    texts = ["储能电池", "光伏组件"]
+    metadatas = [{"terms": "预计算 检索词"}, None]
+    assert HybridReranker.candidate_terms(metadatas, texts) == [["预计算", "检索词"], tokenize("光伏组件")]
+
+
+def test_rank_combines_vector_and_keyword_scores():
+    reranker = HybridReranker(vector_weight=0.5, keyword_weight=0.5)
+    texts = ["光伏组件价格", "储能电池出货量", "储能电池价格"]
+    terms = [term_string(t).split() for t in texts]
+
+    ranking = reranker.rank("储能电池", distances=[0.0, 1.0, None], candidate_terms=terms)
+
+    # 距离缺失按 0 处理；关键词全部命中且距离最近的排第一
+    assert [i for i, _, _ in ranking] == [2, 1, 0]
+    index, score, keyword = ranking[0]
+    assert (index, keyword) == (2, 1.0)
+    assert score == pytest.approx(0.5 * 1.0 + 0.5 * 1.0)
+    assert ranking[-1][1] == pytest.approx(0.5 * 1.0)
@@ -0,0 +1,60 @@
+# tests/test_research_scheduler.py
+"""并发 Crew 调度：失败任务使阶段失败，续跑时复用已完成的任务"""
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from agent_system.workflows import research_scheduler
+from agent_system.workflows.research_scheduler import CrewTasksFailed, raise_for_failures, run_parallel_crews
+
+
+def _specs(*keys):
+    return [{"key": key, "label": key.upper(), "description": "", "expected_output": ""} for key in keys]
+
+
+@pytest.fixture
+def fake_crews(monkeypatch):
+    """以假的单任务 Crew 替换真实执行：failing 中的 key 失败，其余返回 output-<key>"""
+    state = {"failing": set(), "calls": []}
+
+    def fake_run(spec):
+        state["calls"].append(spec["key"])
+        if spec["key"] in state["failing"]:
+            return {"ok": False, "output": "", "error": "RuntimeError: serper 502", "elapsed": 0.0}
+        return {"ok": True, "output": f"output-{spec['key']}", "error": None, "elapsed": 0.0}
+
+    monkeypatch.setattr(research_scheduler, "_run_dimension", fake_run)
+    return state
+
+
+def test_failed_task_fails_the_phase_after_others_finish(fake_crews):
+    fake_crews["failing"] = {"policy"}
+    saved = {}
+    results = run_parallel_crews(
+        _specs("finance", "policy", "industry"), 3, "研究维度",
+        on_complete=lambda spec, outcome: outcome["ok"] and saved.update({spec["key"]: outcome}),
+    )
+
+    assert sorted(fake_crews["calls"]) == ["finance", "industry", "policy"]
+    assert sorted(saved) == ["finance", "industry"]
+    with pytest.raises(CrewTasksFailed) as excinfo:
+        raise_for_failures(results, "研究维度")
+    assert list(excinfo.value.failures) == ["policy"]
+    assert "POLICY：RuntimeError: serper 502" in str(excinfo.value)
+
+
+def test_completed_tasks_are_reused(fake_crews):
+    completed = {"finance": {"ok": True, "output": "cached-finance", "error": None, "elapsed": 1.0}}
+    reported = []
+    results = run_parallel_crews(
+        _specs("finance", "policy"), 2, "研究维度",
+        on_complete=lambda spec, outcome: reported.append(spec["key"]), completed=completed,
+    )
+
+    assert fake_crews["calls"] == ["policy"]
+    assert sorted(reported) == ["finance", "policy"]
+    assert list(results) == ["finance", "policy"]
+    assert results["finance"]["output"] == "cached-finance"
+    assert results["finance"]["label"] == "FINANCE"
+    raise_for_failures(results, "研究维度")
@@ -0,0 +1,48 @@
+# tests/test_retrieval_planner.py
+"""RAR 检索规划：候选查询生成与证据覆盖度评分"""
+
+import pytest
+
+# agent_system.knowledge 包在导入时加载知识库单例（向量库客户端、文本切分器与 PDF 抽取器）
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain")
+pytest.importorskip("pdfplumber")
+
+from agent_system.knowledge.retrieval_planner import FALLBACK_EXPANSION, coverage_score, plan_queries  # noqa: E402
+
+
+def _hit(cid, raw, source):
+    return (cid, raw, {"source": source}, 0.5)
+
+
+def test_plan_starts_with_original_query_and_respects_limit():
+    queries = plan_queries("2024年储能市场规模", max_queries=3)
+    assert queries[0] == "2024年储能市场规模"
+    assert queries[1] == "2024年储能市场规模 2024 市场规模"
+    assert len(queries) == 3
+    assert len(set(queries)) == 3
+
+
+def test_plan_without_constraints_falls_back_to_generic_expansion():
+    assert plan_queries("储能", max_queries=5) == ["储能", f"储能 {FALLBACK_EXPANSION}"]
+    assert plan_queries("储能", max_queries=0) == ["储能"]
+
+
+def test_coverage_counts_sources_facts_and_chunks():
+    hits = [
+        _hit("a", "2024年装机量 35GW，同比增长 40%", "a.pdf"),
+        _hit("b", "市场规模约 1200亿，2024年", "b.pdf"),
+        _hit("c", "行业竞争加剧", "b.pdf"),
+    ]
+    coverage = coverage_score(hits, n_results=5)
+    # 数值事实：2024年 / 35GW / 40% / 1200亿（重复出现只计一次）
+    assert (coverage["sources"], coverage["numeric_facts"], coverage["chunks"]) == (2, 4, 3)
+    assert coverage["score"] == pytest.approx(0.4 + 0.4 * 4 / 5 + 0.2 * 3 / 5, abs=1e-3)
+
+
+def test_single_source_without_numbers_scores_low():
+    hits = [_hit(str(i), "行业前景广阔，值得关注" * 20, "a.pdf") for i in range(5)]
+    coverage = coverage_score(hits, n_results=5)
+    # 文本再长，没有来源多样性和数值事实也达不到提前停止的阈值
+    assert coverage["score"] == pytest.approx(0.4 * 0.5 + 0.2)
+    assert coverage_score([], n_results=5)["score"] == 0
@@ -0,0 +1,108 @@
+# tests/test_search_cache.py
+"""Serper 搜索缓存：用假的 Serper 调用验证命中、未命中、过期与查询族有效期"""
+
+import pytest
+
+from agent_system.tools import search_cache as search_cache_module
+from agent_system.tools.search_cache import SearchResultCache, classify_query
+
+
+class FakeSerper:
+    """记录调用次数的假 Serper，返回与查询相关的结果"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, query):
+        self.calls.append(query)
+        return f"results for {query}"
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(search_cache_module.time, "time", fake.time)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return SearchResultCache(db_path=str(tmp_path / "search_cache.sqlite3"), max_entries=100)
+
+
+def test_miss_then_hit(cache):
+    serper = FakeSerper()
+    first = cache.get_or_fetch("半导体 市场规模", lambda: serper.fetch("半导体 市场规模"))
+    second = cache.get_or_fetch("  半导体   市场规模 ", lambda: serper.fetch("半导体 市场规模"))
+
+    assert first == second == "results for 半导体 市场规模"
+    assert len(serper.calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_n_results_is_part_of_key(cache):
+    serper = FakeSerper()
+    cache.get_or_fetch("储能 龙头企业", lambda: serper.fetch("a"), n_results=5)
+    cache.get_or_fetch("储能 龙头企业", lambda: serper.fetch("b"), n_results=10)
+    assert serper.calls == ["a", "b"]
+
+
+def test_empty_result_not_cached(cache):
+    serper = FakeSerper()
+    cache.get_or_fetch("无结果查询", lambda: "")
+    cache.get_or_fetch("无结果查询", lambda: serper.fetch("无结果查询"))
+    assert len(serper.calls) == 1
+
+
+def test_entry_expires_after_family_ttl(cache, clock):
+    serper = FakeSerper()
+    query = "储能 补贴 政策"
+    cache.get_or_fetch(query, lambda: serper.fetch(query))
+
+    clock.now += cache.ttl_hours_by_family["policy"] * 3600 - 1
+    cache.get_or_fetch(query, lambda: serper.fetch(query))
+    assert len(serper.calls) == 1
+
+    clock.now += 2
+    cache.get_or_fetch(query, lambda: serper.fetch(query))
+    assert len(serper.calls) == 2
+    assert cache.stats()["expired"] == 1
+
+
+def test_explicit_family_overrides_classification(cache, clock):
+    serper = FakeSerper()
+    # 文本含"规划"，按正则会被分到政策族（3 天）；专项工具显式传入产业链族（30 天）
+    query = "储能 产业链 发展规划"
+    assert classify_query(query) == "policy"
+    cache.get_or_fetch(query, lambda: serper.fetch(query), family="supply_chain")
+
+    clock.now += cache.ttl_hours_by_family["policy"] * 3600 + 1
+    cache.get_or_fetch(query, lambda: serper.fetch(query), family="supply_chain")
+    assert len(serper.calls) == 1
+
+    clock.now += cache.ttl_hours_by_family["supply_chain"] * 3600
+    cache.get_or_fetch(query, lambda: serper.fetch(query), family="supply_chain")
+    assert len(serper.calls) == 2
+
+
+def test_lru_eviction(tmp_path, clock):
+    cache = SearchResultCache(db_path=str(tmp_path / "lru.sqlite3"), max_entries=2)
+    for query in ("a", "b"):
+        cache.set(query, f"r-{query}")
+        clock.now += 1
+    cache.get("a")  # a 最近访问，b 最久未访问
+    clock.now += 1
+    cache.set("c", "r-c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "r-a"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,75 @@
+# tests/test_search_executor.py
+"""多查询并发执行器：结果保序、单条超时，以及线程池被卡死时的整批时限"""
+
+import threading
+import time
+
+import pytest
+
+from agent_system.tools.search_executor import BoundedSearchExecutor
+
+
+@pytest.fixture
+def executor():
+    pool = BoundedSearchExecutor(max_workers=2, default_timeout=5.0, batch_timeout=5.0)
+    yield pool
+    pool.shutdown()
+
+
+def test_results_keep_input_order(executor):
+    def fetch(query):
+        time.sleep(0.05 if query == "a" else 0)
+        if query == "c":
+            raise ValueError("bad query")
+        return query.upper()
+
+    outcomes = executor.map_ordered(fetch, ["a", "b", "c"])
+
+    assert [o["query"] for o in outcomes] == ["a", "b", "c"]
+    assert [o["result"] for o in outcomes[:2]] == ["A", "B"]
+    assert outcomes[2]["ok"] is False and "ValueError" in outcomes[2]["error"]
+
+
+def test_started_query_times_out(executor):
+    release = threading.Event()
+
+    def fetch(query):
+        if query == "slow":
+            release.wait(5)
+        return query
+
+    try:
+        outcomes = executor.map_ordered(fetch, ["slow", "fast"], timeout=0.2)
+    finally:
+        release.set()
+
+    assert outcomes[0]["ok"] is False and outcomes[0]["error"].startswith("timeout")
+    assert (outcomes[1]["ok"], outcomes[1]["result"]) == (True, "fast")
+
+
+def test_batch_deadline_covers_queued_queries(executor):
+    """卡死的请求占满线程池后，排队中的子查询按整批时限返回，而不是无限等待"""
+    release = threading.Event()
+
+    def blocking_fetch(query):
+        release.wait(10)
+        return query
+
+    try:
+        # 先占满两个 worker（不设单条超时），再提交一批只能排队的子查询
+        hung = threading.Thread(
+            target=executor.map_ordered, args=(blocking_fetch, ["h1", "h2"]), kwargs={"timeout": 60, "batch_timeout": 60}
+        )
+        hung.start()
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        outcomes = executor.map_ordered(blocking_fetch, ["q1", "q2"], timeout=60, batch_timeout=0.3)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+    hung.join(5)
+
+    assert elapsed < 2
+    assert all(not o["ok"] for o in outcomes)
+    assert all(o["error"] == "batch timeout after 0.3s (never started)" for o in outcomes)
@@ -0,0 +1,48 @@
+# tests/test_table_store.py
+"""结构化表格库：按文件整体替换，失败时保持原样"""
+
+import pytest
+
+# agent_system.knowledge 包在导入时加载向量库与 PDF 抽取器
+pytest.importorskip("chromadb")
+pytest.importorskip("pdfplumber")
+
+from agent_system.knowledge.table_store import TableStore  # noqa: E402
+
+MARKET_TABLE = {"caption": "表1：储能市场规模", "rows": [["年份", "规模(亿元)"], ["2024", "1200"], ["2025", "1500"]]}
+CAPACITY_TABLE = {"caption": "表2：装机容量", "rows": [["年份", "装机(GW)"], ["2024", "40"]]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TableStore(str(tmp_path / "tables.sqlite3"))
+
+
+def test_replace_source_swaps_tables(store):
+    store.replace_source("a.pdf", store.build_records("a.pdf", 3, [MARKET_TABLE]))
+    assert [t["caption"] for t in store.search("市场规模")] == ["表1：储能市场规模"]
+
+    store.replace_source("a.pdf", store.build_records("a.pdf", 5, [CAPACITY_TABLE]))
+    assert store.search("市场规模") == []
+    hits = store.search("装机")
+    assert [(t["page"], t["header"]) for t in hits] == [(5, ["年份", "装机(GW)"])]
+
+
+def test_failed_replace_keeps_previous_tables(store):
+    store.replace_source("a.pdf", store.build_records("a.pdf", 3, [MARKET_TABLE]))
+
+    broken = store.build_records("a.pdf", 5, [CAPACITY_TABLE]) + [("incomplete-row",)]
+    with pytest.raises(Exception):
+        store.replace_source("a.pdf", broken)
+
+    assert [t["caption"] for t in store.search("市场规模")] == ["表1：储能市场规模"]
+    assert store.search("装机") == []
+
+
+def test_replace_source_leaves_other_files(store):
+    store.replace_source("a.pdf", store.build_records("a.pdf", 1, [MARKET_TABLE]))
+    store.replace_source("b.pdf", store.build_records("b.pdf", 1, [CAPACITY_TABLE]))
+    store.replace_source("a.pdf", [])
+
+    assert store.search("市场规模") == []
+    assert [t["source"] for t in store.search("装机")] == ["b.pdf"]
@@ -0,0 +1,45 @@
+# tests/test_token_budget.py
+"""Token 预算：字符估算、按比例截断与按块保留"""
+
+import pytest
+
+from rag import token_budget
+from rag.token_budget import estimate_tokens, fit_blocks, truncate_to_budget
+
+
+@pytest.fixture
+def char_estimate(monkeypatch):
+    """固定使用字符估算，结果不受是否安装 tiktoken 影响"""
+    monkeypatch.setattr(token_budget, "_get_encoder", lambda: None)
+
+
+def test_char_estimate_weights_cjk_and_latin(char_estimate):
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("储能" * 50) == 61
+    assert estimate_tokens("a" * 400) == 101
+
+
+def test_truncate_keeps_text_within_budget(char_estimate):
+    text = "储能行业" * 200
+    assert truncate_to_budget(text, 10_000) == text
+
+    truncated = truncate_to_budget(text, 50)
+    assert truncated.endswith("…（已截断）")
+    assert estimate_tokens(truncated[: -len("…（已截断）")]) <= 50
+
+
+def test_fit_blocks_keeps_whole_blocks_in_order():
+    blocks = ["储能市场规模" * 10, "产业链上游" * 10, "政策补贴" * 10]
+    first_two = sum(estimate_tokens(b) + 1 for b in blocks[:2])
+
+    assert fit_blocks(blocks, None) == blocks
+    assert fit_blocks(blocks, first_two) == blocks[:2]
+    # 预算不足以放下第二块时停止，不跳过去挑更小的块
+    assert fit_blocks(blocks, first_two - 1) == blocks[:1]
+
+
+def test_fit_blocks_truncates_oversized_first_block():
+    kept = fit_blocks(["储能" * 500, "短块"], 20)
+    assert len(kept) == 1
+    assert kept[0].endswith("…（已截断）")
+    assert fit_blocks(["储能"], 0) == []
@@ -0,0 +1,91 @@
+# tests/test_worker_pool.py
+"""
+研报任务 worker 进程池
+
+- worker 为非 daemon 进程（任务内可再启动子进程池），stop() 后全部回收
+- 端到端：FINSIGHT_LLM_MODE=stub 下提交行业研究任务 → 事件写入任务表 → 任务完成
+  （需要完整运行依赖；会在 output/runs 下留下一份以唯一侧重点命名的检查点目录，
+   并向 output/ 写入报告、向记忆库写入本次洞察）
+"""
+
+import importlib.util
+import time
+import uuid
+
+import pytest
+
+from jobs.worker_pool import ReportWorkerPool
+
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+# main.py 及行业研究工作流的运行依赖
+WORKFLOW_DEPENDENCIES = (
+    "dotenv", "crewai", "crewai_tools", "chromadb", "langchain", "pdfplumber", "yfinance", "akshare",
+    "sentence_transformers",
+)
+
+
+def _missing(modules):
+    return [m for m in modules if importlib.util.find_spec(m) is None]
+
+
+def _wait_for_terminal(pool, job_id, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = pool.get(job_id)
+        if job["status"] in TERMINAL_STATUSES:
+            return job
+        time.sleep(0.5)
+    pytest.fail(f"任务 {job_id} 在 {timeout}s 内未结束：{pool.get(job_id)}")
+
+
+@pytest.mark.skipif(bool(_missing(["dotenv"])), reason="worker 进程启动需要 python-dotenv")
+def test_workers_are_not_daemonic_and_stop_reaps_them(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_JOB_WARMUP", "0")
+    pool = ReportWorkerPool(workers=2, db_path=str(tmp_path / "jobs.sqlite3"))
+    pool.ensure_started()
+    processes = list(pool._processes)
+    try:
+        assert len(processes) == 2
+        assert not any(p.daemon for p in processes)
+    finally:
+        pool.stop(timeout=10)
+
+    assert not any(p.is_alive() for p in processes)
+    # 停止后可以再次启动
+    pool.ensure_started()
+    pool.stop(timeout=10)
+
+
+@pytest.mark.skipif(bool(_missing(WORKFLOW_DEPENDENCIES)), reason=f"缺少运行依赖：{_missing(WORKFLOW_DEPENDENCIES)}")
+def test_stub_industry_research_job_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.setenv("FINSIGHT_LLM_MODE", "stub")
+    monkeypatch.setenv("REPORT_JOB_WARMUP", "0")
+    monkeypatch.setenv("LLM_RATE_LIMIT_SHARED", "0")
+    pool = ReportWorkerPool(workers=1, db_path=str(tmp_path / "jobs.sqlite3"))
+    params = {
+        "industry": "储能",
+        "province": "浙江省",
+        "target_year": 2025,
+        # 唯一侧重点：运行目录不与历史检查点重合，流水线从头执行
+        "focus": f"离线联调 {uuid.uuid4().hex[:8]}",
+    }
+    try:
+        job_id = pool.submit("industry_research", params)
+        assert pool.get(job_id)["status"] == "queued"
+        job = _wait_for_terminal(pool, job_id, timeout=600)
+    finally:
+        pool.stop(timeout=30)
+
+    assert job["status"] == "done", job["error"]
+    assert "## 第1章" in job["result"]
+
+    events = pool.events_since(job_id)
+    types = [event["type"] for event in events]
+    assert [event["seq"] for event in events] == list(range(1, len(events) + 1))
+    assert {"plan", "research", "analysis", "chapters", "draft", "review"} <= {
+        event["phase"] for event in events if event["type"] == "phase_end"
+    }
+    assert "chapter_done" in types
+    assert types[-1] == "report_done"
+    # 报告全文只存于任务结果，不在事件表重复存储
+    assert "result" not in events[-1]